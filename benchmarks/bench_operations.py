@@ -0,0 +1,233 @@
+"""
+Бенчмарки методов DatabaseOperations на SQLite и PostgreSQL (pytest-benchmark).
+
+База заполняется синтетическими данными (src.database.seed) один раз на
+движок; размер задается переменными BENCHMARK_STUDENTS,
+BENCHMARK_QUESTIONS_PER_SECTION и BENCHMARK_ANSWERS_PER_STUDENT. PostgreSQL
+берется из BENCHMARK_DATABASE_URL (база пересоздается!), без нее
+проверяется только SQLite.
+
+Запуск:
+    pytest benchmarks/bench_operations.py --benchmark-autosave
+    pytest benchmarks/bench_operations.py --benchmark-compare --benchmark-compare-fail=median:30%
+"""
+from itertools import count
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.migrations import upgrade_schema
+from src.database.models import Base, Group, Question, User
+from src.database.operations import DatabaseOperations
+from src.database.seed import SEED_TELEGRAM_ID_BASE, seed_database
+import os
+import pytest
+
+BENCHMARK_STUDENTS = int(os.getenv('BENCHMARK_STUDENTS', '300'))
+BENCHMARK_QUESTIONS_PER_SECTION = int(os.getenv('BENCHMARK_QUESTIONS_PER_SECTION', '100'))
+BENCHMARK_ANSWERS_PER_STUDENT = int(os.getenv('BENCHMARK_ANSWERS_PER_STUDENT', '40'))
+TEACHER_ID = 1_000
+
+# Новые пользователи, создаваемые в бенчмарках, не пересекаются с синтетическими
+_telegram_ids = count(SEED_TELEGRAM_ID_BASE * 10)
+
+
+def _url(backend, tmp_path_factory):
+    if backend == 'sqlite':
+        return f"sqlite:///{tmp_path_factory.mktemp('bench') / 'bench.db'}"
+    url = os.getenv('BENCHMARK_DATABASE_URL')
+    if not url:
+        pytest.skip("BENCHMARK_DATABASE_URL не задан")
+    return url
+
+
+@pytest.fixture(scope='module', params=['sqlite', 'postgresql'])
+def db_ops(request, tmp_path_factory):
+    engine = create_engine(_url(request.param, tmp_path_factory))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    session = sessionmaker(bind=engine)()
+    db_ops = DatabaseOperations(session)
+    seed_database(
+        db_ops, questions_per_section=BENCHMARK_QUESTIONS_PER_SECTION, students=BENCHMARK_STUDENTS,
+        answers_per_student=BENCHMARK_ANSWERS_PER_STUDENT
+    )
+    db_ops.create_user(TEACHER_ID, "Teacher", "Admin", "", is_teacher=True)
+    group = db_ops.create_group(TEACHER_ID, "Бенчмарк")
+    for telegram_id in range(SEED_TELEGRAM_ID_BASE, SEED_TELEGRAM_ID_BASE + BENCHMARK_STUDENTS, 2):
+        db_ops.join_group(telegram_id, group.join_code)
+    yield db_ops
+    session.close()
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope='module')
+def sample(db_ops):
+    """Идентификаторы существующих записей для запросов"""
+    session = db_ops.session
+    question = session.query(Question).order_by(Question.id).first()
+    options = db_ops.get_answer_options(question.id)
+    return {
+        'student': SEED_TELEGRAM_ID_BASE,
+        'student_pk': session.query(User.id).filter_by(telegram_id=SEED_TELEGRAM_ID_BASE).scalar(),
+        'section': question.section,
+        'question': question.id,
+        'option': options[0].id,
+        'question_ids': [question_id for (question_id,) in session.query(Question.id).limit(20)],
+        'group': session.query(Group).filter_by(name="Бенчмарк").one(),
+    }
+
+
+# Пользователи и группы
+
+def test_create_user(benchmark, db_ops):
+    benchmark(lambda: db_ops.create_user(next(_telegram_ids), "Иван", "Иванов", "+79000000000"))
+
+
+def test_register_student(benchmark, db_ops):
+    benchmark(lambda: db_ops.register_student(next(_telegram_ids), "+79000000000"))
+
+
+def test_init_teachers(benchmark, db_ops, monkeypatch):
+    monkeypatch.setenv('ADMIN_USER_IDS', f"{TEACHER_ID},{TEACHER_ID + 1}")
+    benchmark(db_ops.init_teachers)
+
+
+def test_get_user_by_id(benchmark, db_ops, sample):
+    benchmark(db_ops.get_user_by_id, sample['student'])
+
+
+def test_get_all_students(benchmark, db_ops):
+    benchmark(db_ops.get_all_students)
+
+
+def test_get_students(benchmark, db_ops):
+    benchmark(db_ops.get_students)
+
+
+def test_create_group(benchmark, db_ops):
+    benchmark(db_ops.create_group, TEACHER_ID, "Группа")
+
+
+def test_get_teacher_groups(benchmark, db_ops):
+    benchmark(db_ops.get_teacher_groups, TEACHER_ID)
+
+
+def test_join_group(benchmark, db_ops, sample):
+    # Вступают студенты, которых еще нет в группе (нечетные синтетические id)
+    students = count(SEED_TELEGRAM_ID_BASE + 1, 2)
+    code = sample['group'].join_code
+    benchmark.pedantic(lambda: db_ops.join_group(next(students), code), rounds=BENCHMARK_STUDENTS // 2 - 1)
+
+
+def test_get_group_students(benchmark, db_ops, sample):
+    benchmark(db_ops.get_group_students, [sample['group'].id])
+
+
+# Банк вопросов
+
+def test_create_question(benchmark, db_ops):
+    benchmark(db_ops.create_question, "Бенчмарк: вопрос", "Бенчмарк", ["1", "2", "3", "4"])
+
+
+def test_bulk_create_questions(benchmark, db_ops):
+    batch = [(f"Бенчмарк: вопрос {i}", "Бенчмарк", ["1", "2", "3", "4"]) for i in range(100)]
+    benchmark(db_ops.bulk_create_questions, batch)
+
+
+def test_iter_questions_with_options(benchmark, db_ops, sample):
+    benchmark(lambda: sum(1 for _ in db_ops.iter_questions_with_options(section=sample['section'])))
+
+
+def test_get_available_sections(benchmark, db_ops):
+    benchmark(db_ops.get_available_sections)
+
+
+def test_get_questions_by_section(benchmark, db_ops, sample):
+    benchmark(db_ops.get_questions_by_section, sample['section'])
+
+
+def test_get_question_sections(benchmark, db_ops, sample):
+    benchmark(db_ops.get_question_sections, sample['question'])
+
+
+def test_get_answer_options(benchmark, db_ops, sample):
+    benchmark(db_ops.get_answer_options, sample['question'])
+
+
+def test_save_video(benchmark, db_ops):
+    benchmark(db_ops.save_video, "file-id", "success")
+
+
+# Ответы, статистика и рейтинг
+
+def test_record_answer(benchmark, db_ops, sample):
+    benchmark(db_ops.record_answer, sample['student'], sample['question'], sample['option'], True)
+
+
+def test_get_question_stats(benchmark, db_ops):
+    benchmark(db_ops.get_question_stats, limit=50)
+
+
+def test_get_option_picks(benchmark, db_ops, sample):
+    benchmark(db_ops.get_option_picks, sample['question_ids'])
+
+
+def test_get_user_scores(benchmark, db_ops, sample):
+    benchmark(db_ops.get_user_scores, sample['student'])
+
+
+def test_get_user_score(benchmark, db_ops, sample):
+    benchmark(db_ops.get_user_score, sample['student_pk'], sample['section'])
+
+
+def test_update_or_create_score(benchmark, db_ops, sample):
+    benchmark(db_ops.update_or_create_score, sample['student_pk'], sample['section'], 10)
+
+
+def test_get_all_scores(benchmark, db_ops):
+    benchmark(db_ops.get_all_scores, limit=100)
+
+
+def test_iter_scores(benchmark, db_ops):
+    benchmark(lambda: sum(1 for _ in db_ops.iter_scores()))
+
+
+def test_rebuild_scores(benchmark, db_ops):
+    benchmark.pedantic(db_ops.rebuild_scores, rounds=5, iterations=1)
+
+
+# Запуски тестирования
+
+def _create_launch_job(db_ops, recipients=100):
+    user_ids = list(range(SEED_TELEGRAM_ID_BASE, SEED_TELEGRAM_ID_BASE + recipients))
+    return db_ops.create_launch_job(TEACHER_ID, TEACHER_ID, 1, ["Алгебра"], 1, None, 'all', user_ids)
+
+
+def test_create_launch_job(benchmark, db_ops):
+    benchmark(_create_launch_job, db_ops)
+
+
+def test_claim_launch_recipients(benchmark, db_ops):
+    # Каждый раунд забирает пачку у своего свежего запуска
+    def setup():
+        _create_launch_job(db_ops, 50)
+        return (50, 120, 3), {}
+
+    benchmark.pedantic(db_ops.claim_launch_recipients, setup=setup, rounds=20)
+
+
+def test_complete_launch_recipient(benchmark, db_ops):
+    job = _create_launch_job(db_ops, BENCHMARK_STUDENTS)
+    students = count(SEED_TELEGRAM_ID_BASE)
+    benchmark.pedantic(
+        lambda: db_ops.complete_launch_recipient(job.id, next(students), True), rounds=BENCHMARK_STUDENTS
+    )
+
+
+def test_finish_launch_jobs(benchmark, db_ops):
+    benchmark(db_ops.finish_launch_jobs)
+
+
+def test_get_launch_jobs(benchmark, db_ops):
+    benchmark(db_ops.get_launch_jobs, TEACHER_ID)
@@ -0,0 +1,44 @@
+"""
+Нагрузочный прогон планировщика вопросов без базы данных.
+
+Запуск: python -m benchmarks.bench_question_scheduler --draws 1000000
+"""
+from src.utils.question_pool import QuestionPool
+from src.utils.question_scheduler import QuestionScheduler
+import argparse
+import time
+import tracemalloc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--draws', type=int, default=1_000_000, help='число выдаваемых вопросов')
+    parser.add_argument('--sections', type=int, default=5, help='число разделов')
+    parser.add_argument('--memory-draws', type=int, default=100_000, help='выдач в прогоне с tracemalloc')
+    parser.add_argument('--questions', type=int, default=10_000, help='вопросов в разделе')
+    args = parser.parse_args()
+
+    pool = QuestionPool()
+    sections = [f"section_{i}" for i in range(args.sections)]
+    for i, section in enumerate(sections):
+        start = i * args.questions
+        pool.load_section(section, range(start, start + args.questions))
+
+    scheduler = QuestionScheduler(1, sections, pool=pool, limit=args.draws)
+    started = time.perf_counter()
+    count = sum(1 for _ in scheduler)
+    elapsed = time.perf_counter() - started
+    print(f"draws: {count}")
+    print(f"total: {elapsed:.3f} s, {elapsed / count * 1e9:.0f} ns/draw")
+
+    # Отдельный короткий прогон под tracemalloc: память не должна расти с числом выдач
+    tracemalloc.start()
+    scheduler = QuestionScheduler(2, sections, pool=pool, limit=args.memory_draws)
+    for _ in scheduler:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"peak traced memory over {args.memory_draws} draws: {peak / 1024:.1f} KiB")
+
+if __name__ == '__main__':
+    main()
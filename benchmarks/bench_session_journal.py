@@ -0,0 +1,50 @@
+"""
+Время восстановления сессий тестирования из журнала.
+
+Запуск: python -m benchmarks.bench_session_journal --sessions 10000
+"""
+from src.utils.session_journal import SessionJournal
+import argparse
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=10_000, help='число незавершенных сессий')
+    parser.add_argument('--answers', type=int, default=10, help='ответов в каждой сессии')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = SessionJournal(directory)
+        journal.open()
+        started = time.perf_counter()
+        for user_id in range(args.sessions):
+            journal.record('start', user_id, sections=['section_1', 'section_2'], epoch=1)
+            for i in range(args.answers):
+                journal.record('question', user_id, section='section_1', q=i + 1,
+                               options=[[4 * i + j, j == 0] for j in range(4)])
+                journal.record('answer', user_id, correct=i % 2 == 0)
+            journal.record('question', user_id, section='section_2', q=1000,
+                           options=[[1, True], [2, False]])
+        journal.flush()
+        records = args.sessions * (2 * args.answers + 2)
+        elapsed = time.perf_counter() - started
+        print(f"records: {records}, write: {elapsed:.3f} s, {elapsed / records * 1e6:.1f} us/record")
+
+        # Воспроизведение журнала без снимка (худший случай после аварии)
+        started = time.perf_counter()
+        state = SessionJournal(directory).load()
+        elapsed = time.perf_counter() - started
+        print(f"replay journal: {len(state)} sessions in {elapsed:.3f} s")
+
+        # Восстановление из свернутого снимка
+        recovered = SessionJournal(directory)
+        recovered.open()
+        started = time.perf_counter()
+        state = SessionJournal(directory).load()
+        elapsed = time.perf_counter() - started
+        print(f"load snapshot: {len(state)} sessions in {elapsed:.3f} s")
+
+if __name__ == '__main__':
+    main()
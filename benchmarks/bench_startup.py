@@ -0,0 +1,56 @@
+"""
+Время запуска процесса бота: импорт модулей и этапы setup.
+
+Каждый прогон - отдельный процесс Python на временной SQLite-базе
+(первый прогон создает схему, остальные застают ее готовой). Токен
+фиктивный: setup не обращается к Telegram.
+
+Запуск: python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+from src.main import create_bot, setup
+imported = time.perf_counter() - started
+startup = setup(create_bot())
+print(json.dumps({'import': imported, **startup.phases}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5, help='число запусков')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ, PYTHONPATH=ROOT, DATABASE_URL=f"sqlite:///{directory}/bot.db", TELEGRAM_TOKEN='1:bench',
+            LOG_DIR=os.path.join(directory, 'logs'), LOG_LEVEL='WARNING', SESSION_JOURNAL_DIR='', METRICS_PORT='0'
+        )
+        runs = []
+        for _ in range(args.runs):
+            result = subprocess.run(
+                [sys.executable, '-c', CHILD], cwd=directory, env=env, capture_output=True, text=True, check=True
+            )
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    print(f"Запусков: {len(runs)} (первый создает схему)")
+    for phase in runs[0]:
+        values = [run[phase] * 1000 for run in runs]
+        print(f"  {phase:<10} первый {values[0]:8.1f} мс, медиана {statistics.median(values):8.1f} мс")
+    totals = [sum(run.values()) * 1000 for run in runs]
+    print(f"  {'всего':<10} первый {totals[0]:8.1f} мс, медиана {statistics.median(totals):8.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Накладные расходы частых запросов: session.query(...) против заранее
+построенных операторов из src.database.statements.
+
+На SQLite в памяти время вызова - почти целиком работа Python (построение
+запроса, ключ кэша компиляции, разбор строк), поэтому разница показывает
+экономию на каждом вызове. С --database-url можно проверить PostgreSQL
+(база пересоздается!).
+
+Запуск: python -m benchmarks.bench_statements --calls 20000
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import AnswerOption, Base, Question, Score, User
+from src.database import statements
+from src.database.operations import DatabaseOperations
+from src.database.seed import SEED_TELEGRAM_ID_BASE, seed_database
+import argparse
+import time
+
+
+def query_forms(session, telegram_id, user_id, section, question_id):
+    """Пары (запрос через session.query, тот же запрос заранее построенным оператором)"""
+    return {
+        'user by telegram_id': (
+            lambda: session.query(User).filter(User.telegram_id == telegram_id).first(),
+            lambda: session.execute(statements.USER_BY_TELEGRAM_ID, {'telegram_id': telegram_id}).scalars().first(),
+        ),
+        'score by user+section': (
+            lambda: session.query(Score).filter(Score.user_id == user_id, Score.section == section).first(),
+            lambda: session.execute(
+                statements.SCORE_BY_USER_SECTION, {'user_id': user_id, 'section': section}
+            ).scalars().first(),
+        ),
+        'questions by section': (
+            lambda: session.query(Question).filter_by(section=section).order_by(Question.id).all(),
+            lambda: session.execute(statements.QUESTIONS_BY_SECTION, {'section': section}).scalars().all(),
+        ),
+        'options by question': (
+            lambda: session.query(AnswerOption).filter_by(question_id=question_id).order_by(AnswerOption.id).all(),
+            lambda: session.execute(statements.OPTIONS_BY_QUESTION, {'question_id': question_id}).scalars().all(),
+        ),
+    }
+
+
+def per_call(func, calls):
+    func()
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=20_000, help='вызовов каждого запроса')
+    parser.add_argument('--database-url', default='sqlite://')
+    parser.add_argument('--questions-per-section', type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed_database(DatabaseOperations(session), questions_per_section=args.questions_per_section, students=100,
+                  answers_per_student=20)
+
+    user_id = session.query(User.id).filter_by(telegram_id=SEED_TELEGRAM_ID_BASE).scalar()
+    question = session.query(Question).order_by(Question.id).first()
+    forms = query_forms(session, SEED_TELEGRAM_ID_BASE, user_id, question.section, question.id)
+
+    print(f"{'запрос':<24} {'query, мкс':>11} {'оператор, мкс':>14} {'ускорение':>10}")
+    for name, (orm, prepared) in forms.items():
+        assert orm() == prepared()
+        before, after = per_call(orm, args.calls), per_call(prepared, args.calls)
+        print(f"{name:<24} {before:11.1f} {after:14.1f} {before / after:9.2f}x")
+
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Стоимость колеса таймеров при большом числе одновременных сроков ответа.
+
+Часы моделируются, поэтому прогон не ждет реального времени: сроки
+распределены по time_limit секундам, колесо продвигается тик за тиком.
+Точность - отставание срабатывания от срока (порядка одного тика).
+
+Запуск: python -m benchmarks.bench_timer_wheel --timers 10000
+"""
+from src.utils.timer_wheel import TimerWheel
+import argparse
+import random
+import time
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--timers', type=int, default=10_000, help='число одновременных сроков')
+    parser.add_argument('--time-limit', type=float, default=60.0, help='наибольший срок, секунды')
+    parser.add_argument('--tick', type=float, default=0.1, help='длина тика, секунды')
+    parser.add_argument('--cancel', type=float, default=0.5, help='доля сроков, отмененных ответом')
+    args = parser.parse_args()
+
+    clock = FakeClock()
+    wheel = TimerWheel(tick=args.tick, clock=clock)
+    rng = random.Random(1)
+    lateness = []
+
+    def fired(deadline):
+        lateness.append(clock.now - deadline)
+
+    delays = [rng.uniform(1, args.time_limit) for _ in range(args.timers)]
+    started = time.perf_counter()
+    for key, delay in enumerate(delays):
+        wheel.schedule(key, delay, lambda deadline=delay: fired(deadline))
+    elapsed = time.perf_counter() - started
+    print(f"schedule: {args.timers} timers in {elapsed * 1000:.1f} ms, {elapsed / args.timers * 1e6:.2f} us/timer")
+
+    cancelled = rng.sample(range(args.timers), int(args.timers * args.cancel))
+    started = time.perf_counter()
+    for key in cancelled:
+        wheel.cancel(key)
+    elapsed = time.perf_counter() - started
+    print(f"cancel: {len(cancelled)} timers in {elapsed * 1000:.1f} ms, "
+          f"{elapsed / max(len(cancelled), 1) * 1e6:.2f} us/timer")
+
+    ticks = int(args.time_limit / args.tick) + 2
+    worst_tick = 0.0
+    started = time.perf_counter()
+    for _ in range(ticks):
+        clock.now += args.tick
+        tick_started = time.perf_counter()
+        wheel.advance()
+        worst_tick = max(worst_tick, time.perf_counter() - tick_started)
+    elapsed = time.perf_counter() - started
+    print(f"advance: {ticks} ticks in {elapsed * 1000:.1f} ms, {elapsed / ticks * 1e6:.1f} us/tick, "
+          f"worst tick {worst_tick * 1e6:.0f} us")
+
+    lateness.sort()
+    print(f"fired: {len(lateness)} of {args.timers - len(cancelled)}, pending: {len(wheel)}")
+    if lateness:
+        print(f"lateness: min {lateness[0] * 1000:.0f} ms, p50 {lateness[len(lateness) // 2] * 1000:.0f} ms, "
+              f"max {lateness[-1] * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+from typing import Dict, List, NamedTuple, Optional
+import base64
+import binascii
+import itertools
+import random
+import struct
+import threading
+
+# Коды операций callback-кнопок
+OP_ANSWER = 1
+OP_SECTION = 2
+OP_CONFIRM_SECTIONS = 3
+OP_VIDEO_CRITERIA = 4
+OP_EXPORT = 5
+OP_RESET_STATES = 6
+OP_EXPORT_STATS = 7
+OP_EXPORT_RATINGS = 8
+OP_GROUP = 9
+OP_LAUNCH = 10
+
+# Варианты сброса состояний (поле a кнопки OP_RESET_STATES)
+RESET_ALL = 0
+RESET_RUN = 1
+
+# Адресаты запуска тестирования (поле a кнопки OP_LAUNCH)
+LAUNCH_GROUPS = 0
+LAUNCH_ALL = 1
+
+# opcode (1 байт), epoch (2 байта), a (4 байта), b (2 байта) -> 9 байт -> 12 символов base64
+_LAYOUT = struct.Struct('>BHIH')
+ENCODED_LENGTH = 12
+
+
+class CallbackData(NamedTuple):
+    opcode: int
+    epoch: int
+    a: int
+    b: int
+
+
+def encode(opcode: int, a: int = 0, b: int = 0, epoch: int = 0) -> str:
+    """Упаковывает данные кнопки в строку фиксированной длины (12 символов)"""
+    return base64.urlsafe_b64encode(_LAYOUT.pack(opcode, epoch & 0xFFFF, a, b)).decode('ascii')
+
+
+def decode(data: str) -> Optional[CallbackData]:
+    """Распаковывает callback_data. Для чужих или устаревших форматов возвращает None"""
+    if not data or len(data) != ENCODED_LENGTH:
+        return None
+    try:
+        return CallbackData(*_LAYOUT.unpack(base64.urlsafe_b64decode(data)))
+    except (binascii.Error, struct.error, ValueError):
+        return None
+
+
+_epochs = itertools.count(random.randrange(1, 0xFFFF))
+
+
+def next_epoch() -> int:
+    """Новая эпоха сессии: кнопки прошлых запусков теста отклоняются без запроса к базе"""
+    return next(_epochs) % 0xFFFF + 1
+
+
+class SectionIds:
+    """
+    Таблица коротких числовых идентификаторов разделов для callback_data.
+
+    Названия разделов не передаются в кнопках (лимит Telegram — 64 байта),
+    вместо них используется номер из этой таблицы. Номер 0 зарезервирован
+    за кнопкой «Создать новый раздел». Таблица живет в памяти процесса,
+    поэтому кнопки несут поколение таблицы в поле epoch, и кнопки,
+    созданные до перезапуска бота, распознаются как устаревшие.
+    """
+
+    NEW_SECTION = 0
+
+    def __init__(self):
+        self.generation = random.randrange(1, 0xFFFF)
+        self._ids: Dict[str, int] = {}
+        self._names: List[Optional[str]] = [None]
+        self._lock = threading.Lock()
+
+    def id_for(self, section: str) -> int:
+        section_id = self._ids.get(section)
+        if section_id is None:
+            with self._lock:
+                section_id = self._ids.get(section)
+                if section_id is None:
+                    section_id = len(self._names)
+                    self._names.append(section)
+                    self._ids[section] = section_id
+        return section_id
+
+    def name_for(self, payload: CallbackData) -> Optional[str]:
+        """Название раздела из кнопки или None для устаревшей/неизвестной кнопки"""
+        if payload.epoch != self.generation or not 0 < payload.a < len(self._names):
+            return None
+        return self._names[payload.a]
+
+    def encode(self, section: str) -> str:
+        return encode(OP_SECTION, a=self.id_for(section), epoch=self.generation)
+
+    def encode_new_section(self) -> str:
+        return encode(OP_SECTION, a=self.NEW_SECTION, epoch=self.generation)
+
+
+section_ids = SectionIds()
@@ -1,20 +1,28 @@
 from telebot import TeleBot
-from src.database.models import User, Answer, Score, init_db
+from src.database.models import User, Answer, Score, db_session
 from src.bot.keyboards import get_student_main_menu, get_share_contact_keyboard, get_answer_options_keyboard
-from src.utils.helpers import is_registered_student, is_teacher
+from src.utils.helpers import is_registered_student
+from src.bot.router import Router
+from src.bot.callback_codec import OP_ANSWER
+from src.utils.role_cache import ROLE_STUDENT
 from src.database.operations import DatabaseOperations
 from src.utils.logger import logger
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 import random
-from src.utils.test_utils import send_test_question
+import time
+from datetime import datetime
+from src.utils.test_utils import send_test_question, take_current_question, record_test_answer
+from src.utils.timer_wheel import question_timers
 from src.bot.states import StudentStates
 from src.utils.state_storage import state_storage, data_storage
+from src.utils.cluster import cluster
 
-session = init_db()
+# Сессия потока-обработчика; база подключается при первом запросе, а не при импорте
+session = db_session
 
 logger.info(f"Состояния инициализированы: {StudentStates.waiting_for_name}, {StudentStates.waiting_for_contact}")
 
-def register_handlers(bot: TeleBot):
+def register_handlers(bot: TeleBot, router: Router):
     logger.info("Начало регистрации обработчиков студента")
 
     def get_name(message):
@@ -77,15 +85,9 @@ def register_handlers(bot: TeleBot):
             logger.error(f"Ошибка в обработке контакта: {e}", exc_info=True)
             bot.reply_to(message, "Произошла ошибка. Попробуйте еще раз.")
 
-    # Создаем словарь состояний и их обработчиков
-    state_handlers = {
-        StudentStates.waiting_for_name: get_name,
-        StudentStates.waiting_for_contact: handle_contact
-    }
-
-    # Регистрируем обработчик команды /start ПЕРЕД общим обработчиком
-    @bot.message_handler(commands=['start'])
-    def start(message):
+    # Регистрируем обработчик команды /start
+    @router.command('start', role=ROLE_STUDENT)
+    def start(message, ctx):
         try:
             logger.info(f"Получена команда /start от пользователя {message.from_user.id}")
             if is_registered_student(message.from_user.id):
@@ -98,73 +100,81 @@ def register_handlers(bot: TeleBot):
                 return
             
             bot.set_state(message.from_user.id, StudentStates.waiting_for_name, message.chat.id)
-            logger.info(f"Установлено состояние: {bot.get_state(message.from_user.id, message.chat.id)}")
+            logger.info(f"Установлено состояние: {StudentStates.waiting_for_name}")
             bot.send_message(message.chat.id, "Добро пожаловать! Введите ваши Фамилию и Имя:")
         except Exception as e:
             logger.error(f"Ошибка в start: {e}", exc_info=True)
             bot.reply_to(message, "Произошла ошибка. Попробуйте еще раз.")
 
-    # Регистрируем общий обработчик текстовых сообщений и контактов
-    @bot.message_handler(func=lambda message: not is_teacher(message.from_user.id), content_types=['text', 'contact'])
-    def handle_message(message):
+    # Если получено сообщение о начале тестирования
+    @router.text("Начинается тестирование!", role=ROLE_STUDENT)
+    def on_test_started(message, ctx):
+        logger.info("Получено сообщение о начале тестирования")
+        send_test_question(bot, message.from_user.id, session)
+
+    # Обработка кнопок меню
+    @router.text("📊 Мой рейтинг", role=ROLE_STUDENT)
+    def menu_my_rating(message, ctx):
+        logger.info("Запрошен просмотр рейтинга")
         try:
-            logger.info(f"Получено сообщение: {message.text}")
-            # Проверяем состояние из хранилища
-            stored_data = state_storage.data.get(message.from_user.id, {}).get(message.from_user.id, {})
-            stored_state = stored_data.get('state')
-            
-            # Если получено сообщение о начале тестирования
-            if message.text == "Начинается тестирование!":
-                logger.info("Получено сообщение о начале тестирования")
-                send_test_question(bot, message.from_user.id, session)
+            db_ops = DatabaseOperations(session)
+            scores = db_ops.get_user_scores(message.from_user.id)
+            if not scores:
+                bot.reply_to(message, "У вас пока нет результатов тестирования")
                 return
 
-            # Обработка кнопок меню
-            if message.text == "📊 Мой рейтинг":
-                logger.info("Запрошен просмотр рейтинга")
-                try:
-                    db_ops = DatabaseOperations(session)
-                    scores = db_ops.get_user_scores(message.from_user.id)
-                    if not scores:
-                        bot.reply_to(message, "У вас пока нет результатов тестирования")
-                        return
+            response = "📊 Ваши результаты:\n\n"
+            for score in scores:
+                response += f"Раздел '{score.section}': {score.points} баллов\n"
+            
+            bot.reply_to(message, response)
+        except Exception as e:
+            logger.error(f"Ошибка при показе рейтинга: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при получении рейтинга")
 
-                    response = "📊 Ваши результаты:\n\n"
-                    for score in scores:
-                        response += f"Раздел '{score.section}': {score.points} баллов\n"
-                    
-                    bot.reply_to(message, response)
-                except Exception as e:
-                    logger.error(f"Ошибка при показе рейтинга: {e}", exc_info=True)
-                    bot.reply_to(message, "Произошла ошибка при получении рейтинга")
+    @router.command('join', role=ROLE_STUDENT)
+    def join_group(message, ctx):
+        join_code = message.text.partition(' ')[2].strip()
+        if not join_code:
+            bot.reply_to(message, "Использование: /join <код группы>")
+            return
+        try:
+            if not is_registered_student(message.from_user.id):
+                bot.reply_to(message, "Сначала зарегистрируйтесь: /start")
                 return
-
-            elif message.text == "❓ Помощь":
-                logger.info("Запрошена помощь")
-                help_text = (
-                    "🎓 Помощь по использованию бота:\n\n"
-                    "1️⃣ Для начала работы необходимо зарегистрироваться\n"
-                    "2️⃣ После регистрации вы сможете участвовать в тестированиях\n"
-                    "3️⃣ Используйте кнопку '📊 Мой рейтинг' для просмотра результатов\n"
-                    "4️⃣ При возникновении проблем обратитесь к преподавателю"
-                )
-                bot.reply_to(message, help_text)
+            group = DatabaseOperations(session).join_group(message.from_user.id, join_code)
+            if group is None:
+                bot.reply_to(message, "Группа с таким кодом не найдена")
                 return
+            bot.reply_to(message, f"Вы в группе «{group.name}»")
+        except Exception as e:
+            logger.error(f"Ошибка при вступлении в группу: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при вступлении в группу")
 
-            # Обработка состояний регистрации
-            current_state = bot.get_state(message.from_user.id, message.chat.id)
-            if current_state:
-                if str(current_state) == str(StudentStates.waiting_for_name):
-                    get_name(message)
-                elif str(current_state) == str(StudentStates.waiting_for_contact):
-                    if message.content_type == 'contact':
-                        handle_contact(message)
-                    else:
-                        bot.reply_to(message, "Пожалуйста, используйте кнопку для отправки контакта")
+    @router.text("❓ Помощь", role=ROLE_STUDENT)
+    def menu_help(message, ctx):
+        logger.info("Запрошена помощь")
+        help_text = (
+            "🎓 Помощь по использованию бота:\n\n"
+            "1️⃣ Для начала работы необходимо зарегистрироваться\n"
+            "2️⃣ После регистрации вы сможете участвовать в тестированиях\n"
+            "3️⃣ Используйте кнопку '📊 Мой рейтинг' для просмотра результатов\n"
+            "4️⃣ Чтобы вступить в группу, отправьте /join <код группы> (код выдает преподаватель)\n"
+            "5️⃣ При возникновении проблем обратитесь к преподавателю"
+        )
+        bot.reply_to(message, help_text)
 
-        except Exception as e:
-            logger.error(f"Ошибка в обработке сообщения студента: {e}", exc_info=True)
-            bot.reply_to(message, "Произошла ошибка. Попробуйте еще раз.")
+    # Обработка состояний регистрации
+    @router.state(StudentStates.waiting_for_name, role=ROLE_STUDENT)
+    def on_waiting_for_name(message, ctx):
+        get_name(message)
+
+    @router.state(StudentStates.waiting_for_contact, role=ROLE_STUDENT)
+    def on_waiting_for_contact(message, ctx):
+        if message.content_type == 'contact':
+            handle_contact(message)
+        else:
+            bot.reply_to(message, "Пожалуйста, используйте кнопку для отправки контакта")
 
     def process_answer(user_id: int, answer_number: int):
         try:
@@ -198,12 +208,14 @@ def register_handlers(bot: TeleBot):
             logger.error(f"Error sending next question: {e}")
             bot.send_message(user_id, "Произошла ошибка при отправке вопроса")
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('answer_'))
-    def handle_answer(call):
+    @router.callback(OP_ANSWER, role=ROLE_STUDENT)
+    def handle_answer(call, ctx):
+        # Момент получения нажатия: от него считается время обработки ботом
+        answered_at = datetime.utcnow()
+        started = time.perf_counter()
         try:
             user_id = call.from_user.id
             logger.info(f"Получен ответ на вопрос от пользователя {user_id}")
-            logger.info(f"Структура хранилища до обработки: {data_storage.data}")
             
             # Получаем данные пользователя из глобального хранилища данных
             user_data = data_storage.data.get(user_id)
@@ -213,61 +225,50 @@ def register_handlers(bot: TeleBot):
                 return
                 
             test_data = user_data.get('data', {})
-            current_question = test_data.get('current_question')
+            current_question_id = test_data.get('current_question_id')
             answer_mapping = test_data.get('current_answer_mapping', {})
-            test_sections = test_data.get('test_sections', [])
-            
-            if not current_question or not answer_mapping:
+
+            if test_data.get('finished'):
+                bot.answer_callback_query(call.id, "Тестирование уже завершено")
+                return
+
+            if not current_question_id or not answer_mapping:
                 logger.error("Отсутствуют данные о текущем вопросе или вариантах ответа")
                 bot.answer_callback_query(call.id, "Произошла ошибка. Начните тестирование заново.")
                 return
+
+            # Кнопки прошлых запусков и уже отвеченных вопросов отклоняем без обращения к базе
+            if ctx.payload.epoch != test_data.get('epoch', 0) or ctx.payload.a != current_question_id:
+                logger.info(f"Устаревшая кнопка ответа от пользователя {user_id}: {ctx.payload}")
+                bot.answer_callback_query(call.id, "Этот вопрос уже неактуален")
+                return
             
             # Получаем выбранный ответ
-            answer_index = int(call.data.split('_')[1])
-            selected_answer = answer_mapping.get(answer_index)
-            
-            if not selected_answer:
+            answer_index = ctx.payload.b
+            if answer_index not in answer_mapping:
                 logger.error(f"Не найден ответ с индексом {answer_index}")
                 bot.answer_callback_query(call.id, "Произошла ошибка. Начните тестирование заново.")
                 return
             
-            # Проверяем правильность ответа
-            is_correct = selected_answer.is_correct
-            
-            # Обновляем счет и сохраняем результат в базу
-            db_ops = DatabaseOperations(session)
-            if is_correct:
-                test_data['score'] = test_data.get('score', 0) + 1
-                response = "✅ Правильно!"
-                # Начисляем баллы за правильный ответ
-                for section in test_sections:
-                    current_score = db_ops.get_user_score(user_id, section)
-                    new_score = current_score.points + 1 if current_score else 1
-                    if not db_ops.update_or_create_score(user_id, section, new_score):
-                        logger.warning(f"Не удалось обновить счет для пользователя {user_id}")
-            else:
-                response = "❌ Неправильно!"
-            
-            # Сохраняем ответ в базу данных
-            db_ops.record_answer(
-                student_id=user_id,
-                question_id=current_question.id,
-                answer_number=answer_index,
-                is_correct=is_correct
-            )
-            logger.info(f"Сохранен ответ пользователя {user_id} на вопрос {current_question.id}")
-            
-            # Обновляем индекс текущего вопроса
-            test_data['current_question_index'] = test_data.get('current_question_index', 0) + 1
+            # Забираем вопрос: ответ не будет записан повторно, срок ответа больше не нужен
+            taken = take_current_question(test_data, current_question_id)
+            if taken is None:
+                bot.answer_callback_query(call.id, "Этот вопрос уже неактуален")
+                return
+            question_timers.cancel(user_id)
+            answer_mapping, sent_at = taken
             
-            # Сохраняем обновленные данные
-            user_data['data'] = test_data
-            data_storage.data[user_id] = user_data
+            # Проверяем правильность ответа
+            option_id, is_correct = answer_mapping[answer_index]
+            response = "✅ Правильно!" if is_correct else "❌ Неправильно!"
             
-            logger.info(f"Обновленные данные пользователя: {user_data}")
+            # Сохраняем ответ: счет сессии, база данных, журнал
+            record_test_answer(user_id, session, user_data, current_question_id, option_id, is_correct,
+                               sent_at, answered_at)
             
             # Отправляем ответ пользователю
             bot.answer_callback_query(call.id, response)
+            cluster.send('record_processing', None, processing_us=(time.perf_counter() - started) * 1e6)
             bot.edit_message_reply_markup(call.message.chat.id, call.message.message_id)
             
             # Отправляем следующий вопрос
@@ -1,27 +1,56 @@
 from telebot import TeleBot
-from telebot.storage import StateMemoryStorage
-from src.database.models import Question, AnswerOption, Video, init_db
-from src.bot.keyboards import get_teacher_main_menu, get_sections_keyboard
-from src.utils.helpers import is_teacher
+from src.database.models import (
+    Question, AnswerOption, User, Video, db_session, RECIPIENT_CLAIMED, RECIPIENT_FAILED, RECIPIENT_PENDING, RECIPIENT_SENT
+)
+from src.bot.keyboards import get_teacher_main_menu, get_sections_keyboard, get_groups_keyboard
+from src.bot.router import Router
+from src.bot.callback_codec import (
+    LAUNCH_ALL, OP_CONFIRM_SECTIONS, OP_EXPORT, OP_EXPORT_RATINGS, OP_EXPORT_STATS, OP_GROUP, OP_LAUNCH, OP_RESET_STATES, OP_SECTION, OP_VIDEO_CRITERIA, RESET_ALL, RESET_RUN,
+    SectionIds, encode, next_epoch, section_ids
+)
+from src.utils.video_cache import VIDEO_CRITERIA
+from src.utils.role_cache import ROLE_TEACHER
 from src.database.operations import DatabaseOperations
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 from src.utils.logger import logger
 from src.bot.states import StudentStates, TeacherStates
-from src.utils.test_utils import send_test_question
-from src.utils.state_storage import state_storage, data_storage
+from src.utils.test_utils import begin_test, QUESTION_TIME_LIMIT
+from src.utils.cluster import cluster
+from src.utils.launch_jobs import launch_jobs
+from src.utils.outbound_queue import outbound_queue
+from src.utils.profiler import PROFILE_MODES, profiler
+from src.utils.state_storage import state_storage, data_storage, session_journal
+from src.utils.question_io import FORMATS, detect_format, export_questions, import_questions
+from src.utils.reports import (
+    RATINGS_FORMATS, REPORT_QUESTIONS, export_question_stats, export_ratings, format_latency_report,
+    format_question_stats, ratings_format
+)
+from src.utils.latency_stats import latency_stats
+from src.utils.launch_progress import launch_progress
+from src.utils.question_pool import question_pool
+from src.utils.exceptions import ValidationError
+import io
 import random
+import requests
+import shlex
+import tempfile
 from telebot.apihelper import ApiTelegramException
 
-# Создаем сессию и хранилище состояний
-session = init_db()
-state_storage = StateMemoryStorage()
-state_storage.update_types = ['message', 'callback_query']
+# Сессия потока-обработчика; база подключается при первом запросе, а не при импорте
+session = db_session
+
+# Сколько строк рейтинга показывать в сообщении (полный рейтинг - в выгрузке)
+RATINGS_PREVIEW = 50
 
 logger.info(f"Состояния преподавателя инициализированы: {TeacherStates.waiting_for_question}, {TeacherStates.waiting_for_answers}")
 
-def register_handlers(bot: TeleBot):
+def register_handlers(bot: TeleBot, router: Router):
     logger.info("Начало регистрации обработчиков преподавателя")
     db_ops = DatabaseOperations(session)
+    # Последний запуск тестирования каждого преподавателя (для точечного сброса)
+    last_runs = {}
+    # Время на ответ на вопрос, заданное преподавателем командой /timelimit (секунды, 0 - без ограничения)
+    time_limits = {}
 
     def handle_question(message):
         try:
@@ -36,14 +65,11 @@ def register_handlers(bot: TeleBot):
             # Получаем доступные разделы
             sections = db_ops.get_available_sections()
             
-            # Добавляем возможность создания нового раздела
-            sections = sections if sections else []
-            sections.append("Создать новый раздел")
-            
-            # Создаем клавиатуру с разделами
+            # Создаем клавиатуру с разделами и возможностью создания нового раздела
             markup = InlineKeyboardMarkup()
-            for section in sections:
-                markup.add(InlineKeyboardButton(section, callback_data=f"section_{section}"))
+            for section in sections or []:
+                markup.add(InlineKeyboardButton(section, callback_data=section_ids.encode(section)))
+            markup.add(InlineKeyboardButton("Создать новый раздел", callback_data=section_ids.encode_new_section()))
             
             bot.send_message(
                 message.chat.id,
@@ -100,9 +126,9 @@ def register_handlers(bot: TeleBot):
                 logger.info(f"Сохранен file_id видео: {data['video_file_id']}")
 
             markup = InlineKeyboardMarkup()
-            markup.add(InlineKeyboardButton("Успех", callback_data="video_success"))
-            markup.add(InlineKeyboardButton("Частичный успех", callback_data="video_partial"))
-            markup.add(InlineKeyboardButton("Неудача", callback_data="video_failure"))
+            markup.add(InlineKeyboardButton("Успех", callback_data=encode(OP_VIDEO_CRITERIA, VIDEO_CRITERIA.index('success'))))
+            markup.add(InlineKeyboardButton("Частичный успех", callback_data=encode(OP_VIDEO_CRITERIA, VIDEO_CRITERIA.index('partial'))))
+            markup.add(InlineKeyboardButton("Неудача", callback_data=encode(OP_VIDEO_CRITERIA, VIDEO_CRITERIA.index('failure'))))
 
             bot.send_message(
                 message.chat.id,
@@ -113,12 +139,37 @@ def register_handlers(bot: TeleBot):
             logger.error(f"Ошибка в обработке видео: {e}", exc_info=True)
             bot.reply_to(message, "Произошла ошибка при обработке видео")
 
+    def handle_import_file(message):
+        try:
+            document = message.document
+            logger.info(f"Получен файл для импорта вопросов: {document.file_name}")
+            fmt = detect_format(document.file_name)
+            bot.send_message(message.chat.id, "Импортирую вопросы, это может занять некоторое время...")
+
+            # Читаем файл потоком, не загружая его целиком в память
+            with requests.get(bot.get_file_url(document.file_id), stream=True, timeout=60) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                stream = io.TextIOWrapper(response.raw, encoding='utf-8-sig', newline='')
+                result = import_questions(DatabaseOperations(session), stream, fmt)
+
+            bot.delete_state(message.from_user.id, message.chat.id)
+            report = f"✅ Импортировано вопросов: {result.imported}"
+            if result.error_count:
+                report += f"\n⚠️ Пропущено строк с ошибками: {result.error_count}\n" + "\n".join(result.errors)
+            bot.send_message(message.chat.id, report, reply_markup=get_teacher_main_menu())
+        except ValidationError as e:
+            bot.reply_to(message, str(e))
+        except Exception as e:
+            logger.error(f"Ошибка при импорте вопросов: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при импорте вопросов")
+
     # Регистрируем обработчики команд
-    @bot.message_handler(commands=['teacher'])
-    def teacher_start(message):
+    @router.command('teacher')
+    def teacher_start(message, ctx):
         try:
             logger.info(f"Получена команда /teacher от пользователя {message.from_user.id}")
-            if not is_teacher(message.from_user.id):
+            if ctx.role != ROLE_TEACHER:
                 logger.warning(f"Попытка доступа без прав преподавателя: {message.from_user.id}")
                 bot.reply_to(message, "У вас нет прав преподавателя.")
                 return
@@ -132,168 +183,438 @@ def register_handlers(bot: TeleBot):
             logger.error(f"Ошибка в teacher_start: {e}", exc_info=True)
             bot.reply_to(message, "Произошла ошибка")
 
-    # Регистрируем общий обработчик сообщений
-    @bot.message_handler(func=lambda message: is_teacher(message.from_user.id), content_types=['text', 'video'])
-    def handle_message(message):
+    # Обработчики состояний
+    @router.state(TeacherStates.waiting_for_question, role=ROLE_TEACHER)
+    def on_waiting_for_question(message, ctx):
+        handle_question(message)
+
+    @router.state(TeacherStates.waiting_for_answers, role=ROLE_TEACHER)
+    def on_waiting_for_answers(message, ctx):
+        handle_answers(message)
+
+    @router.state(TeacherStates.waiting_for_section, role=ROLE_TEACHER)
+    def on_waiting_for_section(message, ctx):
+        # Обработка ввода нового раздела
+        logger.info(f"Создание нового раздела: {message.text}")
+        with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
+            data['section'] = message.text
+            logger.info(f"Сохранен новый раздел: {message.text}")
+        
+        # Переходим к вводу вариантов ответа
+        bot.send_message(
+            message.chat.id,
+            "Введите варианты ответов, каждый с новой строки. Первый вариант будет правильным:"
+        )
+        bot.set_state(message.from_user.id, TeacherStates.waiting_for_answers, message.chat.id)
+
+    @router.state(TeacherStates.waiting_for_video, role=ROLE_TEACHER)
+    def on_waiting_for_video(message, ctx):
+        if message.content_type == 'video':
+            handle_video(message)
+        else:
+            bot.reply_to(message, "Пожалуйста, отправьте видео")
+
+    @router.state(TeacherStates.waiting_for_import_file, role=ROLE_TEACHER)
+    def on_waiting_for_import_file(message, ctx):
+        if message.content_type == 'document':
+            handle_import_file(message)
+        else:
+            bot.reply_to(message, "Пожалуйста, отправьте файл CSV или JSONL")
+
+    # Обработчики кнопок меню
+    @router.text("📝 Создать вопрос", role=ROLE_TEACHER)
+    def menu_create_question(message, ctx):
+        logger.info("Запрошено создание вопроса")
+        bot.set_state(message.from_user.id, TeacherStates.waiting_for_question, message.chat.id)
+        bot.send_message(message.chat.id, "Введите текст вопроса:")
+
+    @router.text("📊 Просмотр вопросов", role=ROLE_TEACHER)
+    def menu_view_questions(message, ctx):
+        logger.info("Запрошен просмотр вопросов")
         try:
-            current_state = bot.get_state(message.from_user.id, message.chat.id)
-            logger.info(f"Получено сообщение типа {message.content_type}, текущее состояние: {current_state}")
+            sections = db_ops.get_available_sections()
+            if not sections:
+                bot.reply_to(message, "Пока нет созданных вопросов")
+                return
+
+            response = "📋 Список вопросов по разделам:\n\n"
+            for section in sections:
+                questions = db_ops.get_questions_by_section(section)
+                if questions:
+                    response += f"📚 Раздел: {section}\n"
+                    for i, question in enumerate(questions, 1):
+                        response += f"{i}. {question.text}\n"
+                    response += "\n"
+
+            bot.reply_to(message, response)
+        except Exception as e:
+            logger.error(f"Ошибка при показе вопросов: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при получении списка вопросов")
+
+    @router.text("▶️ Запустить тестирование", role=ROLE_TEACHER)
+    def menu_start_testing(message, ctx):
+        logger.info("Запрошен запуск тестирования")
+        try:
+            # Очищаем предыдущее состояние
+            bot.delete_state(message.from_user.id, message.chat.id)
             
-            # Инициализируем db_ops в начале функции
-            db_ops = DatabaseOperations(session)
+            # Устанавливаем новое состояние
+            bot.set_state(message.from_user.id, TeacherStates.waiting_for_test_sections, message.chat.id)
+            
+            # Инициализируем данные в хранилище
+            if message.from_user.id not in state_storage.data:
+                state_storage.data[message.from_user.id] = {}
+            if message.from_user.id not in state_storage.data[message.from_user.id]:
+                state_storage.data[message.from_user.id][message.from_user.id] = {}
+            
+            teacher_data = state_storage.data[message.from_user.id][message.from_user.id]
+            teacher_data['state'] = str(TeacherStates.waiting_for_test_sections)
+            teacher_data['data'] = {'selected_sections': []}
+            
+            sections = db_ops.get_available_sections()
+            if not sections:
+                bot.reply_to(message, "Нет доступных разделов для тестирования")
+                return
+            
+            logger.info(f"Доступные разделы: {sections}")
+            
+            markup = get_sections_keyboard(sections)
+            bot.reply_to(
+                message, 
+                "Выберите разделы для тестирования (можно выбрать несколько):", 
+                reply_markup=markup
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при запуске тестирования: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при запуске тестирования")
+
+    def send_ratings_export(chat_id, fmt, name=None, section=None):
+        # Рейтинг пишется во временный файл потоком и отправляется документом
+        fmt = ratings_format(fmt)
+        with tempfile.TemporaryFile() as tmp:
+            count = export_ratings(DatabaseOperations(session), tmp, fmt, name=name, section=section)
+            tmp.seek(0)
+            bot.send_document(
+                chat_id,
+                tmp,
+                visible_file_name=f"ratings.{fmt}",
+                caption=f"Строк рейтинга: {count}"
+            )
 
-            # Обработка состояний
-            if current_state:
-                if str(current_state) == str(TeacherStates.waiting_for_question):
-                    handle_question(message)
-                elif str(current_state) == str(TeacherStates.waiting_for_answers):
-                    handle_answers(message)
-                elif str(current_state) == str(TeacherStates.waiting_for_section):
-                    # Обработка ввода нового раздела
-                    logger.info(f"Создание нового раздела: {message.text}")
-                    with bot.retrieve_data(message.from_user.id, message.chat.id) as data:
-                        data['section'] = message.text
-                        logger.info(f"Сохранен новый раздел: {message.text}")
-                    
-                    # Переходим к вводу вариантов ответа
-                    bot.send_message(
-                        message.chat.id,
-                        "Введите варианты ответов, каждый с новой строки. Первый вариант будет правильным:"
-                    )
-                    bot.set_state(message.from_user.id, TeacherStates.waiting_for_answers, message.chat.id)
-                elif str(current_state) == str(TeacherStates.waiting_for_video):
-                    if message.content_type == 'video':
-                        handle_video(message)
-                    else:
-                        bot.reply_to(message, "Пожалуйста, отправьте видео")
+    @router.text("📈 Рейтинг студентов", role=ROLE_TEACHER)
+    def menu_ratings(message, ctx):
+        logger.info("Запрошен рейтинг студентов")
+        try:
+            scores = db_ops.get_all_scores(limit=RATINGS_PREVIEW + 1)
+            if not scores:
+                bot.reply_to(message, "Пока нет данных о рейтинге")
+                return
+            
+            response = "📊 Рейтинг студентов:\n\n"
+            for score in scores[:RATINGS_PREVIEW]:
+                response += f"{score.user.last_name} {score.user.first_name}: {score.points} баллов ({score.section})\n"
+            if len(scores) > RATINGS_PREVIEW:
+                response += (
+                    "\n...\nПолный рейтинг - в выгрузке. С фильтрами: "
+                    "/export_ratings xlsx section=<раздел> name=<фамилия или имя>"
+                )
+            
+            markup = InlineKeyboardMarkup()
+            markup.row(*[
+                InlineKeyboardButton(f"📤 {fmt.upper()}", callback_data=encode(OP_EXPORT_RATINGS, RATINGS_FORMATS.index(fmt)))
+                for fmt in RATINGS_FORMATS
+            ])
+            bot.reply_to(message, response, reply_markup=markup)
+        except Exception as e:
+            logger.error(f"Ошибка при показе рейтинга: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при получении рейтинга")
+
+    @router.callback(OP_EXPORT_RATINGS, role=ROLE_TEACHER)
+    def handle_export_ratings(call, ctx):
+        try:
+            bot.answer_callback_query(call.id)
+            send_ratings_export(call.message.chat.id, RATINGS_FORMATS[ctx.payload.a])
+        except Exception as e:
+            logger.error(f"Ошибка при выгрузке рейтинга: {e}", exc_info=True)
+            bot.send_message(call.message.chat.id, "Произошла ошибка при выгрузке рейтинга")
+
+    @router.command('export_ratings', role=ROLE_TEACHER)
+    def export_ratings_command(message, ctx):
+        # /export_ratings [csv|xlsx] [section=<раздел>] [name=<фамилия или имя>]
+        try:
+            fmt, filters = 'csv', {}
+            for arg in shlex.split(message.text)[1:]:
+                key, sep, value = arg.partition('=')
+                if sep and key in ('section', 'name'):
+                    filters[key] = value
+                elif arg.lower() in RATINGS_FORMATS:
+                    fmt = arg.lower()
                 else:
-                    logger.warning(f"Неизвестное состояние: {current_state}")
-
-            # Обработка кнопок меню
-            if message.content_type == 'text':
-                if message.text == "📝 Создать вопрос":
-                    logger.info("Запрошено создание вопроса")
-                    bot.set_state(message.from_user.id, TeacherStates.waiting_for_question, message.chat.id)
-                    bot.send_message(message.chat.id, "Введите текст вопроса:")
+                    bot.reply_to(message, "Использование: /export_ratings [csv|xlsx] [section=<раздел>] [name=<имя>]")
                     return
+            logger.info(f"Выгрузка рейтинга в {fmt}, фильтры: {filters}")
+            send_ratings_export(message.chat.id, fmt, **filters)
+        except ValueError:
+            bot.reply_to(message, "Не закрыта кавычка в параметрах команды")
+        except Exception as e:
+            logger.error(f"Ошибка при выгрузке рейтинга: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при выгрузке рейтинга")
 
-                elif message.text == "📊 Просмотр вопросов":
-                    logger.info("Запрошен просмотр вопросов")
-                    try:
-                        sections = db_ops.get_available_sections()
-                        if not sections:
-                            bot.reply_to(message, "Пока нет созданных вопросов")
-                            return
-
-                        response = "📋 Список вопросов по разделам:\n\n"
-                        for section in sections:
-                            questions = db_ops.get_questions_by_section(section)
-                            if questions:
-                                response += f"📚 Раздел: {section}\n"
-                                for i, question in enumerate(questions, 1):
-                                    response += f"{i}. {question.text}\n"
-                                response += "\n"
-
-                        bot.reply_to(message, response)
-                    except Exception as e:
-                        logger.error(f"Ошибка при показе вопросов: {e}", exc_info=True)
-                        bot.reply_to(message, "Произошла ошибка при получении списка вопросов")
-                    return
+    @router.text("👥 Группы", role=ROLE_TEACHER)
+    def menu_groups(message, ctx):
+        logger.info("Запрошен список групп")
+        try:
+            groups = db_ops.get_teacher_groups(message.from_user.id)
+            response = "👥 Ваши группы:\n\n" if groups else "У вас пока нет групп.\n"
+            for group, members in groups:
+                response += f"{group.name}: {members} студентов, код для вступления: {group.join_code}\n"
+            response += (
+                "\nСоздать группу: /newgroup <название>\n"
+                "Студенты вступают в группу командой /join <код>"
+            )
+            bot.reply_to(message, response)
+        except Exception as e:
+            logger.error(f"Ошибка при показе групп: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при получении групп")
 
-                elif message.text == "▶️ Запустить тестирование":
-                    logger.info("Запрошен запуск тестирования")
-                    try:
-                        # Очищаем предыдущее состояние
-                        bot.delete_state(message.from_user.id, message.chat.id)
-                        
-                        # Устанавливаем новое состояние
-                        bot.set_state(message.from_user.id, TeacherStates.waiting_for_test_sections, message.chat.id)
-                        
-                        # Инициализируем данные в хранилище
-                        if message.from_user.id not in state_storage.data:
-                            state_storage.data[message.from_user.id] = {}
-                        if message.from_user.id not in state_storage.data[message.from_user.id]:
-                            state_storage.data[message.from_user.id][message.from_user.id] = {}
-                        
-                        teacher_data = state_storage.data[message.from_user.id][message.from_user.id]
-                        teacher_data['state'] = str(TeacherStates.waiting_for_test_sections)
-                        teacher_data['data'] = {'selected_sections': []}
-                        
-                        sections = db_ops.get_available_sections()
-                        if not sections:
-                            bot.reply_to(message, "Нет доступных разделов для тестирования")
-                            return
-                        
-                        logger.info(f"Доступные разделы: {sections}")
-                        logger.info(f"Текущее состояние: {bot.get_state(message.from_user.id, message.chat.id)}")
-                        logger.info(f"Данные в хранилище: {state_storage.data}")
-                        
-                        markup = get_sections_keyboard(sections)
-                        bot.reply_to(
-                            message, 
-                            "Выберите разделы для тестирования (можно выбрать несколько):", 
-                            reply_markup=markup
-                        )
-                    except Exception as e:
-                        logger.error(f"Ошибка при запуске тестирования: {e}", exc_info=True)
-                        bot.reply_to(message, "Произошла ошибка при запуске тестирования")
-                    return
+    @router.command('newgroup', role=ROLE_TEACHER)
+    def create_group_command(message, ctx):
+        name = message.text.partition(' ')[2].strip()
+        if not name:
+            bot.reply_to(message, "Использование: /newgroup <название группы>")
+            return
+        try:
+            group = db_ops.create_group(message.from_user.id, name)
+            bot.reply_to(
+                message,
+                f"Группа «{group.name}» создана.\nКод для вступления: {group.join_code}\n"
+                f"Студенты вступают командой /join {group.join_code}"
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при создании группы: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при создании группы")
 
-                elif message.text == "📈 Рейтинг студентов":
-                    logger.info("Запрошен рейтинг студентов")
-                    try:
-                        scores = db_ops.get_all_scores()
-                        if not scores:
-                            bot.reply_to(message, "Пока нет данных о рейтинге")
-                            return
-                        
-                        response = "📊 Рейтинг студентов:\n\n"
-                        for score in scores:
-                            response += f"{score.user.last_name} {score.user.first_name}: {score.points} баллов ({score.section})\n"
-                        
-                        bot.reply_to(message, response)
-                    except Exception as e:
-                        logger.error(f"Ошибка при показе рейтинга: {e}", exc_info=True)
-                        bot.reply_to(message, "Произошла ошибка при получении рейтинга")
-                    return
+    @router.command('timelimit', role=ROLE_TEACHER)
+    def time_limit_command(message, ctx):
+        argument = message.text.partition(' ')[2].strip()
+        if not argument:
+            current = time_limits.get(message.from_user.id, QUESTION_TIME_LIMIT)
+            bot.reply_to(
+                message,
+                f"Время на ответ: {f'{current} с' if current else 'без ограничения'}\n"
+                "Изменить: /timelimit <секунд> (0 - без ограничения)"
+            )
+            return
+        if not argument.isdigit():
+            bot.reply_to(message, "Использование: /timelimit <секунд> (0 - без ограничения)")
+            return
+        time_limits[message.from_user.id] = int(argument)
+        bot.reply_to(
+            message,
+            f"Время на ответ для следующих запусков: {f'{argument} с' if int(argument) else 'без ограничения'}"
+        )
 
-                elif message.text == "🎥 Загрузить видео":
-                    logger.info("Запрошена загрузка видео")
-                    bot.set_state(message.from_user.id, TeacherStates.waiting_for_video, message.chat.id)
-                    bot.send_message(
-                        message.chat.id,
-                        "Отправьте видео для загрузки. После загрузки вы сможете выбрать критерий оценки."
-                    )
-                    return
+    @router.text("📉 Статистика вопросов", role=ROLE_TEACHER)
+    def menu_question_stats(message, ctx):
+        logger.info("Запрошена статистика вопросов")
+        try:
+            rows = db_ops.get_question_stats(limit=REPORT_QUESTIONS)
+            if not rows:
+                bot.reply_to(message, "Пока нет ответов на вопросы")
+                return
 
-                elif message.text == "🔄 Сбросить состояния":
-                    logger.info("Запрошен сброс состояний")
-                    try:
-                        # Сбрасываем все состояния
-                        state_storage.data.clear()
-                        logger.info("Все состояния успешно сброшены")
-                        
-                        bot.reply_to(
-                            message,
-                            "✅ Состояния всех пользователей успешно сброшены",
-                            reply_markup=get_teacher_main_menu()
-                        )
-                    except Exception as e:
-                        logger.error(f"Ошибка при сбросе состояний: {e}", exc_info=True)
-                        bot.reply_to(message, "Произошла ошибка при сбросе состояний")
-                    return
+            picks = db_ops.get_option_picks([question.id for question, _ in rows])
+            markup = InlineKeyboardMarkup()
+            markup.add(InlineKeyboardButton("📤 Выгрузить CSV", callback_data=encode(OP_EXPORT_STATS)))
+            # Ограничение Telegram на длину сообщения
+            bot.reply_to(message, format_question_stats(rows, picks)[:4000], reply_markup=markup)
+        except Exception as e:
+            logger.error(f"Ошибка при показе статистики вопросов: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при получении статистики вопросов")
 
+    @router.text("⏱ Время ответов", role=ROLE_TEACHER)
+    def menu_latency(message, ctx):
+        logger.info("Запрошено время ответов")
+        try:
+            question_ids = [key for key, _ in latency_stats.slowest(latency_stats.think_by_question)]
+            user_ids = [key for key, _ in latency_stats.slowest(latency_stats.think_by_student)]
+            question_texts = dict(
+                session.query(Question.id, Question.text).filter(Question.id.in_(question_ids)).all()
+            )
+            student_names = {
+                user_id: f"{last_name} {first_name}"
+                for user_id, last_name, first_name in session.query(User.id, User.last_name, User.first_name)
+                .filter(User.id.in_(user_ids)).all()
+            }
+            report = format_latency_report(latency_stats, question_texts, student_names)
+            bot.reply_to(message, report[:4000])
         except Exception as e:
-            logger.error(f"Ошибка в обработке сообщения учителя: {e}", exc_info=True)
-            bot.reply_to(message, "Произошла ошибка. Попробуйте еще раз.")
-            bot.delete_state(message.from_user.id, message.chat.id)
+            logger.error(f"Ошибка при показе времени ответов: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при получении времени ответов")
+
+    @router.text("🎥 Загрузить видео", role=ROLE_TEACHER)
+    def menu_upload_video(message, ctx):
+        logger.info("Запрошена загрузка видео")
+        bot.set_state(message.from_user.id, TeacherStates.waiting_for_video, message.chat.id)
+        bot.send_message(
+            message.chat.id,
+            "Отправьте видео для загрузки. После загрузки вы сможете выбрать критерий оценки."
+        )
+
+    @router.text("📥 Импорт вопросов", role=ROLE_TEACHER)
+    def menu_import_questions(message, ctx):
+        logger.info("Запрошен импорт вопросов")
+        bot.set_state(message.from_user.id, TeacherStates.waiting_for_import_file, message.chat.id)
+        bot.send_message(
+            message.chat.id,
+            "Отправьте файл с вопросами в формате CSV или JSONL.\n\n"
+            "CSV: раздел,вопрос,правильный ответ,ответ 2,...\n"
+            'JSONL: {"section": "...", "text": "...", "answers": ["правильный", "..."]}'
+        )
+
+    @router.text("📤 Экспорт вопросов", role=ROLE_TEACHER)
+    def menu_export_questions(message, ctx):
+        logger.info("Запрошен экспорт вопросов")
+        markup = InlineKeyboardMarkup()
+        markup.add(InlineKeyboardButton("CSV", callback_data=encode(OP_EXPORT, FORMATS.index('csv'))))
+        markup.add(InlineKeyboardButton("JSONL", callback_data=encode(OP_EXPORT, FORMATS.index('jsonl'))))
+        bot.send_message(message.chat.id, "Выберите формат выгрузки:", reply_markup=markup)
+
+    @router.text("🔄 Сбросить состояния", role=ROLE_TEACHER)
+    def menu_reset_states(message, ctx):
+        logger.info("Запрошен сброс состояний")
+        markup = InlineKeyboardMarkup()
+        last_run = last_runs.get(message.from_user.id)
+        if last_run is not None:
+            markup.add(InlineKeyboardButton(
+                "Сбросить последний запуск",
+                callback_data=encode(OP_RESET_STATES, a=RESET_RUN, epoch=last_run)
+            ))
+        markup.add(InlineKeyboardButton("Сбросить всех пользователей", callback_data=encode(OP_RESET_STATES, a=RESET_ALL)))
+        bot.reply_to(message, "Что сбросить?", reply_markup=markup)
+
+    @router.callback(OP_RESET_STATES, role=ROLE_TEACHER)
+    def handle_reset_states(call, ctx):
+        try:
+            if ctx.payload.a == RESET_RUN:
+                # Сбрасываем только сессии студентов одного запуска тестирования
+                removed = cluster.send('drop_sessions', epoch=ctx.payload.epoch)
+                text = "✅ Сброшены сессии последнего запуска" + (f": {removed}" if removed is not None else "")
+            else:
+                # Сбрасываем все состояния
+                cluster.send('drop_sessions')
+                text = "✅ Состояния всех пользователей успешно сброшены"
+
+            bot.answer_callback_query(call.id)
+            bot.edit_message_text(text, call.message.chat.id, call.message.message_id)
+        except Exception as e:
+            logger.error(f"Ошибка при сбросе состояний: {e}", exc_info=True)
+            bot.answer_callback_query(call.id, "Произошла ошибка при сбросе состояний")
+
+    def drop_sessions(epoch=None):
+        """Сбрасывает сессии запуска epoch или все состояния (в каждом процессе - свои)"""
+        if epoch is not None:
+            users = [user_id for user_id in data_storage.data if data_storage.data.run_id(user_id) == epoch]
+            removed = data_storage.data.evict_run(epoch)
+            session_journal.record('drop', epoch=epoch)
+            for user_id in users:
+                question_pool.reset(user_id)
+            logger.info(f"Сброшены сессии запуска {epoch}: {removed}")
+            return removed
+        state_storage.data.clear()
+        data_storage.data.clear()
+        session_journal.record('drop')
+        question_pool.clear()
+        logger.info("Все состояния успешно сброшены")
+        return None
+
+    # Задачи, которые выполняет процесс, ведущий сессии студентов
+    cluster.task('begin_test', lambda **payload: begin_test(bot, session, **payload))
+    cluster.task('drop_sessions', drop_sessions)
+    cluster.task('progress', launch_progress.apply)
+
+    @router.command('launches', role=ROLE_TEACHER)
+    def show_launches(message, ctx):
+        try:
+            jobs = db_ops.get_launch_jobs(message.from_user.id)
+            if not jobs:
+                bot.reply_to(message, "Запусков тестирования пока нет")
+                return
+            response = "📨 Последние запуски тестирования:\n\n"
+            for job, counts in jobs:
+                waiting = counts.get(RECIPIENT_PENDING, 0) + counts.get(RECIPIENT_CLAIMED, 0)
+                response += (
+                    f"#{job.id} {job.created_at:%d.%m %H:%M}, {job.audience}: "
+                    f"отправлено {counts.get(RECIPIENT_SENT, 0)} из {job.total}"
+                    + (f", в очереди {waiting}" if waiting else "")
+                    + (f", ошибок {counts[RECIPIENT_FAILED]}" if counts.get(RECIPIENT_FAILED) else "")
+                    + "\n"
+                )
+            bot.reply_to(message, response)
+        except Exception as e:
+            logger.error(f"Ошибка при показе запусков: {e}", exc_info=True)
+            bot.reply_to(message, "Произошла ошибка при получении запусков")
+
+    @router.command('profile', role=ROLE_TEACHER)
+    def profile_command(message, ctx):
+        # /profile [cprofile|sample] [seconds=<N>] [updates=<N>] или /profile stop
+        usage = "Использование: /profile [cprofile|sample] [seconds=<N>] [updates=<N>]\nОстановить: /profile stop"
+        args = message.text.split()[1:]
+        if args == ['stop']:
+            if not profiler.stop():
+                bot.reply_to(message, "Профилирование не запущено")
+            return
+
+        mode, seconds, updates = 'cprofile', None, None
+        try:
+            for arg in args:
+                if arg in PROFILE_MODES:
+                    mode = arg
+                elif arg.startswith('seconds='):
+                    seconds = float(arg.partition('=')[2])
+                elif arg.startswith('updates='):
+                    updates = int(arg.partition('=')[2])
+                else:
+                    raise ValueError(arg)
+        except ValueError:
+            bot.reply_to(message, usage)
+            return
+
+        chat_id = message.chat.id
+
+        def send_report(report, filename, summary):
+            outbound_queue.put(
+                bot.send_document, chat_id, io.BytesIO(report.encode('utf-8')),
+                visible_file_name=filename, caption=summary
+            )
+
+        if not profiler.start(mode, send_report, seconds=seconds, updates=updates):
+            bot.reply_to(message, "Профилирование уже идет. Остановить: /profile stop")
+            return
+        bot.reply_to(
+            message,
+            f"Профилирование {mode} запущено"
+            + (f" на {updates} обновлений" if updates else "")
+            + ". Отчет придет документом."
+        )
+
+    @router.command('sessions', role=ROLE_TEACHER)
+    def show_session_stats(message, ctx):
+        response = "🧠 Хранилища сессий:\n\n"
+        for stats in (data_storage.data.stats(), state_storage.data.stats()):
+            evicted = ", ".join(f"{reason}: {count}" for reason, count in stats['evicted'].items())
+            response += (
+                f"{stats['name']}: {stats['size']} из {stats['max_size']}, "
+                f"~{stats['approx_bytes'] // 1024} КБ\nВытеснено — {evicted}\n\n"
+            )
+        bot.reply_to(message, response)
 
     # Обработчик callback-запросов для видео
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('video_'))
-    def handle_video_criteria(call):
+    @router.callback(OP_VIDEO_CRITERIA, role=ROLE_TEACHER)
+    def handle_video_criteria(call, ctx):
         try:
-            logger.info(f"Получен callback для видео: {call.data}")
-            criteria = call.data.split('_')[1]
+            criteria = VIDEO_CRITERIA[ctx.payload.a]
+            logger.info(f"Получен callback для видео: {criteria}")
             
             with bot.retrieve_data(call.from_user.id, call.message.chat.id) as data:
                 video_file_id = data['video_file_id']
@@ -316,14 +637,57 @@ def register_handlers(bot: TeleBot):
             logger.error(f"Ошибка в обработке критерия видео: {e}", exc_info=True)
             bot.answer_callback_query(call.id, "Произошла ошибка при сохранении видео")
 
+    # Обработчик callback-запросов для экспорта вопросов
+    @router.callback(OP_EXPORT, role=ROLE_TEACHER)
+    def handle_export_questions(call, ctx):
+        try:
+            fmt = FORMATS[ctx.payload.a]
+            logger.info(f"Экспорт вопросов в формате {fmt}")
+            bot.answer_callback_query(call.id)
+
+            # Пишем выгрузку во временный файл потоком и отправляем его документом
+            with tempfile.TemporaryFile() as tmp:
+                out = io.TextIOWrapper(tmp, encoding='utf-8', newline='')
+                count = export_questions(DatabaseOperations(session), out, fmt)
+                out.flush()
+                out.detach()
+                tmp.seek(0)
+                bot.send_document(
+                    call.message.chat.id,
+                    tmp,
+                    visible_file_name=f"questions.{fmt}",
+                    caption=f"Выгружено вопросов: {count}"
+                )
+        except Exception as e:
+            logger.error(f"Ошибка при экспорте вопросов: {e}", exc_info=True)
+            bot.send_message(call.message.chat.id, "Произошла ошибка при экспорте вопросов")
+
+    @router.callback(OP_EXPORT_STATS, role=ROLE_TEACHER)
+    def handle_export_question_stats(call, ctx):
+        try:
+            bot.answer_callback_query(call.id)
+            with tempfile.TemporaryFile() as tmp:
+                out = io.TextIOWrapper(tmp, encoding='utf-8', newline='')
+                count = export_question_stats(DatabaseOperations(session), out)
+                out.flush()
+                out.detach()
+                tmp.seek(0)
+                bot.send_document(
+                    call.message.chat.id,
+                    tmp,
+                    visible_file_name="question_stats.csv",
+                    caption=f"Статистика по вопросам: {count}"
+                )
+        except Exception as e:
+            logger.error(f"Ошибка при выгрузке статистики вопросов: {e}", exc_info=True)
+            bot.send_message(call.message.chat.id, "Произошла ошибка при выгрузке статистики")
+
     # Обработчик для выбора раздела при создании вопроса
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('section_') and bot.get_state(call.from_user.id, call.message.chat.id) == TeacherStates.waiting_for_section)
-    def handle_section_choice(call):
+    @router.callback(OP_SECTION, role=ROLE_TEACHER, state=TeacherStates.waiting_for_section)
+    def handle_section_choice(call, ctx):
         try:
-            section = call.data.split('section_')[1]
-            logger.info(f"Выбран раздел для создания вопроса: {section}")
-            
-            if section == "Создать новый раздел":
+            if ctx.payload.a == SectionIds.NEW_SECTION and ctx.payload.epoch == section_ids.generation:
+                logger.info("Выбрано создание нового раздела")
                 bot.answer_callback_query(call.id)
                 bot.edit_message_text(
                     "Введите название нового раздела:",
@@ -331,6 +695,12 @@ def register_handlers(bot: TeleBot):
                     call.message.message_id
                 )
                 return
+
+            section = section_ids.name_for(ctx.payload)
+            if section is None:
+                bot.answer_callback_query(call.id, "Кнопка устарела, создайте вопрос заново")
+                return
+            logger.info(f"Выбран раздел для создания вопроса: {section}")
             
             # Инициализируем данные перед сохранением
             bot.set_state(call.from_user.id, TeacherStates.waiting_for_answers, call.message.chat.id)
@@ -353,8 +723,8 @@ def register_handlers(bot: TeleBot):
             bot.answer_callback_query(call.id, "Произошла ошибка. Попробуйте еще раз.")
 
     # Обработчик для подтверждения выбора разделов при запуске тестирования
-    @bot.callback_query_handler(func=lambda call: call.data == "confirm_sections")
-    def handle_confirm_sections(call):
+    @router.callback(OP_CONFIRM_SECTIONS, role=ROLE_TEACHER)
+    def handle_confirm_sections(call, ctx):
         try:
             # Получаем выбранные разделы из хранилища
             teacher_data = state_storage.data.get(call.from_user.id, {}).get(call.from_user.id, {})
@@ -367,63 +737,113 @@ def register_handlers(bot: TeleBot):
                 bot.answer_callback_query(call.id, "Не выбрано ни одного раздела!")
                 return
             
-            # Получаем список студентов
+            # Если у преподавателя есть группы, сначала выбираем адресатов
             db_ops = DatabaseOperations(session)
-            students = db_ops.get_students()
-            logger.info(f"Retrieved {len(students)} students from database")
-            
-            # Запускаем тестирование для каждого студента
-            for student in students:
-                try:
-                    # Инициализируем данные для студента
-                    student_id = student.telegram_id
-                    
-                    # Сохраняем данные в глобальное хранилище данных
-                    if student_id not in data_storage.data:
-                        data_storage.data[student_id] = {}
-                    
-                    # Создаем или обновляем данные студента
-                    student_data = {
-                        'state': str(StudentStates.waiting_for_answer),
-                        'data': {
-                            'test_sections': selected_sections.copy(),
-                            'current_question_index': 0,
-                            'score': 0
-                        }
-                    }
-                    
-                    # Сохраняем данные
-                    data_storage.data[student_id] = student_data
-                    
-                    logger.info(f"Инициализированы данные для студента {student_id}: {student_data}")
-                    logger.info(f"Структура хранилища данных: {data_storage.data}")
-                    
-                    # Отправляем сигнал начала тестирования и первый вопрос
-                    bot.send_message(student_id, "Начинается тестирование!")
-                    send_test_question(bot, student_id, session)
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка при запуске теста для студента {student.telegram_id}: {e}")
-                    continue
-            
-            # Подтверждаем учителю
-            bot.edit_message_text(
-                "Тестирование запущено для всех студентов!",
+            groups = db_ops.get_teacher_groups(call.from_user.id)
+            if groups:
+                bot.set_state(call.from_user.id, TeacherStates.waiting_for_test_groups, call.message.chat.id)
+                teacher_data.setdefault('data', {})['selected_groups'] = []
+                bot.answer_callback_query(call.id)
+                bot.edit_message_text(
+                    "Выберите группы для тестирования:",
+                    call.message.chat.id,
+                    call.message.message_id,
+                    reply_markup=get_groups_keyboard(groups)
+                )
+                return
+            
+            launch_test(call, selected_sections, db_ops.get_students(), "всех студентов")
+            
+        except Exception as e:
+            logger.error(f"Ошибка при подтверждении разделов: {e}")
+            bot.answer_callback_query(call.id, "Произошла ошибка при запуске тестирования")
+
+    def launch_test(call, selected_sections, students, audience):
+        logger.info(f"Запуск тестирования для {len(students)} студентов ({audience})")
+        
+        # Новая эпоха сессии: кнопки ответов прошлых запусков становятся недействительными
+        epoch = next_epoch()
+        last_runs[call.from_user.id] = epoch
+        time_limit = time_limits.get(call.from_user.id, QUESTION_TIME_LIMIT) or None
+        title = f"Тестирование запущено для {audience} ({len(students)})!"
+        if time_limit:
+            title += f"\nВремя на ответ: {time_limit} с"
+        # Ход тестирования показывается в этом же сообщении и обновляется в фоне
+        launch_progress.open(epoch, call.message.chat.id, call.message.message_id, title, len(students))
+        
+        # Запуск сохраняется в базе и рассылается фоновыми потоками (переживает перезапуск бота)
+        DatabaseOperations(session).create_launch_job(
+            call.from_user.id, call.message.chat.id, call.message.message_id, selected_sections, epoch,
+            time_limit, audience, [student.telegram_id for student in students]
+        )
+        launch_jobs.wake()
+        
+        bot.delete_state(call.from_user.id, call.message.chat.id)
+        # Подтверждаем учителю
+        bot.edit_message_text(
+            launch_progress.take_text(epoch) or title,
+            call.message.chat.id,
+            call.message.message_id
+        )
+
+    # Выбор групп для запуска тестирования
+    @router.callback(OP_GROUP, role=ROLE_TEACHER, state=TeacherStates.waiting_for_test_groups)
+    def handle_test_group_choice(call, ctx):
+        try:
+            teacher_data = state_storage.data.get(call.from_user.id, {}).get(call.from_user.id, {})
+            selected_groups = teacher_data.get('data', {}).setdefault('selected_groups', [])
+            
+            # Выбирать можно только свои группы
+            groups = DatabaseOperations(session).get_teacher_groups(call.from_user.id)
+            if ctx.payload.a not in {group.id for group, _ in groups}:
+                bot.answer_callback_query(call.id, "Группа не найдена")
+                return
+            
+            if ctx.payload.a in selected_groups:
+                selected_groups.remove(ctx.payload.a)
+            else:
+                selected_groups.append(ctx.payload.a)
+            
+            bot.edit_message_reply_markup(
                 call.message.chat.id,
-                call.message.message_id
+                call.message.message_id,
+                reply_markup=get_groups_keyboard(groups, selected_groups)
             )
+            bot.answer_callback_query(call.id)
+        except Exception as e:
+            logger.error(f"Ошибка при выборе группы: {e}", exc_info=True)
+            bot.answer_callback_query(call.id, "Произошла ошибка при выборе группы")
+
+    @router.callback(OP_LAUNCH, role=ROLE_TEACHER, state=TeacherStates.waiting_for_test_groups)
+    def handle_launch(call, ctx):
+        try:
+            teacher_data = state_storage.data.get(call.from_user.id, {}).get(call.from_user.id, {})
+            data = teacher_data.get('data', {})
+            selected_sections = data.get('selected_sections', [])
+            selected_groups = data.get('selected_groups', [])
             
+            db_ops = DatabaseOperations(session)
+            if ctx.payload.a == LAUNCH_ALL:
+                launch_test(call, selected_sections, db_ops.get_students(), "всех студентов")
+                return
+            if not selected_groups:
+                bot.answer_callback_query(call.id, "Не выбрано ни одной группы!")
+                return
+            students = db_ops.get_group_students(selected_groups)
+            launch_test(call, selected_sections, students, f"выбранных групп: {len(selected_groups)}")
         except Exception as e:
-            logger.error(f"Ошибка при подтверждении разделов: {e}")
+            logger.error(f"Ошибка при запуске тестирования: {e}", exc_info=True)
             bot.answer_callback_query(call.id, "Произошла ошибка при запуске тестирования")
 
     # Обработчик для выбора разделов при запуске тестирования
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('section_') and str(bot.get_state(call.from_user.id, call.message.chat.id)) == str(TeacherStates.waiting_for_test_sections))
-    def handle_test_section_choice(call):
+    @router.callback(OP_SECTION, role=ROLE_TEACHER, state=TeacherStates.waiting_for_test_sections)
+    def handle_test_section_choice(call, ctx):
         try:
-            section = call.data.split('_')[1]
-            logger.info(f"Выбран раздел для тестирования: {section}")
-            logger.info(f"Текущее состояние: {bot.get_state(call.from_user.id, call.message.chat.id)}")
+            section = section_ids.name_for(ctx.payload)
+            if section is None:
+                bot.answer_callback_query(call.id, "Кнопка устарела, запустите тестирование заново")
+                return
+            logger.info(f"Выбран раздел для тестирования: {section}, состояние: {ctx.state}")
             
             # Получаем или создаем данные учителя
             if call.from_user.id not in state_storage.data:
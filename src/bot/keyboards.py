@@ -1,10 +1,14 @@
 from telebot.types import ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton
+from src.bot.callback_codec import LAUNCH_ALL, LAUNCH_GROUPS, OP_CONFIRM_SECTIONS, OP_GROUP, OP_LAUNCH, encode, section_ids
 
 def get_teacher_main_menu():
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
     keyboard.add('📝 Создать вопрос')
     keyboard.add('📊 Просмотр вопросов', '🎥 Загрузить видео')
     keyboard.add('▶️ Запустить тестирование', '📈 Рейтинг студентов')
+    keyboard.add('📥 Импорт вопросов', '📤 Экспорт вопросов')
+    keyboard.add('📉 Статистика вопросов', '⏱ Время ответов')
+    keyboard.add('👥 Группы')
     keyboard.add('🔄 Сбросить состояния')
     return keyboard
 
@@ -43,11 +47,33 @@ def get_sections_keyboard(sections, selected_sections=None):
         button_text = f"{'✅ ' if section in selected_sections else ''}{section}"
         markup.add(InlineKeyboardButton(
             button_text,
-            callback_data=f"section_{section}"
+            callback_data=section_ids.encode(section)
         ))
     
     # Добавляем кнопку подтверждения
     if selected_sections:
-        markup.add(InlineKeyboardButton("✅ Подтвердить выбор", callback_data="confirm_sections"))
+        markup.add(InlineKeyboardButton("✅ Подтвердить выбор", callback_data=encode(OP_CONFIRM_SECTIONS)))
     
-    return markup
\ No newline at end of file
+    return markup
+
+def get_groups_keyboard(groups, selected_groups=None):
+    """
+    Создает клавиатуру выбора групп для запуска тестирования.
+    
+    :param groups: список пар (группа, число участников)
+    :param selected_groups: список id выбранных групп
+    :return: InlineKeyboardMarkup
+    """
+    if selected_groups is None:
+        selected_groups = []
+    
+    markup = InlineKeyboardMarkup()
+    for group, members in groups:
+        button_text = f"{'✅ ' if group.id in selected_groups else ''}{group.name} ({members})"
+        markup.add(InlineKeyboardButton(button_text, callback_data=encode(OP_GROUP, a=group.id)))
+    
+    if selected_groups:
+        markup.add(InlineKeyboardButton("🚀 Запустить для выбранных групп", callback_data=encode(OP_LAUNCH, a=LAUNCH_GROUPS)))
+    markup.add(InlineKeyboardButton("📢 Всем студентам", callback_data=encode(OP_LAUNCH, a=LAUNCH_ALL)))
+    
+    return markup
@@ -0,0 +1,153 @@
+from src.bot.callback_codec import decode
+from src.database.models import db_session
+from src.utils.logger import logger
+from src.utils.metrics import observe_handler
+from src.utils.profiler import profiler
+from typing import Callable, Dict, Optional, Tuple
+import time
+
+ANY = None
+
+MESSAGE_CONTENT_TYPES = ['text', 'video', 'document', 'contact']
+
+
+class UpdateContext:
+    """Данные обновления, вычисляемые один раз и общие для всех обработчиков"""
+
+    __slots__ = ('user_id', 'chat_id', 'role', 'state', 'payload')
+
+    def __init__(self, user_id: int, chat_id: int, role: str, state: Optional[str], payload=None):
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.role = role
+        self.state = state
+        self.payload = payload
+
+    def __repr__(self):
+        return f"UpdateContext(user_id={self.user_id}, role={self.role}, state={self.state})"
+
+
+class Router:
+    """
+    Табличная маршрутизация обновлений.
+
+    Вместо цепочки обработчиков telebot с фильтрами-лямбдами регистрируются
+    всего два обработчика (сообщения и callback-запросы), а нужная функция
+    выбирается поиском в словарях по (тип обновления, ключ, роль, состояние).
+    Роль пользователя и его состояние определяются один раз на обновление и
+    передаются обработчику в UpdateContext.
+
+    Callback-запросы маршрутизируются по коду операции из callback_data
+    (см. callback_codec), распакованные данные кнопки доступны в ctx.payload.
+
+    Порядок поиска для сообщений: команда, кнопка меню (точный текст),
+    текущее состояние. Для каждого ключа сначала ищется обработчик для роли
+    пользователя, затем для любой роли (ANY).
+    """
+
+    def __init__(self, role_resolver: Callable[[int], str]):
+        self.role_resolver = role_resolver
+        self._commands: Dict[Tuple[str, Optional[str]], Callable] = {}
+        self._texts: Dict[Tuple[str, Optional[str]], Callable] = {}
+        self._states: Dict[Tuple[str, Optional[str]], Callable] = {}
+        self._callbacks: Dict[Tuple[int, Optional[str], Optional[str]], Callable] = {}
+        self.bot = None
+
+    # Регистрация
+
+    def command(self, name: str, role: Optional[str] = ANY):
+        return self._register(self._commands, (name, role))
+
+    def text(self, text: str, role: Optional[str] = ANY):
+        return self._register(self._texts, (text, role))
+
+    def state(self, state, role: Optional[str] = ANY):
+        return self._register(self._states, (str(state), role))
+
+    def callback(self, key: int, role: Optional[str] = ANY, state=ANY):
+        return self._register(self._callbacks, (key, role, str(state) if state is not None else None))
+
+    @staticmethod
+    def _register(table, key):
+        def decorator(handler):
+            if key in table:
+                raise ValueError(f"Обработчик для {key} уже зарегистрирован")
+            table[key] = handler
+            return handler
+        return decorator
+
+    def attach(self, bot):
+        """Подключает маршрутизатор к боту"""
+        self.bot = bot
+        bot.message_handler(func=lambda message: True, content_types=MESSAGE_CONTENT_TYPES)(self.dispatch_message)
+        bot.callback_query_handler(func=lambda call: True)(self.dispatch_callback)
+
+    # Диспетчеризация
+
+    def _context(self, user_id: int, chat_id: int) -> UpdateContext:
+        state = self.bot.get_state(user_id, chat_id) if self.bot is not None else None
+        return UpdateContext(user_id, chat_id, self.role_resolver(user_id), str(state) if state else None)
+
+    def resolve_message(self, message, ctx: UpdateContext) -> Optional[Callable]:
+        role = ctx.role
+        text = message.text if message.content_type == 'text' else None
+        if text and text.startswith('/'):
+            command = text[1:].split(maxsplit=1)[0].split('@', 1)[0] if len(text) > 1 else ''
+            handler = self._commands.get((command, role)) or self._commands.get((command, ANY))
+            if handler:
+                return handler
+        if text:
+            handler = self._texts.get((text, role)) or self._texts.get((text, ANY))
+            if handler:
+                return handler
+        if ctx.state:
+            return self._states.get((ctx.state, role)) or self._states.get((ctx.state, ANY))
+        return None
+
+    def resolve_callback(self, call, ctx: UpdateContext) -> Optional[Callable]:
+        ctx.payload = decode(call.data)
+        if ctx.payload is None:
+            return None
+        key, role, state = ctx.payload.opcode, ctx.role, ctx.state
+        callbacks = self._callbacks
+        return (
+            callbacks.get((key, role, state))
+            or callbacks.get((key, role, ANY))
+            or callbacks.get((key, ANY, state))
+            or callbacks.get((key, ANY, ANY))
+        )
+
+    def dispatch_message(self, message):
+        try:
+            ctx = self._context(message.from_user.id, message.chat.id)
+            handler = self.resolve_message(message, ctx)
+            if handler is None:
+                logger.debug(f"Нет обработчика для сообщения типа {message.content_type}, {ctx}")
+                return
+            self._call(handler, message, ctx, 'message')
+        finally:
+            # Сессия базы данных потока не должна держать соединение между обновлениями
+            db_session.remove()
+
+    def dispatch_callback(self, call):
+        try:
+            ctx = self._context(call.from_user.id, call.message.chat.id)
+            handler = self.resolve_callback(call, ctx)
+            if handler is None:
+                logger.warning(f"Нет обработчика для callback {call.data}, {ctx}")
+                self.bot.answer_callback_query(call.id, "Кнопка устарела")
+                return
+            self._call(handler, call, ctx, 'callback')
+        finally:
+            db_session.remove()
+
+    @staticmethod
+    def _call(handler, update, ctx, kind):
+        started = time.perf_counter()
+        try:
+            profiler.call(handler, update, ctx)
+        except Exception as e:
+            logger.error(f"Ошибка в обработчике {handler.__name__}: {e}", exc_info=True)
+            observe_handler(kind, handler.__name__, started, error=True)
+            return
+        observe_handler(kind, handler.__name__, started)
@@ -12,4 +12,6 @@ class TeacherStates(StatesGroup):
     waiting_for_section = State()
     waiting_for_video = State()
     waiting_for_video_criteria = State()
-    waiting_for_test_sections = State() 
\ No newline at end of file
+    waiting_for_test_sections = State()
+    waiting_for_import_file = State()
+    waiting_for_test_groups = State() 
\ No newline at end of file
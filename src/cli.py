@@ -0,0 +1,131 @@
+"""
+Командная строка для обслуживания бота.
+
+Примеры:
+    python -m src.cli import-questions bank.csv
+    python -m src.cli export-questions bank.jsonl --section "Алгебра"
+    python -m src.cli rebuild-scores
+    python -m src.cli maintenance --retention-days 180
+    python -m src.cli seed --students 10000 --answers-per-student 100
+    python -m src.cli init-teachers teachers.csv
+"""
+from dotenv import load_dotenv
+from src.database.maintenance import ANSWERS_RETENTION_DAYS, drop_expired_answers, ensure_answer_partitions, roll_up_answers
+from src.database.models import init_db
+from src.database.operations import DatabaseOperations
+from src.database.seed import seed_database
+from src.utils.logger import setup_logger
+from src.utils.question_io import detect_format, export_questions, import_questions
+import argparse
+import sys
+import time
+
+load_dotenv()
+
+
+def cmd_import_questions(db_ops, args):
+    fmt = args.format or detect_format(args.path)
+    with open(args.path, encoding='utf-8-sig', newline='') as stream:
+        result = import_questions(db_ops, stream, fmt, batch_size=args.batch_size)
+    print(f"Импортировано вопросов: {result.imported}")
+    for error in result.errors:
+        print(error, file=sys.stderr)
+    if result.error_count > len(result.errors):
+        print(f"... и еще {result.error_count - len(result.errors)} ошибок", file=sys.stderr)
+    return 1 if result.error_count else 0
+
+
+def cmd_export_questions(db_ops, args):
+    fmt = args.format or detect_format(args.path)
+    with open(args.path, 'w', encoding='utf-8', newline='') as out:
+        count = export_questions(db_ops, out, fmt, section=args.section)
+    print(f"Выгружено вопросов: {count}")
+    return 0
+
+
+def cmd_rebuild_scores(db_ops, args):
+    started = time.perf_counter()
+    backfilled, rebuilt = db_ops.rebuild_scores()
+    print(f"Добавлено начислений: {backfilled}")
+    print(f"Строк рейтинга: {rebuilt} ({time.perf_counter() - started:.2f} с)")
+    return 0
+
+
+def cmd_maintenance(db_ops, args):
+    created = ensure_answer_partitions(db_ops.session)
+    days = roll_up_answers(db_ops.session)
+    removed = drop_expired_answers(db_ops.session, retention_days=args.retention_days)
+    print(f"Создано секций: {len(created)}")
+    print(f"Свернуто дней: {days}")
+    print(f"Удалено секций/строк ответов: {removed}")
+    return 0
+
+
+def cmd_init_teachers(db_ops, args):
+    changed = db_ops.init_teachers(roster_path=args.roster)
+    print(f"Создано или назначено преподавателей: {changed}")
+    return 0
+
+
+def cmd_seed(db_ops, args):
+    started = time.perf_counter()
+    counts = seed_database(
+        db_ops, sections=args.sections, questions_per_section=args.questions_per_section, options=args.options,
+        students=args.students, answers_per_student=args.answers_per_student, days=args.days, seed=args.seed
+    )
+    print(f"Вопросов: {counts['questions']}, студентов: {counts['students']}, "
+          f"ответов: {counts['answers']}, строк рейтинга: {counts['scores']} "
+          f"({time.perf_counter() - started:.2f} с)")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='Обслуживание Telegram Quiz Bot')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import-questions', help='импорт банка вопросов из CSV/JSONL')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'])
+    import_parser.add_argument('--batch-size', type=int, default=500)
+    import_parser.set_defaults(handler=cmd_import_questions)
+
+    export_parser = subparsers.add_parser('export-questions', help='выгрузка банка вопросов в CSV/JSONL')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--format', choices=['csv', 'jsonl'])
+    export_parser.add_argument('--section')
+    export_parser.set_defaults(handler=cmd_export_questions)
+
+    rebuild_parser = subparsers.add_parser('rebuild-scores', help='пересчет рейтинга из журнала начислений')
+    rebuild_parser.set_defaults(handler=cmd_rebuild_scores)
+
+    maintenance_parser = subparsers.add_parser('maintenance', help='секции, дневные итоги и срок хранения ответов')
+    maintenance_parser.add_argument('--retention-days', type=int, default=ANSWERS_RETENTION_DAYS,
+                                    help='срок хранения сырых ответов (0 - хранить всегда)')
+    maintenance_parser.set_defaults(handler=cmd_maintenance)
+
+    teachers_parser = subparsers.add_parser('init-teachers', help='преподаватели из ADMIN_USER_IDS и CSV-списка')
+    teachers_parser.add_argument('roster', nargs='?', help='CSV telegram_id[,фамилия,имя] (по умолчанию TEACHERS_FILE)')
+    teachers_parser.set_defaults(handler=cmd_init_teachers)
+
+    seed_parser = subparsers.add_parser('seed', help='синтетические данные для нагрузочных проверок')
+    seed_parser.add_argument('--sections', type=int, default=5)
+    seed_parser.add_argument('--questions-per-section', type=int, default=200)
+    seed_parser.add_argument('--options', type=int, default=4)
+    seed_parser.add_argument('--students', type=int, default=500)
+    seed_parser.add_argument('--answers-per-student', type=int, default=50)
+    seed_parser.add_argument('--days', type=int, default=90, help='за сколько дней распределить ответы')
+    seed_parser.add_argument('--seed', type=int, default=1, help='начальное значение генератора')
+    seed_parser.set_defaults(handler=cmd_seed)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logger()
+    db_ops = DatabaseOperations(init_db())
+    return args.handler(db_ops, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Периодическое обслуживание таблицы ответов.
+
+    - создание секций answers на месяцы вперед (PostgreSQL);
+    - свертка завершившихся дней в дневные итоги по студентам и вопросам;
+    - удаление сырых ответов старше срока хранения, но только уже свернутых.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import case, delete, func, insert, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+from src.database import partitions
+from src.database.migrations import PARTITIONS_AHEAD
+from src.database.models import Answer, DailyQuestionStats, DailyStudentStats, RollupWatermark
+from src.utils.exceptions import DatabaseError
+from src.utils.logger import logger
+from typing import Optional
+import os
+import threading
+import time
+
+# Срок хранения сырых ответов в днях (0 - хранить всегда)
+ANSWERS_RETENTION_DAYS = int(os.getenv('ANSWERS_RETENTION_DAYS', '365'))
+MAINTENANCE_INTERVAL = float(os.getenv('MAINTENANCE_INTERVAL', '3600'))
+# День сворачивается не раньше, чем через ROLLUP_GRACE после его окончания
+ROLLUP_GRACE = timedelta(hours=1)
+ANSWERS_WATERMARK = 'answers'
+
+
+def _day_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def ensure_answer_partitions(session, now: Optional[datetime] = None):
+    """Создает секции answers на PARTITIONS_AHEAD месяцев вперед"""
+    connection = session.connection()
+    if not partitions.is_partitioned(connection):
+        return []
+    now = now or datetime.utcnow()
+    created = partitions.ensure_partitions(connection, now, now, PARTITIONS_AHEAD)
+    session.commit()
+    if created:
+        logger.info(f"Созданы секции ответов: {', '.join(created)}")
+    return created
+
+
+def roll_up_answers(session, now: Optional[datetime] = None) -> int:
+    """
+    Сворачивает ответы завершившихся дней в дневные итоги.
+
+    Обрабатываются только дни между водяным знаком и началом текущего дня,
+    поэтому каждый день сворачивается ровно один раз. Итоги и новое значение
+    водяного знака записываются в одной транзакции.
+
+    Returns:
+        int: Количество свернутых дней
+    """
+    now = now or datetime.utcnow()
+    until = _day_start(now - ROLLUP_GRACE)
+    watermark = session.get(RollupWatermark, ANSWERS_WATERMARK)
+    if watermark is None:
+        first = session.scalar(select(func.min(Answer.created_at)))
+        if first is None:
+            return 0
+        watermark = RollupWatermark(name=ANSWERS_WATERMARK, rolled_up_to=_day_start(first))
+        session.add(watermark)
+    start = watermark.rolled_up_to
+    if start >= until:
+        return 0
+
+    day = func.date(Answer.created_at)
+    correct = func.sum(case((Answer.is_correct.is_(True), 1), else_=0))
+    in_range = (Answer.created_at >= start, Answer.created_at < until)
+    session.execute(insert(DailyStudentStats).from_select(
+        ['day', 'user_id', 'attempts', 'correct'],
+        select(day, Answer.user_id, func.count(), correct).where(*in_range).group_by(day, Answer.user_id)
+    ))
+    session.execute(insert(DailyQuestionStats).from_select(
+        ['day', 'question_id', 'attempts', 'correct'],
+        select(day, Answer.question_id, func.count(), correct).where(*in_range).group_by(day, Answer.question_id)
+    ))
+    watermark.rolled_up_to = until
+    session.commit()
+    days = (until - start).days
+    logger.info(f"Ответы свернуты в дневные итоги: {days} дн. до {until.date()}")
+    return days
+
+
+def drop_expired_answers(session, retention_days: int = ANSWERS_RETENTION_DAYS,
+                         now: Optional[datetime] = None) -> int:
+    """
+    Удаляет сырые ответы старше срока хранения, уже свернутые в итоги.
+
+    В PostgreSQL секции удаляются целиком (DROP TABLE), в остальных СУБД
+    строки удаляются DELETE. Возвращает число удаленных секций или строк.
+    """
+    if not retention_days:
+        return 0
+    watermark = session.get(RollupWatermark, ANSWERS_WATERMARK)
+    if watermark is None:
+        return 0
+    now = now or datetime.utcnow()
+    bound = min(_day_start(now - timedelta(days=retention_days)), watermark.rolled_up_to)
+
+    connection = session.connection()
+    if partitions.is_partitioned(connection):
+        dropped = partitions.drop_partitions_before(connection, bound)
+        # Строки вне помесячных секций попадают в секцию по умолчанию и удаляются построчно
+        connection.execute(
+            text(f"DELETE FROM {partitions.DEFAULT_PARTITION} WHERE created_at < :bound"),
+            {'bound': bound}
+        )
+        session.commit()
+        if dropped:
+            logger.info(f"Удалены секции ответов: {', '.join(dropped)}")
+        return len(dropped)
+
+    deleted = session.execute(delete(Answer).where(Answer.created_at < bound)).rowcount
+    session.commit()
+    if deleted:
+        logger.info(f"Удалено ответов старше {bound.date()}: {deleted}")
+    return deleted
+
+
+def run_maintenance(session, now: Optional[datetime] = None):
+    """Выполняет все шаги обслуживания"""
+    try:
+        ensure_answer_partitions(session, now)
+        roll_up_answers(session, now)
+        drop_expired_answers(session, now=now)
+    except SQLAlchemyError as e:
+        logger.error(f"Ошибка обслуживания таблицы ответов: {e}")
+        session.rollback()
+        raise DatabaseError("Ошибка обслуживания таблицы ответов")
+
+
+def start_maintenance(bind, interval: float = MAINTENANCE_INTERVAL) -> threading.Thread:
+    """Запускает фоновый поток обслуживания с отдельной сессией базы данных"""
+    session = sessionmaker(bind=bind)()
+
+    def run():
+        while True:
+            try:
+                run_maintenance(session)
+            except Exception as e:
+                logger.error(f"Ошибка фонового обслуживания: {e}", exc_info=True)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='db-maintenance', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,105 @@
+"""
+Обновление схемы существующей базы данных.
+
+Base.metadata.create_all создает только отсутствующие таблицы, поэтому
+изменения уже созданных таблиц выполняются здесь. Каждый шаг проверяет
+текущее состояние схемы и может безопасно выполняться при каждом запуске.
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+from src.database import partitions
+from src.utils.logger import logger
+import os
+
+# Сколько месяцев вперед заранее создаются секции answers
+PARTITIONS_AHEAD = int(os.getenv('ANSWER_PARTITIONS_AHEAD', '2'))
+
+
+def upgrade_schema(engine):
+    """Приводит схему базы к текущей версии моделей"""
+    with engine.begin() as connection:
+        add_missing_columns(connection, 'answers', {
+            'question_sent_at': 'TIMESTAMP',
+            'answered_at': 'TIMESTAMP',
+        })
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_answers_user_id ON answers (user_id)"))
+        ensure_unique_scores(connection)
+        if connection.dialect.name == 'postgresql':
+            # Журнал начислений не ссылается на answers: старые секции ответов удаляются,
+            # а начисления остаются для пересчета рейтинга
+            connection.execute(text(
+                "ALTER TABLE score_events DROP CONSTRAINT IF EXISTS score_events_answer_id_fkey"
+            ))
+            if not partitions.is_partitioned(connection):
+                partition_answers(connection)
+
+
+def add_missing_columns(connection, table: str, columns):
+    """Добавляет в таблицу отсутствующие колонки (для секционированной таблицы - во все секции)"""
+    existing = {column['name'] for column in inspect(connection).get_columns(table)}
+    for name, column_type in columns.items():
+        if name not in existing:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+            logger.info(f"В таблицу {table} добавлена колонка {name}")
+
+
+def ensure_unique_scores(connection):
+    """
+    Делает пару (user_id, section) в scores уникальной.
+
+    В базах, созданных до ограничения, параллельные первые начисления могли
+    создать несколько строк на пару; каждая получала свою часть баллов,
+    поэтому они сливаются в одну строку с суммой баллов.
+    """
+    inspector = inspect(connection)
+    unique = [constraint['column_names'] for constraint in inspector.get_unique_constraints('scores')]
+    unique += [index['column_names'] for index in inspector.get_indexes('scores') if index.get('unique')]
+    if any(sorted(columns) == ['section', 'user_id'] for columns in unique):
+        return
+
+    merged = connection.execute(text("""
+        UPDATE scores SET points = (
+            SELECT sum(duplicate.points) FROM scores AS duplicate
+            WHERE duplicate.user_id = scores.user_id AND duplicate.section = scores.section
+        )
+        WHERE id IN (SELECT min(id) FROM scores GROUP BY user_id, section HAVING count(*) > 1)
+    """)).rowcount
+    removed = connection.execute(text(
+        "DELETE FROM scores WHERE id NOT IN (SELECT min(id) FROM scores GROUP BY user_id, section)"
+    )).rowcount
+    connection.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_scores_user_section ON scores (user_id, section)"))
+    logger.info(f"Рейтинг: объединено пар с повторами {merged}, удалено строк {removed}, добавлен уникальный индекс")
+
+
+def partition_answers(connection):
+    """
+    Переносит обычную таблицу answers в таблицу, секционированную по created_at.
+
+    Новая таблица создается по образцу старой (те же колонки и значения по
+    умолчанию, та же последовательность id), первичный ключ становится
+    составным (id, created_at), как требует секционирование.
+    """
+    logger.info("Секционирование таблицы answers по created_at")
+    connection.execute(text("LOCK TABLE answers IN ACCESS EXCLUSIVE MODE"))
+    connection.execute(text("UPDATE answers SET created_at = now() WHERE created_at IS NULL"))
+    since = connection.execute(text("SELECT min(created_at) FROM answers")).scalar()
+
+    connection.execute(text("ALTER TABLE answers RENAME TO answers_legacy"))
+    connection.execute(text("ALTER TABLE answers_legacy RENAME CONSTRAINT answers_pkey TO answers_legacy_pkey"))
+    connection.execute(text("ALTER INDEX IF EXISTS ix_answers_user_id RENAME TO ix_answers_legacy_user_id"))
+    connection.execute(text(
+        "CREATE TABLE answers (LIKE answers_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    ))
+    connection.execute(text("ALTER TABLE answers ALTER COLUMN created_at SET NOT NULL"))
+    connection.execute(text("ALTER TABLE answers ADD PRIMARY KEY (id, created_at)"))
+    connection.execute(text("ALTER TABLE answers ADD FOREIGN KEY (user_id) REFERENCES users (id)"))
+    connection.execute(text("ALTER TABLE answers ADD FOREIGN KEY (question_id) REFERENCES questions (id)"))
+    connection.execute(text("ALTER SEQUENCE IF EXISTS answers_id_seq OWNED BY answers.id"))
+    connection.execute(text(f"CREATE TABLE {partitions.DEFAULT_PARTITION} PARTITION OF answers DEFAULT"))
+
+    now = datetime.utcnow()
+    partitions.ensure_partitions(connection, since or now, now, PARTITIONS_AHEAD)
+    connection.execute(text("INSERT INTO answers SELECT * FROM answers_legacy"))
+    connection.execute(text("DROP TABLE answers_legacy"))
+    connection.execute(text("CREATE INDEX ix_answers_user_id ON answers (user_id)"))
+    logger.info("Таблица answers секционирована")
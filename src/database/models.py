@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Boolean, DateTime, Float
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Boolean, Date, DateTime, Float, Index, JSON, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship, scoped_session, sessionmaker
+from src.database.migrations import upgrade_schema
 import os
+import threading
 from datetime import datetime
 
 Base = declarative_base()
@@ -21,6 +23,26 @@ class User(Base):
     answers = relationship("Answer", back_populates="user")
     scores = relationship("Score", back_populates="user")
 
+class Group(Base):
+    # Учебная группа преподавателя; студенты вступают в нее по коду
+    __tablename__ = 'groups'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    owner_id = Column(Integer, ForeignKey('users.id'), index=True)
+    join_code = Column(String, unique=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Связи
+    owner = relationship("User")
+
+class GroupMember(Base):
+    __tablename__ = 'group_members'
+    
+    group_id = Column(Integer, ForeignKey('groups.id'), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True, index=True)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+
 class Question(Base):
     __tablename__ = 'questions'
     
@@ -45,13 +67,16 @@ class AnswerOption(Base):
     question = relationship("Question", back_populates="answers_options")
 
 class Answer(Base):
+    # В PostgreSQL таблица секционирована по created_at (см. migrations, partitions)
     __tablename__ = 'answers'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     question_id = Column(Integer, ForeignKey('questions.id'))
     answer_option_id = Column(Integer)
     is_correct = Column(Boolean)
+    question_sent_at = Column(DateTime)  # когда вопрос был доставлен студенту
+    answered_at = Column(DateTime)  # когда бот получил нажатие кнопки
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Связи
@@ -60,6 +85,7 @@ class Answer(Base):
 
 class Score(Base):
     __tablename__ = 'scores'
+    __table_args__ = (UniqueConstraint('user_id', 'section'),)
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -69,6 +95,110 @@ class Score(Base):
     # Связи
     user = relationship("User", back_populates="scores")
 
+class ScoreEvent(Base):
+    # Журнал начислений баллов: одна запись на засчитанный ответ, только добавление.
+    # Таблица scores - агрегат этого журнала и может быть пересчитана из него
+    __tablename__ = 'score_events'
+    
+    id = Column(Integer, primary_key=True)
+    answer_id = Column(Integer, unique=True)  # без внешнего ключа: старые ответы удаляются
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
+    section = Column(String)
+    points = Column(Float, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class QuestionStats(Base):
+    # Счетчики ответов на вопрос, обновляются при каждой записи ответа
+    __tablename__ = 'question_stats'
+    
+    question_id = Column(Integer, ForeignKey('questions.id'), primary_key=True)
+    attempts = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    timed_attempts = Column(Integer, default=0)  # ответы с известным временем ответа
+    response_ms_total = Column(Float, default=0)
+
+class OptionStats(Base):
+    # Сколько раз выбирали вариант ответа
+    __tablename__ = 'option_stats'
+    
+    answer_option_id = Column(Integer, ForeignKey('answer_options.id'), primary_key=True)
+    question_id = Column(Integer, ForeignKey('questions.id'), index=True)
+    picks = Column(Integer, default=0)
+
+class LatencyBucket(Base):
+    # Корзины гистограмм времени на обдумывание (см. LatencyStats), обновляются при записи ответа
+    __tablename__ = 'latency_buckets'
+    
+    scope = Column(String, primary_key=True)  # 'question', 'student'
+    key = Column(Integer, primary_key=True)  # id вопроса или пользователя
+    bucket = Column(Integer, primary_key=True)  # индекс корзины Histogram
+    count = Column(Integer, default=0)
+
+class DailyStudentStats(Base):
+    # Дневные итоги ответов студента, заполняются из answers инкрементально
+    __tablename__ = 'daily_student_stats'
+    
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    attempts = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+
+class DailyQuestionStats(Base):
+    # Дневные итоги ответов на вопрос
+    __tablename__ = 'daily_question_stats'
+    
+    day = Column(Date, primary_key=True)
+    question_id = Column(Integer, ForeignKey('questions.id'), primary_key=True)
+    attempts = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+
+class RollupWatermark(Base):
+    # Граница, до которой ответы уже свернуты в дневные итоги
+    __tablename__ = 'rollup_watermarks'
+    
+    name = Column(String, primary_key=True)
+    rolled_up_to = Column(DateTime)
+
+# Статусы получателей рассылки запуска тестирования
+RECIPIENT_PENDING = 'pending'
+RECIPIENT_CLAIMED = 'claimed'
+RECIPIENT_SENT = 'sent'
+RECIPIENT_FAILED = 'failed'
+
+class LaunchJob(Base):
+    # Запуск тестирования: рассылка первого вопроса переживает перезапуск бота
+    __tablename__ = 'launch_jobs'
+    
+    id = Column(Integer, primary_key=True)
+    teacher_id = Column(Integer, index=True)  # telegram_id преподавателя
+    chat_id = Column(Integer)
+    message_id = Column(Integer)
+    sections = Column(JSON)
+    epoch = Column(Integer)
+    time_limit = Column(Integer)
+    audience = Column(String)
+    total = Column(Integer)
+    status = Column(String, default='running')  # 'running', 'done'
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+class LaunchRecipient(Base):
+    # Получатель запуска; available_at - когда строку можно забрать (аренда или пауза перед повтором)
+    __tablename__ = 'launch_recipients'
+    __table_args__ = (
+        UniqueConstraint('job_id', 'user_id'),
+        Index('ix_launch_recipients_status_available', 'status', 'available_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey('launch_jobs.id'), index=True)
+    user_id = Column(Integer)  # telegram_id студента
+    status = Column(String, default=RECIPIENT_PENDING)
+    attempts = Column(Integer, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow)
+    error = Column(String)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class Video(Base):
     __tablename__ = 'videos'
     
@@ -77,7 +207,35 @@ class Video(Base):
     criteria = Column(String)  # 'success', 'partial', 'failure'
     created_at = Column(DateTime, default=datetime.utcnow)
 
+_engine = None
+_schema_ready = False
+_init_lock = threading.Lock()
+
+def get_engine():
+    """
+    Движок базы данных процесса.
+
+    Создается при первом обращении, тогда же один раз проверяется и
+    обновляется схема (create_all и upgrade_schema). Процессы-обработчики
+    супервизора получают DATABASE_SCHEMA_READY=1 и проверку пропускают.
+    """
+    global _engine, _schema_ready
+    if _engine is not None and _schema_ready:
+        return _engine
+    with _init_lock:
+        if _engine is None:
+            _engine = create_engine(os.getenv('DATABASE_URL'))
+        if not _schema_ready:
+            if os.getenv('DATABASE_SCHEMA_READY') != '1':
+                Base.metadata.create_all(_engine)
+                upgrade_schema(_engine)
+            _schema_ready = True
+    return _engine
+
 def init_db():
-    engine = create_engine(os.getenv('DATABASE_URL'))
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine)()
\ No newline at end of file
+    """Новая сессия базы данных на общем движке процесса"""
+    return sessionmaker(bind=get_engine())()
+
+# Сессия обработчиков бота: у каждого потока своя (пул обработки обновлений,
+# колесо таймеров, задачи процессов), соединение берется при первом запросе
+db_session = scoped_session(init_db)
\ No newline at end of file
@@ -1,11 +1,35 @@
-from src.database.models import User, Question, Answer, Score, Video, AnswerOption
+from src.database.models import (
+    User, Question, Answer, Score, ScoreEvent, Video, AnswerOption, QuestionStats, OptionStats, Group, GroupMember,
+    LatencyBucket, LaunchJob, LaunchRecipient, RECIPIENT_CLAIMED, RECIPIENT_FAILED, RECIPIENT_PENDING, RECIPIENT_SENT
+)
+from src.database.statements import (
+    OPTIONS_BY_QUESTION, QUESTIONS_BY_SECTION, SCORE_BY_USER_SECTION, SCORES_BY_TELEGRAM_ID, USER_BY_TELEGRAM_ID
+)
 from sqlalchemy.exc import SQLAlchemyError
 from src.utils.logger import logger
 from src.utils.exceptions import DatabaseError
-from typing import List, Optional
+from src.utils.role_cache import ROLE_STUDENT, ROLE_TEACHER, role_cache
+from src.utils.latency_stats import SCOPE_QUESTION, SCOPE_STUDENT, bucket_for
+from src.utils.cluster import cluster
+# Кэши процесса регистрируют в cluster задачи, которыми операции их обновляют
+from src.utils import question_pool, video_cache  # noqa: F401
+from src.utils.teacher_roster import load_teachers
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
 import os
+import secrets
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
+# Баллы за правильный ответ
+POINTS_PER_CORRECT = 1
+# Длина кода вступления в группу
+JOIN_CODE_LENGTH = 6
+# Строк в одном INSERT при инициализации преподавателей
+TEACHERS_BATCH_SIZE = 5000
+
 class DatabaseOperations:
     """
     Класс для работы с базой данных.
@@ -45,6 +69,7 @@ class DatabaseOperations:
             )
             self.session.add(user)
             self.session.commit()
+            role_cache.set(telegram_id, ROLE_TEACHER if is_teacher else ROLE_STUDENT)
             logger.info(f"Created new user: {telegram_id}")
             return user
         except SQLAlchemyError as e:
@@ -82,6 +107,8 @@ class DatabaseOperations:
                 self.session.add(answer)
 
             self.session.commit()
+            # Пулы вопросов ведет каждый процесс-обработчик
+            cluster.send('add_questions', None, section=section, question_ids=[question.id])
             logger.info(f"Created new question in section: {section}")
             return question
         except SQLAlchemyError as e:
@@ -89,6 +116,82 @@ class DatabaseOperations:
             self.session.rollback()
             raise DatabaseError("Ошибка при создании вопроса")
 
+    def bulk_create_questions(self, questions: List[Tuple[str, str, List[str]]]) -> int:
+        """
+        Создает пачку вопросов с вариантами ответов за одну транзакцию.
+
+        Вопросы и варианты ответов вставляются двумя bulk INSERT'ами
+        вместо отдельного INSERT и commit на каждый вопрос.
+
+        Args:
+            questions (List[Tuple[str, str, List[str]]]): Пары (текст, раздел, варианты ответов),
+                первый вариант ответа - правильный
+
+        Returns:
+            int: Количество созданных вопросов
+
+        Raises:
+            DatabaseError: При ошибке создания вопросов в базе данных
+        """
+        if not questions:
+            return 0
+        try:
+            question_ids = self.session.scalars(
+                insert(Question).returning(Question.id, sort_by_parameter_order=True),
+                [{'text': text, 'section': section} for text, section, _ in questions]
+            ).all()
+
+            self.session.execute(
+                insert(AnswerOption),
+                [
+                    {'question_id': question_id, 'text': answer_text, 'is_correct': i == 0}
+                    for question_id, (_, _, answers) in zip(question_ids, questions)
+                    for i, answer_text in enumerate(answers)
+                ]
+            )
+            self.session.commit()
+
+            by_section = {}
+            for question_id, (_, section, _) in zip(question_ids, questions):
+                by_section.setdefault(section, []).append(question_id)
+            for section, section_ids in by_section.items():
+                cluster.send('add_questions', None, section=section, question_ids=section_ids)
+            logger.info(f"Created {len(question_ids)} questions in bulk")
+            return len(question_ids)
+        except SQLAlchemyError as e:
+            logger.error(f"Error creating questions in bulk: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при импорте вопросов")
+
+    def iter_questions_with_options(self, section: Optional[str] = None,
+                                    batch_size: int = 1000) -> Iterator[Tuple[str, str, List[str]]]:
+        """
+        Потоково возвращает вопросы с вариантами ответов (правильный - первым).
+
+        Используется один запрос с JOIN, строки читаются пачками через yield_per.
+        """
+        try:
+            query = (
+                self.session.query(Question.id, Question.section, Question.text, AnswerOption.text)
+                .join(AnswerOption, AnswerOption.question_id == Question.id)
+                .order_by(Question.id, AnswerOption.is_correct.desc(), AnswerOption.id)
+            )
+            if section is not None:
+                query = query.filter(Question.section == section)
+
+            current_id, current = None, None
+            for question_id, question_section, question_text, option_text in query.yield_per(batch_size):
+                if question_id != current_id:
+                    if current is not None:
+                        yield current
+                    current_id, current = question_id, (question_section, question_text, [])
+                current[2].append(option_text)
+            if current is not None:
+                yield current
+        except SQLAlchemyError as e:
+            logger.error(f"Error exporting questions: {e}")
+            raise DatabaseError("Ошибка при выгрузке вопросов")
+
     def register_student(self, telegram_id: int, phone: str) -> User:
         """Регистрирует нового студента"""
         try:
@@ -115,88 +218,115 @@ class DatabaseOperations:
             logger.error(f"Error getting sections: {e}")
             raise DatabaseError("Ошибка при получении списка разделов")
 
-    def init_teachers(self):
-        """Инициализация преподавателей из переменной окружения"""
+    def init_teachers(self, roster_path: Optional[str] = None) -> int:
+        """
+        Инициализация преподавателей из ADMIN_USER_IDS и списка TEACHERS_FILE.
+
+        Все преподаватели создаются или получают роль преподавателя одним
+        INSERT ... ON CONFLICT (telegram_id) DO UPDATE в одной транзакции,
+        независимо от их числа. Имена из списка задаются только новым
+        пользователям, у существующих меняется лишь is_teacher.
+
+        Returns:
+            int: Число созданных пользователей и назначенных преподавателями
+        """
+        admin_ids = os.getenv('ADMIN_USER_IDS', '')
+        roster_path = roster_path or os.getenv('TEACHERS_FILE', '')
+        logger.info(f"Initializing teachers with IDs: {admin_ids}" + (f", roster: {roster_path}" if roster_path else ""))
+        teachers = load_teachers(admin_ids, roster_path)
+        if not teachers:
+            logger.warning("No ADMIN_USER_IDS found in environment variables")
+            return 0
+
         try:
-            admin_ids = os.getenv('ADMIN_USER_IDS', '')
-            logger.info(f"Initializing teachers with IDs: {admin_ids}")
-            
-            if not admin_ids:
-                logger.warning("No ADMIN_USER_IDS found in environment variables")
-                return
-
-            for admin_id in admin_ids.split(','):
-                if admin_id.strip():
-                    try:
-                        admin_id = int(admin_id.strip())
-                        user = self.session.query(User).filter_by(telegram_id=admin_id).first()
-                        
-                        if not user:
-                            logger.info(f"Creating new teacher with ID: {admin_id}")
-                            user = User(
-                                telegram_id=admin_id,
-                                first_name="Teacher",
-                                last_name="Admin",
-                                phone="",
-                                is_teacher=True
-                            )
-                            self.session.add(user)
-                            self.session.commit()
-                            logger.info(f"Successfully created teacher with ID: {admin_id}")
-                        elif not user.is_teacher:
-                            logger.info(f"Updating user {admin_id} to teacher status")
-                            user.is_teacher = True
-                            self.session.commit()
-                            logger.info(f"Successfully updated user {admin_id} to teacher status")
-                        else:
-                            logger.info(f"Teacher with ID {admin_id} already exists")
-                            
-                    except ValueError as ve:
-                        logger.error(f"Invalid admin ID format: {admin_id}, error: {ve}")
-                    except Exception as e:
-                        logger.error(f"Error processing admin ID {admin_id}: {e}")
-                        self.session.rollback()
-                        
-        except Exception as e:
+            changed = 0
+            for start in range(0, len(teachers), TEACHERS_BATCH_SIZE):
+                rows = [
+                    {'telegram_id': teacher.telegram_id, 'first_name': teacher.first_name or "Teacher",
+                     'last_name': teacher.last_name or "Admin", 'phone': "", 'is_teacher': True,
+                     'created_at': datetime.utcnow()}
+                    for teacher in teachers[start:start + TEACHERS_BATCH_SIZE]
+                ]
+                statement = self._upsert_insert(User).values(rows)
+                changed += self.session.execute(statement.on_conflict_do_update(
+                    index_elements=[User.telegram_id],
+                    set_={'is_teacher': True},
+                    where=User.is_teacher.isnot(True)
+                )).rowcount
+            self.session.commit()
+        except SQLAlchemyError as e:
             logger.error(f"Error in init_teachers: {e}")
             self.session.rollback()
-            raise
+            raise DatabaseError("Ошибка при инициализации преподавателей")
+
+        for teacher in teachers:
+            role_cache.set(teacher.telegram_id, ROLE_TEACHER)
+        logger.info(f"Преподавателей: {len(teachers)}, создано или назначено: {changed}")
+        return changed
+
+    def _upsert_insert(self, model):
+        """INSERT с поддержкой ON CONFLICT для диалекта текущей базы (PostgreSQL или SQLite)"""
+        if self.session.get_bind().dialect.name == 'sqlite':
+            return sqlite_insert(model)
+        return postgresql_insert(model)
 
     def get_user_scores(self, user_id: int) -> List[Score]:
         """Получает все баллы пользователя"""
         try:
-            user = self.session.query(User).filter_by(telegram_id=user_id).first()
-            if not user:
-                return []
-            return self.session.query(Score).filter_by(user_id=user.id).all()
+            return self.session.execute(SCORES_BY_TELEGRAM_ID, {'telegram_id': user_id}).scalars().all()
         except SQLAlchemyError as e:
             logger.error(f"Error getting user scores: {e}")
             raise DatabaseError("Ошибка при получении баллов пользователя")
 
-    def get_all_scores(self) -> List[Score]:
-        """Получает все баллы всех студентов"""
+    def get_all_scores(self, limit: Optional[int] = None) -> List[Score]:
+        """Получает все баллы всех студентов (или первые limit строк рейтинга)"""
         try:
-            scores = (
+            query = (
                 self.session.query(Score)
                 .join(User)
                 .order_by(User.last_name, User.first_name, Score.section)
-                .all()
             )
-            return scores
+            if limit is not None:
+                query = query.limit(limit)
+            return query.all()
         except SQLAlchemyError as e:
             logger.error(f"Error getting all scores: {e}")
             raise DatabaseError("Ошибка при получении рейтинга")
 
+    def iter_scores(self, name: Optional[str] = None, section: Optional[str] = None,
+                    batch_size: int = 1000) -> Iterator[Tuple[str, str, str, float]]:
+        """
+        Потоково возвращает строки рейтинга (фамилия, имя, раздел, баллы).
+
+        Строки читаются курсором на стороне сервера пачками по batch_size
+        (yield_per), поэтому память не зависит от размера рейтинга.
+
+        Args:
+            name (Optional[str]): Часть имени или фамилии студента
+            section (Optional[str]): Раздел
+            batch_size (int): Размер пачки
+        """
+        try:
+            query = (
+                self.session.query(User.last_name, User.first_name, Score.section, Score.points)
+                .join(User, User.id == Score.user_id)
+                .order_by(User.last_name, User.first_name, Score.section)
+            )
+            if name:
+                pattern = f"%{name}%"
+                query = query.filter(User.last_name.ilike(pattern) | User.first_name.ilike(pattern))
+            if section:
+                query = query.filter(Score.section == section)
+            for row in query.yield_per(batch_size):
+                yield tuple(row)
+        except SQLAlchemyError as e:
+            logger.error(f"Error exporting scores: {e}")
+            raise DatabaseError("Ошибка при выгрузке рейтинга")
+
     def get_questions_by_section(self, section: str) -> List[Question]:
         """Получает все вопросы из указанного раздела"""
         try:
-            questions = (
-                self.session.query(Question)
-                .filter_by(section=section)
-                .order_by(Question.id)
-                .all()
-            )
-            return questions
+            return self.session.execute(QUESTIONS_BY_SECTION, {'section': section}).scalars().all()
         except SQLAlchemyError as e:
             logger.error(f"Error getting questions by section: {e}")
             raise DatabaseError("Ошибка при получении вопросов")
@@ -222,6 +352,7 @@ class DatabaseOperations:
             )
             self.session.add(video)
             self.session.commit()
+            cluster.send('add_video', None, criteria=criteria, file_id=file_id)
             logger.info(f"Saved video with file_id: {file_id}, criteria: {criteria}")
             return video
         except SQLAlchemyError as e:
@@ -266,21 +397,29 @@ class DatabaseOperations:
             DatabaseError: При ошибке получения вариантов ответов
         """
         try:
-            answers = (
-                self.session.query(AnswerOption)
-                .filter_by(question_id=question_id)
-                .order_by(AnswerOption.id)  # Сохраняем порядок вариантов ответов
-                .all()
-            )
+            # Варианты упорядочены по id - в порядке создания
+            answers = self.session.execute(OPTIONS_BY_QUESTION, {'question_id': question_id}).scalars().all()
             logger.info(f"Retrieved {len(answers)} answer options for question {question_id}")
             return answers
         except SQLAlchemyError as e:
             logger.error(f"Error getting answer options for question {question_id}: {e}")
             raise DatabaseError("Ошибка при получении вариантов ответов")
 
-    def record_answer(self, student_id: int, question_id: int, answer_number: int, is_correct: bool) -> Answer:
+    def record_answer(self, student_id: int, question_id: int, answer_option_id: Optional[int], is_correct: bool,
+                      question_sent_at: Optional[datetime] = None, answered_at: Optional[datetime] = None) -> Answer:
         """
         Записывает ответ студента на вопрос в базу данных.
+
+        В той же транзакции обновляются баллы (для правильного ответа) и
+        счетчики статистики вопроса и выбранного варианта ответа.
+
+        Args:
+            student_id (int): Telegram ID студента
+            question_id (int): ID вопроса
+            answer_option_id (Optional[int]): ID выбранного варианта ответа (None - время истекло)
+            is_correct (bool): Правильный ли ответ
+            question_sent_at (Optional[datetime]): Когда вопрос был доставлен студенту (UTC)
+            answered_at (Optional[datetime]): Когда бот получил нажатие кнопки (UTC)
         """
         try:
             # Получаем объект User по telegram_id
@@ -302,21 +441,32 @@ class DatabaseOperations:
             answer = Answer(
                 user_id=user.id,
                 question_id=question_id,
-                answer_option_id=answer_number,  # Используем правильное имя поля
-                is_correct=is_correct
+                answer_option_id=answer_option_id,
+                is_correct=is_correct,
+                question_sent_at=question_sent_at,
+                answered_at=answered_at
             )
             self.session.add(answer)
-            self.session.commit()
-            logger.info(f"Записан ответ для студента {student_id}, вопрос {question_id}: {answer_number} (correct: {is_correct})")
+            response_ms = None
+            if question_sent_at and answered_at:
+                response_ms = (answered_at - question_sent_at).total_seconds() * 1000
+            self._add_question_stats(question_id, answer_option_id, is_correct, response_ms)
+            # Истекшее время на ответ - не время обдумывания
+            think_us = response_ms * 1000 if response_ms is not None and answer_option_id is not None else None
+            if think_us is not None:
+                self._add_latency_buckets(question_id, user.id, think_us)
             
-            # Если ответ правильный, обновляем счет
+            # Правильный ответ попадает в журнал начислений и в агрегат scores
+            # в той же транзакции, что и сам ответ
             if is_correct:
-                question = self.session.query(Question).get(question_id)
+                question = self.session.get(Question, question_id)
                 if question:
-                    current_score = self.get_user_score(user.id, question.section)
-                    new_score = current_score.points + 1 if current_score else 1
-                    self.update_or_create_score(user.id, question.section, new_score)
-                    logger.info(f"Обновлен счет пользователя {student_id} в разделе {question.section}: {new_score}")
+                    self.session.flush()
+                    self._add_score_event(answer, question.section, POINTS_PER_CORRECT)
+            self.session.commit()
+            logger.info(f"Записан ответ для студента {student_id}, вопрос {question_id}: {answer_option_id} (correct: {is_correct})")
+            if think_us is not None:
+                cluster.send('record_think', None, question_id=question_id, user_id=user.id, think_us=think_us)
             
             return answer
             
@@ -325,6 +475,154 @@ class DatabaseOperations:
             self.session.rollback()
             raise DatabaseError("Ошибка при записи ответа")
 
+    def _add_score_event(self, answer: Answer, section: str, points: float):
+        """Добавляет начисление в журнал и увеличивает агрегат баллов (без commit)"""
+        self.session.add(ScoreEvent(
+            answer_id=answer.id,
+            user_id=answer.user_id,
+            section=section,
+            points=points
+        ))
+        # Атомарное приращение одним оператором: первое начисление пары не гоняется
+        # с параллельным ответом того же студента (ON CONFLICT вместо UPDATE + INSERT)
+        statement = self._upsert_insert(Score).values(user_id=answer.user_id, section=section, points=points)
+        self.session.execute(statement.on_conflict_do_update(
+            index_elements=[Score.user_id, Score.section],
+            set_={'points': Score.points + statement.excluded.points}
+        ))
+
+    def _add_question_stats(self, question_id: int, answer_option_id: Optional[int], is_correct: bool,
+                            response_ms: Optional[float]):
+        """Увеличивает счетчики вопроса и выбранного варианта ответа (без commit)"""
+        timed = response_ms is not None
+        # Первые ответы класса на вопрос приходят одновременно, поэтому строка
+        # счетчиков создается или увеличивается одним оператором (ON CONFLICT)
+        statement = self._upsert_insert(QuestionStats).values(
+            question_id=question_id,
+            attempts=1,
+            correct=1 if is_correct else 0,
+            timed_attempts=1 if timed else 0,
+            response_ms_total=response_ms if timed else 0
+        )
+        self.session.execute(statement.on_conflict_do_update(
+            index_elements=[QuestionStats.question_id],
+            set_={
+                'attempts': QuestionStats.attempts + statement.excluded.attempts,
+                'correct': QuestionStats.correct + statement.excluded.correct,
+                'timed_attempts': QuestionStats.timed_attempts + statement.excluded.timed_attempts,
+                'response_ms_total': QuestionStats.response_ms_total + statement.excluded.response_ms_total,
+            }
+        ))
+
+        if answer_option_id is None:
+            # Время на ответ истекло, вариант не выбран
+            return
+        statement = self._upsert_insert(OptionStats).values(
+            answer_option_id=answer_option_id, question_id=question_id, picks=1
+        )
+        self.session.execute(statement.on_conflict_do_update(
+            index_elements=[OptionStats.answer_option_id],
+            set_={'picks': OptionStats.picks + statement.excluded.picks}
+        ))
+
+    def _add_latency_buckets(self, question_id: int, user_id: int, think_us: float):
+        """Увеличивает корзины гистограмм обдумывания вопроса и студента (без commit)"""
+        bucket = bucket_for(think_us)
+        statement = self._upsert_insert(LatencyBucket).values([
+            {'scope': SCOPE_QUESTION, 'key': question_id, 'bucket': bucket, 'count': 1},
+            {'scope': SCOPE_STUDENT, 'key': user_id, 'bucket': bucket, 'count': 1},
+        ])
+        self.session.execute(statement.on_conflict_do_update(
+            index_elements=[LatencyBucket.scope, LatencyBucket.key, LatencyBucket.bucket],
+            set_={'count': LatencyBucket.count + statement.excluded.count}
+        ))
+
+    def get_question_stats(self, section: Optional[str] = None,
+                           limit: Optional[int] = None) -> List[Tuple[Question, QuestionStats]]:
+        """
+        Возвращает статистику вопросов, начиная с самых трудных (меньшая доля правильных ответов).
+
+        Вопросы без ответов не возвращаются.
+        """
+        try:
+            query = (
+                self.session.query(Question, QuestionStats)
+                .join(QuestionStats, QuestionStats.question_id == Question.id)
+                .filter(QuestionStats.attempts > 0)
+                .order_by((QuestionStats.correct * 1.0 / QuestionStats.attempts).asc(), Question.id)
+            )
+            if section is not None:
+                query = query.filter(Question.section == section)
+            if limit is not None:
+                query = query.limit(limit)
+            return query.all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting question stats: {e}")
+            raise DatabaseError("Ошибка при получении статистики вопросов")
+
+    def get_option_picks(self, question_ids: List[int]) -> dict:
+        """Возвращает {question_id: [(текст варианта, правильный ли, число выборов), ...]}"""
+        try:
+            rows = (
+                self.session.query(AnswerOption.question_id, AnswerOption.text, AnswerOption.is_correct,
+                                   func.coalesce(OptionStats.picks, 0))
+                .outerjoin(OptionStats, OptionStats.answer_option_id == AnswerOption.id)
+                .filter(AnswerOption.question_id.in_(question_ids))
+                .order_by(AnswerOption.question_id, AnswerOption.is_correct.desc(), AnswerOption.id)
+                .all()
+            )
+            picks = {}
+            for question_id, text, is_correct, count in rows:
+                picks.setdefault(question_id, []).append((text, is_correct, count))
+            return picks
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting option picks: {e}")
+            raise DatabaseError("Ошибка при получении статистики вопросов")
+
+    def rebuild_scores(self) -> Tuple[int, int]:
+        """
+        Пересчитывает баллы всех студентов из журнала начислений.
+
+        Сначала в журнал добавляются начисления для правильных ответов, которых
+        в нем еще нет (ответы, записанные до появления журнала), затем таблица
+        scores заполняется заново одним INSERT ... SELECT с группировкой.
+        Все выполняется в одной транзакции.
+
+        Returns:
+            Tuple[int, int]: Число добавленных начислений и число строк scores
+
+        Raises:
+            DatabaseError: При ошибке пересчета
+        """
+        try:
+            missing = (
+                select(Answer.id, Answer.user_id, Question.section, literal(POINTS_PER_CORRECT), Answer.created_at)
+                .join(Question, Question.id == Answer.question_id)
+                .outerjoin(ScoreEvent, ScoreEvent.answer_id == Answer.id)
+                .where(Answer.is_correct.is_(True), ScoreEvent.id.is_(None))
+            )
+            backfilled = self.session.execute(
+                insert(ScoreEvent).from_select(
+                    ['answer_id', 'user_id', 'section', 'points', 'created_at'], missing
+                )
+            ).rowcount
+
+            self.session.execute(delete(Score))
+            totals = (
+                select(ScoreEvent.user_id, ScoreEvent.section, func.sum(ScoreEvent.points))
+                .group_by(ScoreEvent.user_id, ScoreEvent.section)
+            )
+            rebuilt = self.session.execute(
+                insert(Score).from_select(['user_id', 'section', 'points'], totals)
+            ).rowcount
+            self.session.commit()
+            logger.info(f"Баллы пересчитаны: добавлено начислений {backfilled}, строк рейтинга {rebuilt}")
+            return backfilled, rebuilt
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при пересчете баллов: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при пересчете баллов")
+
     def get_question_sections(self, question_id: int) -> List[str]:
         """Получает список разделов для вопроса"""
         question = self.session.query(Question).get(question_id)
@@ -349,14 +647,247 @@ class DatabaseOperations:
 
     def get_user_score(self, user_id: int, section: str) -> Optional[Score]:
         """Получает текущий счет пользователя в указанном разделе"""
-        return self.session.query(Score).filter(
-            Score.user_id == user_id,
-            Score.section == section
-        ).first()
+        return self.session.execute(
+            SCORE_BY_USER_SECTION, {'user_id': user_id, 'section': section}
+        ).scalars().first()
+
+    def create_group(self, owner_telegram_id: int, name: str) -> Group:
+        """
+        Создает группу преподавателя с уникальным кодом вступления.
+
+        Args:
+            owner_telegram_id (int): Telegram ID преподавателя
+            name (str): Название группы
+
+        Returns:
+            Group: Созданная группа
+
+        Raises:
+            DatabaseError: При ошибке создания группы
+        """
+        try:
+            owner = self.get_user_by_id(owner_telegram_id)
+            if owner is None:
+                raise DatabaseError("Преподаватель не найден")
+            while True:
+                join_code = secrets.token_hex(JOIN_CODE_LENGTH)[:JOIN_CODE_LENGTH].upper()
+                if not self.session.query(Group.id).filter_by(join_code=join_code).first():
+                    break
+            group = Group(name=name, owner_id=owner.id, join_code=join_code)
+            self.session.add(group)
+            self.session.commit()
+            logger.info(f"Создана группа {name} ({join_code}) преподавателя {owner_telegram_id}")
+            return group
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при создании группы: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при создании группы")
+
+    def get_teacher_groups(self, owner_telegram_id: int) -> List[Tuple[Group, int]]:
+        """Возвращает группы преподавателя с числом участников"""
+        try:
+            return (
+                self.session.query(Group, func.count(GroupMember.user_id))
+                .join(User, User.id == Group.owner_id)
+                .outerjoin(GroupMember, GroupMember.group_id == Group.id)
+                .filter(User.telegram_id == owner_telegram_id)
+                .group_by(Group.id)
+                .order_by(Group.name)
+                .all()
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении групп: {e}")
+            raise DatabaseError("Ошибка при получении групп")
+
+    def join_group(self, telegram_id: int, join_code: str) -> Optional[Group]:
+        """
+        Добавляет студента в группу по коду. Повторное вступление ничего не меняет.
+
+        Returns:
+            Optional[Group]: Группа или None, если код неверный или студент не зарегистрирован
+        """
+        try:
+            group = self.session.query(Group).filter_by(join_code=join_code.strip().upper()).first()
+            user = self.get_user_by_id(telegram_id)
+            if group is None or user is None or user.is_teacher:
+                return None
+            if self.session.get(GroupMember, (group.id, user.id)) is None:
+                self.session.add(GroupMember(group_id=group.id, user_id=user.id))
+                self.session.commit()
+                logger.info(f"Студент {telegram_id} вступил в группу {group.name}")
+            return group
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при вступлении в группу: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при вступлении в группу")
+
+    def get_group_students(self, group_ids: List[int]) -> List[User]:
+        """Студенты, состоящие хотя бы в одной из групп (каждый один раз)"""
+        try:
+            members = select(GroupMember.user_id).where(GroupMember.group_id.in_(group_ids))
+            return (
+                self.session.query(User)
+                .filter(User.id.in_(members), User.is_teacher == False)
+                .order_by(User.last_name, User.first_name)
+                .all()
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении студентов групп: {e}")
+            raise DatabaseError("Ошибка при получении студентов групп")
+
+    def create_launch_job(self, teacher_id: int, chat_id: int, message_id: int, sections: List[str], epoch: int,
+                          time_limit: Optional[int], audience: str, user_ids: List[int]) -> LaunchJob:
+        """Записывает запуск тестирования и его получателей одной транзакцией"""
+        try:
+            job = LaunchJob(
+                teacher_id=teacher_id, chat_id=chat_id, message_id=message_id, sections=list(sections),
+                epoch=epoch, time_limit=time_limit, audience=audience, total=len(user_ids)
+            )
+            self.session.add(job)
+            self.session.flush()
+            now = datetime.utcnow()
+            if user_ids:
+                self.session.execute(insert(LaunchRecipient), [
+                    {'job_id': job.id, 'user_id': user_id, 'status': RECIPIENT_PENDING, 'attempts': 0,
+                     'available_at': now, 'updated_at': now}
+                    for user_id in user_ids
+                ])
+            self.session.commit()
+            logger.info(f"Создан запуск {job.id} для {len(user_ids)} студентов")
+            return job
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при создании запуска: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при создании запуска")
+
+    def claim_launch_recipients(self, limit: int, lease: float, max_attempts: int) -> List[Tuple[LaunchJob, int]]:
+        """
+        Забирает до limit получателей запусков для отправки.
+
+        Строки блокируются через FOR UPDATE SKIP LOCKED, поэтому несколько
+        обработчиков забирают непересекающиеся пачки. Забранная строка
+        арендуется на lease секунд: если обработчик не отметил результат
+        (например, бот перезапустился), строка снова становится доступной.
+        Возвращает пары (запуск, telegram_id студента).
+        """
+        try:
+            now = datetime.utcnow()
+            # Получатели, исчерпавшие попытки, больше не забираются
+            self.session.execute(
+                update(LaunchRecipient)
+                .where(LaunchRecipient.status == RECIPIENT_CLAIMED, LaunchRecipient.available_at <= now,
+                       LaunchRecipient.attempts >= max_attempts)
+                .values(status=RECIPIENT_FAILED, error='timeout', updated_at=now)
+            )
+            recipients = (
+                self.session.query(LaunchRecipient)
+                .filter(LaunchRecipient.status.in_((RECIPIENT_PENDING, RECIPIENT_CLAIMED)),
+                        LaunchRecipient.available_at <= now)
+                .order_by(LaunchRecipient.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for recipient in recipients:
+                recipient.status = RECIPIENT_CLAIMED
+                recipient.attempts += 1
+                recipient.available_at = now + timedelta(seconds=lease)
+                recipient.updated_at = now
+            claimed = [(recipient.job_id, recipient.user_id) for recipient in recipients]
+            jobs = {}
+            if claimed:
+                job_ids = {job_id for job_id, _ in claimed}
+                jobs = {job.id: job for job in self.session.query(LaunchJob).filter(LaunchJob.id.in_(job_ids))}
+            self.session.commit()
+            return [(jobs[job_id], user_id) for job_id, user_id in claimed]
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении получателей запуска: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при получении получателей запуска")
+
+    def complete_launch_recipient(self, job_id: int, user_id: int, delivered: bool, error: Optional[str] = None,
+                                  max_attempts: int = 3, retry_delay: float = 30) -> Optional[str]:
+        """
+        Отмечает результат отправки получателю.
+
+        Неудачная отправка повторяется через retry_delay * номер попытки
+        секунд, пока не исчерпаны max_attempts попыток. Возвращает новый статус.
+        """
+        try:
+            recipient = (
+                self.session.query(LaunchRecipient)
+                .filter(LaunchRecipient.job_id == job_id, LaunchRecipient.user_id == user_id)
+                .first()
+            )
+            if recipient is None:
+                return None
+            now = datetime.utcnow()
+            if delivered:
+                recipient.status = RECIPIENT_SENT
+                recipient.error = None
+            elif recipient.attempts < max_attempts:
+                recipient.status = RECIPIENT_PENDING
+                recipient.available_at = now + timedelta(seconds=retry_delay * recipient.attempts)
+                recipient.error = error
+            else:
+                recipient.status = RECIPIENT_FAILED
+                recipient.error = error
+            recipient.updated_at = now
+            status = recipient.status
+            self.session.commit()
+            return status
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при сохранении результата отправки: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при сохранении результата отправки")
+
+    def finish_launch_jobs(self) -> int:
+        """Отмечает завершенными запуски, у которых не осталось неотправленных получателей"""
+        try:
+            open_recipients = select(LaunchRecipient.id).where(
+                LaunchRecipient.job_id == LaunchJob.id,
+                LaunchRecipient.status.in_((RECIPIENT_PENDING, RECIPIENT_CLAIMED))
+            )
+            result = self.session.execute(
+                update(LaunchJob)
+                .where(LaunchJob.status == 'running', ~open_recipients.exists())
+                .values(status='done', finished_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при завершении запусков: {e}")
+            self.session.rollback()
+            raise DatabaseError("Ошибка при завершении запусков")
+
+    def get_launch_jobs(self, teacher_id: int, limit: int = 5) -> List[Tuple[LaunchJob, dict]]:
+        """Последние запуски преподавателя и число получателей по статусам"""
+        try:
+            jobs = (
+                self.session.query(LaunchJob)
+                .filter(LaunchJob.teacher_id == teacher_id)
+                .order_by(LaunchJob.id.desc())
+                .limit(limit)
+                .all()
+            )
+            counts = {job.id: {} for job in jobs}
+            if jobs:
+                rows = (
+                    self.session.query(LaunchRecipient.job_id, LaunchRecipient.status, func.count())
+                    .filter(LaunchRecipient.job_id.in_(counts))
+                    .group_by(LaunchRecipient.job_id, LaunchRecipient.status)
+                )
+                for job_id, status, count in rows:
+                    counts[job_id][status] = count
+            return [(job, counts[job.id]) for job in jobs]
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении запусков: {e}")
+            raise DatabaseError("Ошибка при получении запусков")
 
     def get_user_by_id(self, user_id: int) -> User:
         """Получает пользователя по его telegram_id"""
-        return self.session.query(User).filter(User.telegram_id == user_id).first()
+        return self.session.execute(USER_BY_TELEGRAM_ID, {'telegram_id': user_id}).scalars().first()
 
     def update_or_create_score(self, user_id: int, section: str, points: int):
         """Обновляет или создает новый счет пользователя"""
@@ -0,0 +1,98 @@
+"""
+Управление помесячными секциями таблицы answers в PostgreSQL.
+
+Таблица answers секционирована по диапазону created_at: каждая секция
+answers_pYYYY_MM хранит ответы одного месяца, секция answers_default
+принимает строки вне созданных диапазонов. Секции создаются заранее
+на несколько месяцев вперед и удаляются целиком по политике хранения.
+"""
+from datetime import datetime
+from sqlalchemy import text
+from typing import List, Tuple
+import re
+
+ANSWERS_TABLE = 'answers'
+DEFAULT_PARTITION = 'answers_default'
+_PARTITION_RE = re.compile(r'^answers_p(\d{4})_(\d{2})$')
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_month(moment: datetime) -> datetime:
+    if moment.month == 12:
+        return datetime(moment.year + 1, 1, 1)
+    return datetime(moment.year, moment.month + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"answers_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_bounds(name: str) -> Tuple[datetime, datetime]:
+    """Границы секции [начало месяца, начало следующего месяца) по ее имени"""
+    match = _PARTITION_RE.match(name)
+    if not match:
+        raise ValueError(f"Не секция ответов: {name}")
+    start = datetime(int(match.group(1)), int(match.group(2)), 1)
+    return start, next_month(start)
+
+
+def is_partitioned(connection) -> bool:
+    """Секционирована ли таблица answers (только PostgreSQL)"""
+    if connection.dialect.name != 'postgresql':
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {'table': ANSWERS_TABLE}
+    ).scalar()
+    return relkind == 'p'
+
+
+def list_partitions(connection) -> List[str]:
+    """Имена помесячных секций answers в порядке возрастания"""
+    rows = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {'table': ANSWERS_TABLE}).scalars()
+    return sorted(name for name in rows if _PARTITION_RE.match(name))
+
+
+def create_partition(connection, month: datetime) -> bool:
+    """Создает секцию месяца, если ее еще нет. Возвращает True, если секция создана"""
+    name = partition_name(month)
+    if connection.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar():
+        return False
+    start, end = month_start(month), next_month(month)
+    connection.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {ANSWERS_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    return True
+
+
+def ensure_partitions(connection, since: datetime, now: datetime, months_ahead: int) -> List[str]:
+    """Создает секции с месяца since по месяц now + months_ahead включительно"""
+    created = []
+    month, last = month_start(since), month_start(now)
+    for _ in range(months_ahead):
+        last = next_month(last)
+    while month <= last:
+        if create_partition(connection, month):
+            created.append(partition_name(month))
+        month = next_month(month)
+    return created
+
+
+def drop_partitions_before(connection, bound: datetime) -> List[str]:
+    """Удаляет секции, все строки которых старше bound"""
+    dropped = []
+    for name in list_partitions(connection):
+        _, end = partition_bounds(name)
+        if end <= bound:
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
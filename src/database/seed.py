@@ -0,0 +1,133 @@
+"""
+Синтетические данные для нагрузочных проверок и бенчмарков.
+
+Генерирует банк вопросов по разделам, студентов и историю их ответов с
+реалистичным распределением: у студентов разный уровень подготовки, у
+вопросов - разная сложность, время на обдумывание распределено
+логнормально. Статистика вопросов, корзины гистограмм задержек и рейтинг
+заполняются так же, как при обычной работе бота (рейтинг - через
+rebuild_scores).
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from src.database.models import Answer, AnswerOption, LatencyBucket, OptionStats, Question, QuestionStats, User
+from src.database.operations import DatabaseOperations
+from src.utils.latency_stats import SCOPE_QUESTION, SCOPE_STUDENT, bucket_for
+from src.utils.logger import logger
+from typing import Dict
+import random
+
+# Синтетические студенты получают telegram_id начиная с этого значения
+SEED_TELEGRAM_ID_BASE = 10_000_000
+SEED_BATCH_SIZE = 5000
+
+FIRST_NAMES = ['Иван', 'Анна', 'Петр', 'Мария', 'Алексей', 'Елена', 'Дмитрий', 'Ольга', 'Сергей', 'Наталья']
+LAST_NAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов', 'Новиков',
+              'Федоров']
+SECTION_NAMES = ['Алгебра', 'Геометрия', 'Физика', 'Химия', 'Биология', 'История', 'География', 'Литература']
+
+
+def seed_database(db_ops: DatabaseOperations, sections: int = 5, questions_per_section: int = 200,
+                  options: int = 4, students: int = 500, answers_per_student: int = 50, days: int = 90,
+                  seed: int = 1) -> Dict[str, int]:
+    """Заполняет базу синтетическими данными. Возвращает число созданных записей по видам"""
+    rng = random.Random(seed)
+    session = db_ops.session
+    now = datetime.utcnow()
+
+    # Банк вопросов: первый вариант в create_question - правильный
+    section_names = [
+        SECTION_NAMES[i] if i < len(SECTION_NAMES) else f"Раздел {i + 1}" for i in range(sections)
+    ]
+    bank = [
+        (f"{section}: вопрос {number + 1}", section, [f"Вариант {option + 1}" for option in range(options)])
+        for section in section_names
+        for number in range(questions_per_section)
+    ]
+    last_question = session.query(func.max(Question.id)).scalar() or 0
+    db_ops.bulk_create_questions(bank)
+
+    last_seeded = session.query(func.max(User.telegram_id)).filter(User.telegram_id >= SEED_TELEGRAM_ID_BASE).scalar()
+    base = last_seeded + 1 if last_seeded else SEED_TELEGRAM_ID_BASE
+    users = [
+        {'telegram_id': base + i, 'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+         'phone': f"+7900{base + i:07d}"[-12:], 'is_teacher': False, 'created_at': now}
+        for i in range(students)
+    ]
+    for start in range(0, len(users), SEED_BATCH_SIZE):
+        session.execute(insert(User), users[start:start + SEED_BATCH_SIZE])
+    session.commit()
+
+    user_ids = [user_id for (user_id,) in session.query(User.id).filter(User.telegram_id >= base)
+                .filter(User.telegram_id < base + students)]
+    questions = [question_id for (question_id,) in session.query(Question.id).filter(Question.id > last_question)]
+    question_options: Dict[int, list] = {}
+    for option_id, question_id, is_correct in session.query(
+            AnswerOption.id, AnswerOption.question_id, AnswerOption.is_correct
+    ).filter(AnswerOption.question_id.in_(questions)):
+        question_options.setdefault(question_id, []).append((option_id, is_correct))
+
+    skill = {user_id: rng.uniform(0.3, 0.95) for user_id in user_ids}
+    difficulty = {question_id: rng.uniform(0.0, 0.6) for question_id in questions}
+    attempts, correct, timed, response_ms = Counter(), Counter(), Counter(), Counter()
+    picks, buckets = Counter(), Counter()
+
+    answers = 0
+    batch = []
+    for user_id in user_ids:
+        for question_id in rng.sample(questions, min(answers_per_student, len(questions))):
+            choices = question_options[question_id]
+            is_correct = rng.random() < skill[user_id] * (1 - difficulty[question_id])
+            right = [choice for choice in choices if choice[1]]
+            wrong = [choice for choice in choices if not choice[1]] or right
+            option_id, _ = rng.choice(right if is_correct else wrong)
+            answered_at = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            think_ms = min(rng.lognormvariate(9.2, 0.6), 300_000)
+            batch.append({
+                'user_id': user_id, 'question_id': question_id, 'answer_option_id': option_id,
+                'is_correct': is_correct, 'created_at': answered_at,
+                'question_sent_at': answered_at - timedelta(milliseconds=think_ms), 'answered_at': answered_at,
+            })
+            attempts[question_id] += 1
+            correct[question_id] += is_correct
+            timed[question_id] += 1
+            response_ms[question_id] += think_ms
+            picks[option_id] += 1
+            bucket = bucket_for(think_ms * 1000)
+            buckets[(SCOPE_QUESTION, question_id, bucket)] += 1
+            buckets[(SCOPE_STUDENT, user_id, bucket)] += 1
+            if len(batch) >= SEED_BATCH_SIZE:
+                session.execute(insert(Answer), batch)
+                answers += len(batch)
+                batch = []
+    if batch:
+        session.execute(insert(Answer), batch)
+        answers += len(batch)
+
+    # Статистика вопросов, которую бот иначе ведет инкрементально в record_answer
+    stats = [
+        {'question_id': question_id, 'attempts': attempts[question_id], 'correct': correct[question_id],
+         'timed_attempts': timed[question_id], 'response_ms_total': response_ms[question_id]}
+        for question_id in attempts
+    ]
+    option_question = {
+        option_id: question_id for question_id, choices in question_options.items() for option_id, _ in choices
+    }
+    option_stats = [
+        {'answer_option_id': option_id, 'question_id': option_question[option_id], 'picks': count}
+        for option_id, count in picks.items()
+    ]
+    latency_buckets = [
+        {'scope': scope, 'key': key, 'bucket': bucket, 'count': count}
+        for (scope, key, bucket), count in buckets.items()
+    ]
+    for rows, model in ((stats, QuestionStats), (option_stats, OptionStats), (latency_buckets, LatencyBucket)):
+        for start in range(0, len(rows), SEED_BATCH_SIZE):
+            session.execute(insert(model), rows[start:start + SEED_BATCH_SIZE])
+    session.commit()
+
+    _, scores = db_ops.rebuild_scores()
+    counts = {'questions': len(bank), 'students': students, 'answers': answers, 'scores': scores}
+    logger.info(f"Синтетические данные созданы: {counts}")
+    return counts
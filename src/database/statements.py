@@ -0,0 +1,41 @@
+"""
+Заранее построенные запросы для самых частых операций.
+
+Запрос через session.query(...) на каждом вызове заново строит объект
+запроса и вычисляет его ключ в кэше компиляции SQLAlchemy. Здесь операторы
+строятся один раз при импорте, значения передаются через bindparam, а ключ
+кэша неизменяемого оператора вычисляется один раз - на вызов остается
+только выполнение уже скомпилированного SQL.
+
+Выполнение: session.execute(USER_BY_TELEGRAM_ID, {'telegram_id': ...}).
+"""
+from sqlalchemy import bindparam, select
+from src.database.models import AnswerOption, Question, Score, User
+
+USER_BY_TELEGRAM_ID = select(User).where(User.telegram_id == bindparam('telegram_id')).limit(1)
+
+USER_ROLE = select(User.is_teacher).where(User.telegram_id == bindparam('telegram_id')).limit(1)
+
+SCORE_BY_USER_SECTION = (
+    select(Score)
+    .where(Score.user_id == bindparam('user_id'), Score.section == bindparam('section'))
+    .limit(1)
+)
+
+SCORES_BY_TELEGRAM_ID = (
+    select(Score)
+    .join(User, User.id == Score.user_id)
+    .where(User.telegram_id == bindparam('telegram_id'))
+)
+
+QUESTIONS_BY_SECTION = (
+    select(Question)
+    .where(Question.section == bindparam('section'))
+    .order_by(Question.id)
+)
+
+OPTIONS_BY_QUESTION = (
+    select(AnswerOption)
+    .where(AnswerOption.question_id == bindparam('question_id'))
+    .order_by(AnswerOption.id)
+)
@@ -1,44 +1,108 @@
 import os
 from telebot import TeleBot
 from dotenv import load_dotenv
-from src.database.models import init_db
+from src.database.models import db_session
+from src.database.maintenance import start_maintenance
 from src.bot.handlers import teacher, student
+from src.bot.router import Router
+from src.utils.helpers import get_user_role
 from src.database.operations import DatabaseOperations
-from src.bot.handlers.student import state_storage
-import logging
+from src.utils.state_storage import state_storage, start_session_sweepers
+from src.utils.test_utils import restore_test_sessions
+from src.utils.video_cache import video_cache
+from src.utils.latency_stats import latency_stats
+from src.utils.timer_wheel import question_timers
+from src.utils.launch_progress import launch_progress
+from src.utils.cluster import cluster
+from src.utils.launch_jobs import launch_jobs
+from src.utils.profiler import install_profile_signal
+from src.utils.metrics import METRICS_PORT, instrument_bot_api, metrics, register_process_gauges, start_metrics_server
+from src.utils.logger import logger, setup_logger
+from src.utils.startup import StartupTimer
+import argparse
 
 # Загружаем переменные окружения в начале файла
 load_dotenv()
 
-logger = logging.getLogger(__name__)
+def create_bot():
+    return TeleBot(
+        os.getenv('TELEGRAM_TOKEN'), 
+        state_storage=state_storage,
+        use_class_middlewares=True
+    )
 
-def main():
+def setup(bot):
+    """Подготовка процесса: база данных, кэши, восстановление сессий, хэндлеры"""
+    setup_logger()
+    startup = StartupTimer()
     # Проверяем значение
     admin_ids = os.getenv('ADMIN_USER_IDS')
     logger.info(f"Loaded ADMIN_USER_IDS: {admin_ids}")
     
-    # Инициализация базы данных
-    session = init_db()
-    db_ops = DatabaseOperations(session)
-    db_ops.init_teachers()
+    # Инициализация базы данных (движок и проверка схемы - один раз на процесс)
+    with startup.phase('database'):
+        session = db_session
+        bind = session.get_bind()
+        db_ops = DatabaseOperations(session)
+        db_ops.init_teachers()
+    
+    # Заранее загружаем file_id видео-комментариев
+    with startup.phase('caches'):
+        videos_count = video_cache.prefetch(session)
+        logger.info(f"Загружено {videos_count} видео в кэш")
+        latency_stats.load(session)
+    
+    # Восстановление незавершенных тестов из журнала сессий
+    with startup.phase('sessions'):
+        question_timers.start()
+        launch_progress.start(bot)
+        restored = restore_test_sessions(session, bot)
+        logger.info(f"Восстановлено сессий тестирования: {restored}")
+        start_session_sweepers()
+    
+    # Секции, дневные итоги и срок хранения ответов (в режиме нескольких процессов - один раз)
+    if cluster.worker in (None, 0):
+        start_maintenance(bind)
     
-    # Сброс всех состояний при запуске
-    logger.info("Сброс состояний пользователей")
-    # Очищаем все данные в хранилище состояний
-    state_storage.data.clear()
-    logger.info("Состояния пользователей сброшены")
+    # Регистрация хэндлеров в таблице маршрутизации
+    with startup.phase('handlers'):
+        router = Router(get_user_role)
+        teacher.register_handlers(bot, router)
+        student.register_handlers(bot, router)
+        router.attach(bot)
     
-    # Регистрация хэндлеров
-    teacher.register_handlers(bot)
-    student.register_handlers(bot)
+    # Рассылка запусков тестирования, в том числе не завершенных до перезапуска
+    launch_jobs.start(bind)
+    
+    # Метрики и проверка здоровья (у каждого процесса-обработчика свой порт)
+    with startup.phase('metrics'):
+        instrument_bot_api()
+        register_process_gauges(bind)
+        metrics.gauge('bot_startup_seconds', 'Длительность этапов запуска процесса', startup.snapshot)
+        if METRICS_PORT:
+            start_metrics_server(bind, METRICS_PORT + (cluster.worker or 0))
+        # kill -USR1 <pid>: профилирование обработки обновлений, отчет в logs/
+        install_profile_signal()
+    # Соединение основного потока больше не нужно: обновления обрабатывают потоки TeleBot
+    db_session.remove()
+    startup.report()
+    return startup
+
+def main():
+    bot = create_bot()
+    setup(bot)
     
     # Запуск бота
     bot.infinity_polling()
 
 if __name__ == '__main__':
-    bot = TeleBot(
-        os.getenv('TELEGRAM_TOKEN'), 
-        state_storage=state_storage,
-        use_class_middlewares=True
-    )
-    main() 
\ No newline at end of file
+    setup_logger()
+    parser = argparse.ArgumentParser(description='Telegram-бот для тестирования студентов')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BOT_WORKERS', '1')),
+                        help='число процессов-обработчиков (больше 1 - режим супервизора)')
+    args = parser.parse_args()
+    if args.workers > 1:
+        from src.supervisor import Supervisor
+        Supervisor(args.workers).run()
+    else:
+        main()
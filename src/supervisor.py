@@ -0,0 +1,215 @@
+"""
+Режим нескольких процессов-обработчиков.
+
+Один процесс бота упирается в GIL: построение клавиатур, сериализация и
+логирование выполняются на одном ядре. В режиме супервизора
+(python -m src.main --workers N) супервизор сам получает обновления из
+Telegram и раздает их N процессам-обработчикам по консистентному хешу id
+пользователя, поэтому сессия студента всегда живет в одном процессе.
+
+Каждый обработчик ведет свой журнал сессий (SESSION_JOURNAL_DIR/worker-<i>).
+Упавший обработчик перезапускается с той же очередью и тем же журналом:
+обновления его пользователей ждут в очереди, а сессии восстанавливаются.
+Если обработчик падает слишком часто, он убирается с кольца, и его
+пользователи (в среднем 1/N) переходят к остальным процессам.
+"""
+from src.utils.hash_ring import HashRing
+from src.utils.logger import logger
+from telebot import apihelper
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+POLL_TIMEOUT = 30
+# Обработчик, упавший больше MAX_RESTARTS раз за RESTART_WINDOW секунд, убирается с кольца
+MAX_RESTARTS = 3
+RESTART_WINDOW = 300
+MONITOR_INTERVAL = 1.0
+
+UPDATE_KINDS = (
+    'message', 'edited_message', 'callback_query', 'inline_query', 'chosen_inline_result',
+    'shipping_query', 'pre_checkout_query', 'poll_answer', 'my_chat_member', 'chat_member',
+    'chat_join_request',
+)
+
+
+def update_user_id(update: dict) -> int:
+    """Id пользователя, от которого пришло обновление (0, если его нет)"""
+    for kind in UPDATE_KINDS:
+        payload = update.get(kind)
+        if payload:
+            user = payload.get('from') or payload.get('user') or {}
+            if user.get('id'):
+                return user['id']
+            return (payload.get('chat') or {}).get('id', 0)
+    return 0
+
+
+def run_worker(index: int, inbox, control):
+    """Точка входа процесса-обработчика"""
+    from src.main import create_bot, setup
+    from src.utils.cluster import cluster
+    from src.utils.launch_progress import launch_progress
+    from src.utils.state_storage import session_journal
+
+    if session_journal.directory:
+        session_journal.directory = os.path.join(session_journal.directory, f'worker-{index}')
+    cluster.attach(index, control)
+    launch_progress.relay = lambda epoch, event, args: cluster.send(
+        'progress', None, epoch=epoch, event=event, args=args
+    )
+
+    bot = create_bot()
+    setup(bot)
+    control.put(('ready', index, None, None))
+    logger.info(f"Обработчик {index} запущен (pid {os.getpid()})")
+
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        handle_message(bot, index, message)
+
+
+def handle_message(bot, index: int, message):
+    """Обрабатывает сообщение очереди процесса-обработчика: обновление Telegram или задачу"""
+    from telebot import types
+    from src.database.models import db_session
+    from src.utils.cluster import cluster
+
+    kind, body = message
+    try:
+        if kind == 'update':
+            bot.process_new_updates([types.Update.de_json(body)])
+        elif kind == 'task':
+            task, _, payload = body
+            cluster.run(task, payload)
+    except Exception as e:
+        logger.error(f"Обработчик {index}: ошибка при обработке {kind}: {e}", exc_info=True)
+    finally:
+        # Задачи (begin_test и др.) выполняются в основном потоке обработчика через db_session
+        db_session.remove()
+
+
+class Supervisor:
+    """Получает обновления и задачи и раздает их процессам-обработчикам по кольцу"""
+
+    def __init__(self, workers: int, token: str = None):
+        self.token = token or os.getenv('TELEGRAM_TOKEN')
+        self._context = multiprocessing.get_context('spawn')
+        self._control = self._context.Queue()
+        self._inboxes = {index: self._context.Queue() for index in range(workers)}
+        self._processes = {}
+        self._restarts = {index: [] for index in range(workers)}
+        self._ring = HashRing(range(workers))
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def route(self, key) -> int:
+        with self._lock:
+            return self._ring.node_for(key)
+
+    def dispatch_update(self, update: dict):
+        self._inboxes[self.route(update_user_id(update))].put(('update', update))
+
+    def dispatch_task(self, kind: str, key, payload: dict):
+        if key is None:
+            with self._lock:
+                targets = self._ring.nodes
+        else:
+            targets = [self.route(key)]
+        for index in targets:
+            self._inboxes[index].put(('task', (kind, key, payload)))
+
+    def _start_worker(self, index: int):
+        process = self._context.Process(
+            target=run_worker,
+            args=(index, self._inboxes[index], self._control),
+            name=f'bot-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _control_loop(self):
+        while not self._stopped.is_set():
+            kind, a, b, c = self._control.get()
+            if kind == 'task':
+                self.dispatch_task(a, b, c)
+            elif kind == 'ready':
+                logger.info(f"Супервизор: обработчик {a} готов")
+
+    def _monitor_loop(self):
+        while not self._stopped.wait(MONITOR_INTERVAL):
+            for index, process in list(self._processes.items()):
+                if process.is_alive():
+                    continue
+                logger.error(f"Обработчик {index} завершился с кодом {process.exitcode}")
+                now = time.monotonic()
+                restarts = [moment for moment in self._restarts[index] if now - moment < RESTART_WINDOW]
+                restarts.append(now)
+                self._restarts[index] = restarts
+                if len(restarts) <= MAX_RESTARTS:
+                    self._start_worker(index)
+                else:
+                    self._retire(index)
+
+    def _retire(self, index: int):
+        """Убирает обработчик с кольца и передает его необработанные сообщения новым владельцам"""
+        del self._processes[index]
+        with self._lock:
+            self._ring.remove(index)
+            if not len(self._ring):
+                logger.error("Супервизор: не осталось ни одного обработчика")
+                self._stopped.set()
+                return
+        logger.error(f"Обработчик {index} убран с кольца, его пользователи распределены между остальными")
+        inbox = self._inboxes[index]
+        while True:
+            try:
+                kind, body = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'update':
+                self.dispatch_update(body)
+            elif body[1] is not None:
+                # Задачи для всех процессов остальные обработчики уже получили
+                self.dispatch_task(*body)
+
+    def run(self):
+        # Схема базы создается и обновляется один раз, до запуска обработчиков;
+        # обработчики наследуют DATABASE_SCHEMA_READY и проверку не повторяют
+        from src.database.models import get_engine
+        get_engine().dispose()
+        os.environ['DATABASE_SCHEMA_READY'] = '1'
+
+        logger.info(f"Супервизор: запуск {len(self._inboxes)} обработчиков")
+        for index in self._inboxes:
+            self._start_worker(index)
+        threading.Thread(target=self._control_loop, name='supervisor-control', daemon=True).start()
+        threading.Thread(target=self._monitor_loop, name='supervisor-monitor', daemon=True).start()
+
+        offset = None
+        try:
+            while not self._stopped.is_set():
+                try:
+                    updates = apihelper.get_updates(
+                        self.token, offset=offset, timeout=POLL_TIMEOUT + 10, long_polling_timeout=POLL_TIMEOUT
+                    )
+                except Exception as e:
+                    logger.error(f"Супервизор: ошибка получения обновлений: {e}")
+                    time.sleep(1)
+                    continue
+                for update in updates:
+                    offset = update['update_id'] + 1
+                    self.dispatch_update(update)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stopped.set()
+            for inbox in self._inboxes.values():
+                inbox.put(None)
+            for process in self._processes.values():
+                process.join(timeout=5)
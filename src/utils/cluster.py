@@ -0,0 +1,54 @@
+from src.utils.logger import logger
+from typing import Callable, Dict, Optional
+
+
+class Cluster:
+    """
+    Задачи, которые должен выполнить процесс, владеющий сессией пользователя.
+
+    В обычном режиме бот работает в одном процессе, и задача выполняется
+    сразу. В режиме нескольких процессов (src/supervisor.py) задача уходит
+    супервизору, а тот передает ее процессу, которому по консистентному
+    хешу принадлежит ключ (id пользователя), или всем процессам, если ключ
+    равен None.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, Callable] = {}
+        self._control = None
+        self.worker: Optional[int] = None
+
+    @property
+    def distributed(self) -> bool:
+        return self._control is not None
+
+    def attach(self, worker: int, control):
+        """Переводит процесс в режим обработчика: задачи отправляются в очередь control"""
+        self.worker = worker
+        self._control = control
+
+    def task(self, kind: str, func: Callable):
+        """Регистрирует обработчик задачи kind"""
+        self._tasks[kind] = func
+
+    def send(self, kind: str, key=None, **payload):
+        """
+        Выполняет задачу в процессе-владельце ключа.
+
+        В одном процессе возвращает результат обработчика, в режиме
+        нескольких процессов - None (задача выполняется асинхронно).
+        """
+        if self._control is None:
+            return self.run(kind, payload)
+        self._control.put(('task', kind, key, payload))
+        return None
+
+    def run(self, kind: str, payload: dict):
+        func = self._tasks.get(kind)
+        if func is None:
+            logger.error(f"Неизвестная задача {kind}")
+            return None
+        return func(**payload)
+
+
+cluster = Cluster()
@@ -0,0 +1,67 @@
+from typing import Dict, Hashable, Iterable, List
+import bisect
+import hashlib
+
+# Виртуальных точек на узел: чем больше, тем равномернее распределение ключей
+REPLICAS = 160
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Консистентное хеширование ключей (id пользователей) по узлам.
+
+    Каждый узел занимает replicas точек на кольце; ключ принадлежит узлу
+    первой точки по часовой стрелке от хеша ключа. При добавлении или
+    удалении узла меняют владельца только ключи его дуг - в среднем 1/N
+    всех ключей, остальные пользователи остаются на своих узлах.
+    """
+
+    def __init__(self, nodes: Iterable[Hashable] = (), replicas: int = REPLICAS):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, Hashable] = {}
+        self._nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node):
+        return node in self._nodes
+
+    @property
+    def nodes(self):
+        return sorted(self._nodes)
+
+    def add(self, node: Hashable):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            # Совпадение хешей двух узлов практически невозможно, но порядок должен быть однозначным
+            if point in self._owners:
+                continue
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: Hashable):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != node}
+
+    def node_for(self, key) -> Hashable:
+        """Узел, которому принадлежит ключ"""
+        if not self._points:
+            raise LookupError("На кольце нет узлов")
+        index = bisect.bisect(self._points, _hash(str(key)))
+        if index == len(self._points):
+            index = 0
+        return self._owners[self._points[index]]
@@ -1,32 +1,39 @@
-from src.database.models import User, Question, Answer, Score, Video, init_db
-from typing import List, Tuple
+from src.database.models import Question, Score, db_session
+from src.database.statements import USER_BY_TELEGRAM_ID, USER_ROLE
+from src.utils.video_cache import video_cache
+from src.utils.question_pool import question_pool
+from src.utils.role_cache import ROLE_STUDENT, ROLE_TEACHER, role_cache
+from typing import List, Optional, Tuple
 import random
 
-session = init_db()
+# Сессия потока-обработчика; база подключается при первом запросе, а не при импорте
+session = db_session
+
+def _load_user_role(user_id: int) -> str:
+    is_teacher = session.execute(USER_ROLE, {'telegram_id': user_id}).scalar()
+    return ROLE_TEACHER if is_teacher else ROLE_STUDENT
+
+def get_user_role(user_id: int) -> str:
+    # Роль пользователя (кэшируется в памяти, см. RoleCache)
+    return role_cache.get(user_id, _load_user_role)
 
 def is_teacher(user_id: int) -> bool:
     # Проверка, является ли пользователь преподавателем
-    user = session.query(User).filter_by(telegram_id=user_id).first()
-    return user and user.is_teacher
+    return get_user_role(user_id) == ROLE_TEACHER
 
 def is_registered_student(user_id: int) -> bool:
     # Проверка, зарегистрирован ли студент
-    user = session.query(User).filter_by(telegram_id=user_id).first()
+    user = session.execute(USER_BY_TELEGRAM_ID, {'telegram_id': user_id}).scalars().first()
     return user and not user.is_teacher
 
-def get_random_question(section: str, user_id: int) -> Tuple[Question, List[str]]:
-    # Получение случайного вопроса из раздела
-    asked_questions = session.query(Answer).filter_by(user_id=user_id).with_entities(Answer.question_id).all()
-    available_questions = session.query(Question).filter_by(section=section).filter(
-        ~Question.id.in_(asked_questions)
-    ).all()
-    
-    if not available_questions:
-        # Если все вопросы заданы, сбрасываем историю
-        session.query(Answer).filter_by(user_id=user_id).delete()
-        available_questions = session.query(Question).filter_by(section=section).all()
-    
-    question = random.choice(available_questions)
+def get_random_question(section: str, user_id: int) -> Tuple[Optional[Question], List[str]]:
+    # Получение случайного еще не заданного вопроса из раздела.
+    # Когда все вопросы раздела заданы, метки сбрасываются (история ответов сохраняется)
+    question_id = question_pool.draw(session, user_id, section)
+    if question_id is None:
+        return None, []
+
+    question = session.get(Question, question_id)
     options = [opt.text for opt in question.answers_options]
     random.shuffle(options)
     return question, options
@@ -36,19 +43,18 @@ def calculate_score(user_id: int, section: str) -> float:
     score = session.query(Score).filter_by(user_id=user_id, section=section).first()
     return score.points if score else 0
 
-def get_video_for_results(correct_answers: int, total_questions: int) -> str:
-    # Выбор видео в зависимости от результатов
+def get_result_criteria(correct_answers: int, total_questions: int) -> str:
+    # Критерий видео в зависимости от результатов
     if correct_answers == total_questions:
-        criteria = 'success'
+        return 'success'
     elif correct_answers == 0:
-        criteria = 'failure'
-    else:
-        criteria = 'partial'
-    
-    videos = session.query(Video).filter_by(criteria=criteria).all()
-    if videos:
-        return random.choice(videos).file_id
-    return None
+        return 'failure'
+    return 'partial'
+
+def get_video_for_results(correct_answers: int, total_questions: int) -> Optional[str]:
+    # Выбор видео в зависимости от результатов (из кэша file_id, без запроса к videos)
+    criteria = get_result_criteria(correct_answers, total_questions)
+    return video_cache.choice(session, criteria)
 
 def shuffle_options(options: List[str]) -> List[str]:
     # Перемешивание вариантов ответов
@@ -0,0 +1,83 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+# Точность: 2 значащие цифры (относительная погрешность значения меньше 1%)
+SIGNIFICANT_FIGURES = 2
+
+
+class Histogram:
+    """
+    Гистограмма задержек в стиле HDR Histogram.
+
+    Значения (целые, например микросекунды) раскладываются по лог-линейным
+    корзинам: до sub_bucket_count значения хранятся точно, дальше каждая
+    степень двойки делится на sub_bucket_count / 2 корзин одинаковой ширины.
+    Так относительная погрешность постоянна во всем диапазоне, а число
+    корзин растет логарифмически. Счетчики хранятся разреженно.
+    """
+
+    __slots__ = ('counts', 'total', 'sum', 'min', 'max', '_magnitude', '_sub_bucket_count', '_half')
+
+    def __init__(self, significant_figures: int = SIGNIFICANT_FIGURES):
+        # Число корзин на степень двойки - наименьшая степень двойки >= 2 * 10^figures
+        self._magnitude = (2 * 10 ** significant_figures - 1).bit_length()
+        self._sub_bucket_count = 1 << self._magnitude
+        self._half = self._sub_bucket_count // 2
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def index_for(self, value: int) -> int:
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self._magnitude
+        return self._sub_bucket_count + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def bucket_range(self, index: int) -> Tuple[int, int]:
+        """Диапазон значений [low, high] корзины"""
+        if index < self._sub_bucket_count:
+            return index, index
+        shift, sub = divmod(index - self._sub_bucket_count, self._half)
+        shift += 1
+        low = (sub + self._half) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: float, count: int = 1):
+        value = max(int(value), 0)
+        index = self.index_for(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'Histogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.total:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.total if self.total else None
+
+    def percentile(self, percent: float) -> Optional[int]:
+        """Значение, не превышаемое percent процентами записей (середина корзины)"""
+        if not self.total:
+            return None
+        rank = max(1, -(-self.total * percent // 100))
+        if rank >= self.total:
+            return self.max
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = self.bucket_range(index)
+                return min(max((low + high) // 2, self.min), self.max)
+        return self.max
+
+    def percentiles(self, percents: Iterable[float] = (50, 90, 99)) -> Dict[float, Optional[int]]:
+        return {percent: self.percentile(percent) for percent in percents}
@@ -0,0 +1,121 @@
+from collections import Counter
+from sqlalchemy import insert
+from src.database.models import Answer, LatencyBucket
+from src.utils.cluster import cluster
+from src.utils.histogram import Histogram
+from src.utils.logger import logger
+from typing import Dict, List, Tuple
+import threading
+
+LOAD_BATCH_SIZE = 5000
+SCOPE_QUESTION = 'question'
+SCOPE_STUDENT = 'student'
+
+# Образец для вычисления индексов корзин (у всех гистограмм одинаковая точность)
+_buckets = Histogram()
+
+
+def bucket_for(think_us: float) -> int:
+    """Индекс корзины гистограммы для времени на обдумывание"""
+    return _buckets.index_for(max(int(think_us), 0))
+
+
+class LatencyStats:
+    """
+    Гистограммы задержек ответов в памяти процесса.
+
+    Время на обдумывание (от отправки вопроса до нажатия кнопки) хранится
+    по вопросам, по студентам и суммарно; время обработки нажатия ботом -
+    суммарно. Значения в микросекундах. Корзины гистограмм обдумывания
+    хранятся в таблице latency_buckets и увеличиваются при записи ответа,
+    поэтому при запуске читаются корзины, а не вся история answers: время
+    загрузки не зависит от числа ответов. Значения восстанавливаются
+    серединами корзин (в пределах точности гистограммы).
+    """
+
+    def __init__(self):
+        self.think_total = Histogram()
+        self.processing_total = Histogram()
+        self.think_by_question: Dict[int, Histogram] = {}
+        self.think_by_student: Dict[int, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record_think(self, question_id: int, user_id: int, think_us: float):
+        with self._lock:
+            self.think_total.record(think_us)
+            self._histogram(self.think_by_question, question_id).record(think_us)
+            self._histogram(self.think_by_student, user_id).record(think_us)
+
+    def record_processing(self, processing_us: float):
+        with self._lock:
+            self.processing_total.record(processing_us)
+
+    @staticmethod
+    def _histogram(table: Dict[int, Histogram], key: int) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        return histogram
+
+    def slowest(self, table: Dict[int, Histogram], limit: int = 10, percent: float = 50) -> List[Tuple[int, Histogram]]:
+        """Ключи с наибольшим значением перцентиля"""
+        with self._lock:
+            items = list(table.items())
+        items.sort(key=lambda item: item[1].percentile(percent) or 0, reverse=True)
+        return items[:limit]
+
+    def load(self, session) -> int:
+        """Строит гистограммы времени на обдумывание по таблице latency_buckets"""
+        if session.query(LatencyBucket.key).first() is None:
+            backfill_buckets(session)
+        count = 0
+        query = session.query(LatencyBucket.scope, LatencyBucket.key, LatencyBucket.bucket, LatencyBucket.count)
+        with self._lock:
+            for scope, key, bucket, bucket_count in query.yield_per(LOAD_BATCH_SIZE):
+                low, high = _buckets.bucket_range(bucket)
+                value = (low + high) // 2
+                if scope == SCOPE_QUESTION:
+                    self._histogram(self.think_by_question, key).record(value, bucket_count)
+                    self.think_total.record(value, bucket_count)
+                    count += bucket_count
+                else:
+                    self._histogram(self.think_by_student, key).record(value, bucket_count)
+        logger.info(f"Гистограммы задержек построены по {count} ответам")
+        return count
+
+
+def backfill_buckets(session) -> int:
+    """
+    Заполняет latency_buckets по сохраненным ответам.
+
+    Нужен один раз - для баз, где ответы записаны до появления таблицы, и
+    после загрузки ответов в обход record_answer (src.database.seed).
+    """
+    query = (
+        session.query(Answer.question_id, Answer.user_id, Answer.question_sent_at, Answer.answered_at)
+        .filter(Answer.question_sent_at.isnot(None), Answer.answered_at.isnot(None),
+                Answer.answer_option_id.isnot(None))
+    )
+    counts = Counter()
+    answers = 0
+    for question_id, user_id, sent_at, answered_at in query.yield_per(LOAD_BATCH_SIZE):
+        bucket = bucket_for((answered_at - sent_at).total_seconds() * 1e6)
+        counts[(SCOPE_QUESTION, question_id, bucket)] += 1
+        counts[(SCOPE_STUDENT, user_id, bucket)] += 1
+        answers += 1
+    rows = [
+        {'scope': scope, 'key': key, 'bucket': bucket, 'count': count}
+        for (scope, key, bucket), count in counts.items()
+    ]
+    for start in range(0, len(rows), LOAD_BATCH_SIZE):
+        session.execute(insert(LatencyBucket), rows[start:start + LOAD_BATCH_SIZE])
+    session.commit()
+    if answers:
+        logger.info(f"Корзины гистограмм задержек заполнены по {answers} ответам")
+    return answers
+
+
+latency_stats = LatencyStats()
+# Замеры передаются всем процессам-обработчикам, чтобы отчет любого из них был полным
+cluster.task('record_think', latency_stats.record_think)
+cluster.task('record_processing', latency_stats.record_processing)
@@ -0,0 +1,93 @@
+from sqlalchemy.orm import sessionmaker
+from src.database.models import db_session
+from src.database.operations import DatabaseOperations
+from src.utils.cluster import cluster
+from src.utils.logger import logger
+from typing import List
+import os
+import threading
+
+# Потоков отправки в каждом процессе; строки разбираются через SKIP LOCKED, поэтому их может быть несколько
+LAUNCH_WORKERS = int(os.getenv('LAUNCH_WORKERS', '2'))
+LAUNCH_BATCH_SIZE = int(os.getenv('LAUNCH_BATCH_SIZE', '50'))
+# На сколько секунд получатель арендуется обработчиком, пока не отмечен результат
+LAUNCH_LEASE = float(os.getenv('LAUNCH_LEASE', '120'))
+LAUNCH_MAX_ATTEMPTS = int(os.getenv('LAUNCH_MAX_ATTEMPTS', '3'))
+LAUNCH_RETRY_DELAY = float(os.getenv('LAUNCH_RETRY_DELAY', '30'))
+LAUNCH_POLL_INTERVAL = float(os.getenv('LAUNCH_POLL_INTERVAL', '2'))
+
+
+class LaunchJobWorkers:
+    """
+    Фоновая рассылка запусков тестирования из таблиц launch_jobs/launch_recipients.
+
+    Запуск сначала записывается в базу со всеми получателями, затем потоки
+    забирают получателей пачками и передают задачу begin_test процессу,
+    который ведет сессию студента. Результат отправки отмечает процесс-владелец
+    (complete_launch_recipient). Незавершенная рассылка продолжается после
+    перезапуска, неудачные отправки повторяются.
+    """
+
+    def __init__(self, workers: int = LAUNCH_WORKERS, batch_size: int = LAUNCH_BATCH_SIZE,
+                 poll_interval: float = LAUNCH_POLL_INTERVAL):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def wake(self):
+        """Новый запуск записан: не ждать очередного опроса"""
+        self._wake.set()
+
+    def process_batch(self, db_ops: DatabaseOperations) -> int:
+        """Забирает и отправляет одну пачку получателей. Возвращает ее размер"""
+        claimed = db_ops.claim_launch_recipients(self.batch_size, LAUNCH_LEASE, LAUNCH_MAX_ATTEMPTS)
+        for job, user_id in claimed:
+            cluster.send(
+                'begin_test', user_id,
+                student_id=user_id, sections=list(job.sections), epoch=job.epoch, time_limit=job.time_limit,
+                job_id=job.id
+            )
+        if not claimed:
+            finished = db_ops.finish_launch_jobs()
+            if finished:
+                logger.info(f"Завершено запусков тестирования: {finished}")
+        return len(claimed)
+
+    def start(self, bind):
+        """Запускает потоки рассылки, у каждого своя сессия базы данных"""
+        if self._threads:
+            return
+        self._stopped.clear()
+        make_session = sessionmaker(bind=bind)
+
+        def run():
+            db_ops = DatabaseOperations(make_session())
+            while not self._stopped.is_set():
+                try:
+                    if self.process_batch(db_ops):
+                        continue
+                except Exception as e:
+                    logger.error(f"Ошибка рассылки запуска тестирования: {e}", exc_info=True)
+                finally:
+                    # Соединения возвращаются в пул между пачками; в одном процессе begin_test
+                    # выполняется в этом потоке через db_session
+                    db_ops.session.close()
+                    db_session.remove()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+        for index in range(self.workers):
+            thread = threading.Thread(target=run, name=f'launch-jobs-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        self._threads = []
+
+
+launch_jobs = LaunchJobWorkers()
@@ -0,0 +1,195 @@
+from src.utils.logger import logger
+from src.utils.outbound_queue import outbound_queue
+from typing import Callable, Dict, Optional
+import os
+import threading
+import time
+
+# Сообщение о ходе тестирования обновляется не чаще одного раза за интервал (секунды)
+PROGRESS_UPDATE_INTERVAL = float(os.getenv('PROGRESS_UPDATE_INTERVAL', '3'))
+# Через сколько секунд без событий запуск перестает отслеживаться
+PROGRESS_TTL = float(os.getenv('PROGRESS_TTL', 12 * 60 * 60))
+
+
+class LaunchProgress:
+    """Счетчики одного запуска тестирования и сообщение преподавателя, в котором они показываются"""
+
+    __slots__ = ('chat_id', 'message_id', 'title', 'total', 'delivered', 'failed', 'answering',
+                 'finished', 'percent_sum', 'dirty', 'last_text', 'touched_at')
+
+    def __init__(self, chat_id: int, message_id: int, title: str, total: int, now: float):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self.total = total
+        self.delivered = 0
+        self.failed = 0
+        self.answering = set()
+        self.finished = 0
+        self.percent_sum = 0.0
+        self.dirty = True
+        self.last_text = None
+        self.touched_at = now
+
+    @property
+    def complete(self) -> bool:
+        return self.finished + self.failed >= self.total
+
+    def render(self) -> str:
+        lines = [
+            self.title,
+            "",
+            f"Доставлено: {self.delivered} из {self.total}",
+            f"Отвечают: {len(self.answering)}",
+            f"Завершили: {self.finished}",
+        ]
+        if self.failed:
+            lines.append(f"Не доставлено: {self.failed}")
+        if self.finished:
+            lines.append(f"Средний результат: {self.percent_sum / self.finished:.0f}%")
+        if self.complete:
+            lines += ["", "✅ Тестирование завершено"]
+        return "\n".join(lines)
+
+
+class ProgressBoard:
+    """
+    Ход запусков тестирования для преподавателей.
+
+    События студентов (доставка, ответ, завершение) только меняют счетчики
+    в памяти и помечают запуск измененным. Фоновый поток раз в interval
+    секунд выполняет одно редактирование сообщения на каждый измененный
+    запуск, так что число вызовов Bot API не зависит от числа студентов.
+    """
+
+    def __init__(self, interval: float = PROGRESS_UPDATE_INTERVAL, ttl: float = PROGRESS_TTL,
+                 clock=time.monotonic):
+        self.interval = interval
+        self.ttl = ttl
+        self._clock = clock
+        self._launches: Dict[int, LaunchProgress] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        # relay(epoch, event, args) - передача событий чужих запусков (режим нескольких процессов)
+        self.relay: Optional[Callable] = None
+
+    def __len__(self):
+        return len(self._launches)
+
+    def open(self, epoch: int, chat_id: int, message_id: int, title: str, total: int) -> LaunchProgress:
+        """Начинает отслеживать запуск epoch в сообщении message_id"""
+        with self._lock:
+            progress = LaunchProgress(chat_id, message_id, title, total, self._clock())
+            self._launches[epoch] = progress
+            return progress
+
+    def get(self, epoch: int) -> Optional[LaunchProgress]:
+        return self._launches.get(epoch)
+
+    def take_text(self, epoch: int) -> Optional[str]:
+        """Текст сообщения для немедленной отправки: запуск считается показанным"""
+        with self._lock:
+            progress = self._launches.get(epoch)
+            if progress is None:
+                return None
+            progress.dirty = False
+            progress.last_text = progress.render()
+            return progress.last_text
+
+    def _event(self, epoch: int, event: str, *args, relay: bool = True):
+        with self._lock:
+            progress = self._launches.get(epoch)
+            if progress is not None:
+                getattr(self, f'_on_{event}')(progress, *args)
+                progress.dirty = True
+                progress.touched_at = self._clock()
+                return
+        # Запуск начат в другом процессе: событие передается ему
+        if relay and self.relay is not None:
+            self.relay(epoch, event, list(args))
+
+    def apply(self, epoch: int, event: str, args):
+        """Применяет событие, переданное другим процессом (без повторной передачи)"""
+        self._event(epoch, event, *args, relay=False)
+
+    def delivered(self, epoch: int):
+        self._event(epoch, 'delivered')
+
+    def failed(self, epoch: int):
+        self._event(epoch, 'failed')
+
+    def answered(self, epoch: int, user_id: int):
+        self._event(epoch, 'answered', user_id)
+
+    def finished(self, epoch: int, user_id: int, correct: int, total_questions: int):
+        self._event(epoch, 'finished', user_id, correct, total_questions)
+
+    @staticmethod
+    def _on_delivered(progress):
+        progress.delivered += 1
+
+    @staticmethod
+    def _on_failed(progress):
+        progress.failed += 1
+
+    @staticmethod
+    def _on_answered(progress, user_id):
+        progress.answering.add(user_id)
+
+    @staticmethod
+    def _on_finished(progress, user_id, correct, total_questions):
+        progress.answering.discard(user_id)
+        progress.finished += 1
+        if total_questions:
+            progress.percent_sum += 100 * correct / total_questions
+
+    def flush(self, edit: Callable[[str, int, int], None]) -> int:
+        """
+        Отправляет edit(text, chat_id, message_id) для измененных запусков.
+
+        Завершенные и давно не менявшиеся запуски после этого перестают
+        отслеживаться. Возвращает число отправленных изменений.
+        """
+        now = self._clock()
+        updates = []
+        with self._lock:
+            for epoch, progress in list(self._launches.items()):
+                if progress.dirty:
+                    progress.dirty = False
+                    text = progress.render()
+                    if text != progress.last_text:
+                        progress.last_text = text
+                        updates.append((text, progress.chat_id, progress.message_id))
+                if progress.complete or now - progress.touched_at > self.ttl:
+                    del self._launches[epoch]
+
+        for text, chat_id, message_id in updates:
+            try:
+                edit(text, chat_id, message_id)
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении хода тестирования: {e}", exc_info=True)
+        return len(updates)
+
+    def start(self, bot):
+        """Запускает фоновый поток, обновляющий сообщения через исходящую очередь"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+
+        def edit(text, chat_id, message_id):
+            outbound_queue.put(bot.edit_message_text, text, chat_id, message_id)
+
+        def run():
+            while not self._stopped.wait(self.interval):
+                self.flush(edit)
+
+        self._thread = threading.Thread(target=run, name='launch-progress', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread = None
+
+
+launch_progress = ProgressBoard()
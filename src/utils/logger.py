@@ -1,21 +1,33 @@
 import logging
 import os
+import threading
 from datetime import datetime
 
+# Логгер доступен сразу при импорте; обработчики (файл в LOG_DIR и консоль) подключает setup_logger
+logger = logging.getLogger('telegram_quiz_bot')
+
+_configured = False
+_lock = threading.Lock()
+
 def setup_logger():
-    # Создаем директорию для логов если её нет
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    """Настраивает журналирование процесса (повторные вызовы ничего не меняют)"""
+    global _configured
+    with _lock:
+        if _configured:
+            return logger
+        log_dir = os.getenv('LOG_DIR', 'logs').strip() or 'logs'
 
-    # Настраиваем формат логирования
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(f'logs/bot_{datetime.now().strftime("%Y%m%d")}.log'),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger('telegram_quiz_bot')
+        # Создаем директорию для логов если её нет
+        os.makedirs(log_dir, exist_ok=True)
 
-logger = setup_logger() 
\ No newline at end of file
+        # Настраиваем формат логирования
+        logging.basicConfig(
+            level=os.getenv('LOG_LEVEL', 'INFO').strip().upper() or 'INFO',
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(os.path.join(log_dir, f'bot_{datetime.now().strftime("%Y%m%d")}.log')),
+                logging.StreamHandler()
+            ]
+        )
+        _configured = True
+    return logger
@@ -0,0 +1,248 @@
+"""
+Метрики процесса в текстовом формате Prometheus и проверка здоровья.
+
+Счетчики и гистограммы обновляются в местах обработки (маршрутизатор,
+вызовы Bot API), показатели-снимки (размер хранилищ сессий, пул
+соединений) вычисляются функциями в момент запроса /metrics.
+HTTP-сервер на http.server отдает /metrics и /health (SELECT 1 к базе).
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.logger import logger
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import bisect
+import os
+import threading
+import time
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+# 0 отключает сервер метрик; в режиме нескольких процессов обработчик i слушает METRICS_PORT + i
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Границы корзин гистограмм задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _LatencyHistogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """Реестр метрик процесса"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _LatencyHistogram]] = {}
+        self._gauges: Dict[str, Callable[[], object]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, text: str):
+        self._help[name] = (kind, text)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _LatencyHistogram(len(self.buckets))
+            histogram.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def gauge(self, name: str, text: str, func: Callable[[], object]):
+        """Показатель-снимок: func возвращает число или словарь {метка: значение}"""
+        self.describe(name, 'gauge', text)
+        self._gauges[name] = func
+
+    def _header(self, name: str, default_kind: str):
+        kind, text = self._help.get(name, (default_kind, ''))
+        lines = [f"# HELP {name} {text}"] if text else []
+        lines.append(f"# TYPE {name} {kind}")
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        for name, series in sorted(counters.items()):
+            lines += self._header(name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, series in sorted(histograms.items()):
+            lines += self._header(name, 'histogram')
+            for key, (counts, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        for name, func in sorted(self._gauges.items()):
+            try:
+                value = func()
+            except Exception as e:
+                logger.error(f"Ошибка вычисления метрики {name}: {e}")
+                continue
+            if value is None:
+                continue
+            lines += self._header(name, 'gauge')
+            if isinstance(value, dict):
+                for key, item in sorted(value.items()):
+                    lines.append(f"{name}{_format_labels(_labels(dict(key)))} {_format_value(item)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe('bot_updates_total', 'counter', 'Обработанные обновления по обработчикам')
+metrics.describe('bot_handler_seconds', 'histogram', 'Время работы обработчиков обновлений')
+metrics.describe('bot_api_requests_total', 'counter', 'Вызовы Bot API по методам и кодам ответа')
+metrics.describe('bot_api_seconds', 'histogram', 'Время вызовов Bot API')
+metrics.describe('bot_api_rate_limited_total', 'counter', 'Ответы 429 Too Many Requests')
+
+
+def observe_handler(kind: str, handler: str, started: float, error: bool = False):
+    """Учитывает обработку одного обновления (started - time.perf_counter() до вызова)"""
+    metrics.observe('bot_handler_seconds', time.perf_counter() - started, kind=kind, handler=handler)
+    metrics.inc('bot_updates_total', kind=kind, handler=handler, error=str(error).lower())
+
+
+def instrument_bot_api():
+    """Подключает учет вызовов Bot API через CUSTOM_REQUEST_SENDER"""
+    from telebot import apihelper
+
+    def send(method, url, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        started = time.perf_counter()
+        try:
+            response = apihelper._get_req_session().request(method, url, **kwargs)
+        except Exception:
+            metrics.inc('bot_api_requests_total', method=api_method, code='error')
+            raise
+        finally:
+            metrics.observe('bot_api_seconds', time.perf_counter() - started, method=api_method)
+        metrics.inc('bot_api_requests_total', method=api_method, code=str(response.status_code))
+        if response.status_code == 429:
+            metrics.inc('bot_api_rate_limited_total', method=api_method)
+        return response
+
+    apihelper.CUSTOM_REQUEST_SENDER = send
+
+
+def register_process_gauges(bind):
+    """Показатели-снимки процесса: пул соединений, сессии, очереди"""
+    from src.utils.outbound_queue import outbound_queue
+    from src.utils.state_storage import data_storage, state_storage
+    from src.utils.timer_wheel import question_timers
+
+    pool = bind.pool
+
+    def pool_stats():
+        # У пулов SQLite нет счетчиков соединений
+        if not hasattr(pool, 'checkedout'):
+            return None
+        return {
+            (('state', 'checked_out'),): pool.checkedout(),
+            (('state', 'idle'),): pool.checkedin(),
+            (('state', 'overflow'),): max(pool.overflow(), 0),
+            (('state', 'size'),): pool.size(),
+        }
+
+    def stores(field):
+        def collect():
+            return {(('store', stats['name']),): stats[field]
+                    for stats in (data_storage.data.stats(), state_storage.data.stats())}
+        return collect
+
+    metrics.gauge('bot_db_pool_connections', 'Соединения пула базы данных', pool_stats)
+    metrics.gauge('bot_sessions', 'Записей в хранилищах сессий', stores('size'))
+    metrics.gauge('bot_session_store_bytes', 'Оценка памяти хранилищ сессий', stores('approx_bytes'))
+    metrics.gauge('bot_outbound_queue', 'Вызовов в исходящей очереди', outbound_queue.qsize)
+    metrics.gauge('bot_question_timers', 'Активных сроков ответа на вопросы', lambda: len(question_timers))
+
+
+def check_health(bind) -> Optional[str]:
+    """Проверяет соединение с базой. Возвращает текст ошибки или None"""
+    from sqlalchemy import text
+    try:
+        with bind.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def start_metrics_server(bind, port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Запускает HTTP-сервер /metrics и /health в фоновом потоке (port 0 - не запускать)"""
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._reply(200, metrics.render(), 'text/plain; version=0.0.4; charset=utf-8')
+            elif self.path == '/health':
+                error = check_health(bind)
+                if error is None:
+                    self._reply(200, "ok\n", 'text/plain; charset=utf-8')
+                else:
+                    self._reply(503, f"database: {error}\n", 'text/plain; charset=utf-8')
+            else:
+                self._reply(404, "not found\n", 'text/plain; charset=utf-8')
+
+        def _reply(self, code, body, content_type):
+            data = body.encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            # Опросы Prometheus не пишем в журнал
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return server
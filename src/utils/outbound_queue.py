@@ -0,0 +1,87 @@
+from src.utils.logger import logger
+from telebot.apihelper import ApiTelegramException
+import os
+import queue
+import threading
+import time
+
+# Telegram допускает около 30 сообщений в секунду на бота, оставляем запас
+DEFAULT_RATE_LIMIT = float(os.getenv('OUTBOUND_RATE_LIMIT', '25'))
+MAX_RETRIES = 3
+
+
+class OutboundQueue:
+    """
+    Очередь исходящих вызовов Bot API с ограничением скорости.
+
+    Вызовы выполняются одним фоновым потоком в порядке постановки в очередь,
+    скорость ограничивается token bucket. Ответ 429 (Too Many Requests)
+    обрабатывается ожиданием retry_after и повторной отправкой.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, burst: float = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, func, *args, **kwargs):
+        """Ставит вызов в очередь. Поток отправки запускается при первом вызове"""
+        self._ensure_started()
+        self._queue.put((func, args, kwargs))
+
+    def join(self):
+        """Ожидает выполнения всех поставленных вызовов"""
+        self._queue.join()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='outbound-queue', daemon=True)
+                self._thread.start()
+
+    def _acquire(self):
+        # Token bucket: ждем, пока накопится хотя бы один токен
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            time.sleep((1 - self._tokens) / self.rate)
+
+    def _run(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            try:
+                self._call(func, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def _call(self, func, args, kwargs):
+        for attempt in range(1, MAX_RETRIES + 1):
+            self._acquire()
+            try:
+                return func(*args, **kwargs)
+            except ApiTelegramException as e:
+                if e.error_code != 429 or attempt == MAX_RETRIES:
+                    logger.error(f"Ошибка исходящего вызова {getattr(func, '__name__', func)}: {e}")
+                    return None
+                retry_after = (e.result_json or {}).get('parameters', {}).get('retry_after', 1)
+                logger.warning(f"Превышен лимит Telegram API, повтор через {retry_after} с")
+                time.sleep(retry_after)
+            except Exception as e:
+                logger.error(f"Ошибка исходящего вызова {getattr(func, '__name__', func)}: {e}", exc_info=True)
+                return None
+
+
+outbound_queue = OutboundQueue()
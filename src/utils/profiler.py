@@ -0,0 +1,204 @@
+"""
+Профилирование обработки обновлений по запросу, без перезапуска бота.
+
+Сеанс включается командой /profile или сигналом SIGUSR1 и длится заданное
+число секунд или обновлений. Режимы:
+
+    cprofile - детерминированный профиль каждого вызова обработчика
+               (cProfile); профилируемые вызовы выполняются по одному;
+    sample   - выборка стеков потоков, занятых обработкой, раз в
+               PROFILE_SAMPLE_INTERVAL секунд; отчет в формате collapsed
+               stacks для flamegraph.pl/speedscope. Почти не замедляет бота.
+"""
+from collections import Counter
+from src.utils.logger import logger
+from typing import Callable, Optional
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+PROFILE_MODES = ('cprofile', 'sample')
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+PROFILE_DEFAULT_SECONDS = 30.0
+PROFILE_MAX_SECONDS = 600.0
+# Сколько строк pstats попадает в отчет
+PROFILE_TOP = 60
+
+
+class _Session:
+    def __init__(self, mode: str, seconds: float, updates: Optional[int], on_done: Callable):
+        self.mode = mode
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        self.updates_left = updates
+        self.on_done = on_done
+        self.updates = 0
+        self.stats: Optional[pstats.Stats] = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.threads = set()
+
+
+class DispatchProfiler:
+    """Профилировщик вызовов обработчиков маршрутизатора (один сеанс за раз)"""
+
+    def __init__(self, sample_interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self._session: Optional[_Session] = None
+        self._lock = threading.Lock()
+        # cProfile не допускает одновременных профилировщиков в разных потоках
+        self._cprofile_lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def start(self, mode: str, on_done: Callable[[str, str, str], None], seconds: Optional[float] = None,
+              updates: Optional[int] = None) -> bool:
+        """
+        Начинает сеанс профилирования.
+
+        По окончании вызывается on_done(отчет, имя файла, краткий итог).
+        Возвращает False, если уже идет другой сеанс.
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+        seconds = min(seconds or PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS)
+        with self._lock:
+            if self._session is not None:
+                return False
+            session = self._session = _Session(mode, seconds, updates, on_done)
+
+        if mode == 'sample':
+            threading.Thread(target=self._sample, args=(session,), name='profiler-sampler', daemon=True).start()
+        timer = threading.Timer(seconds, self._finish, args=(session,))
+        timer.daemon = True
+        timer.start()
+        logger.info(f"Профилирование {mode} запущено: {seconds:.0f} с" + (f" или {updates} обновлений" if updates else ""))
+        return True
+
+    def stop(self) -> bool:
+        """Досрочно завершает текущий сеанс с отчетом"""
+        session = self._session
+        if session is None:
+            return False
+        self._finish(session)
+        return True
+
+    def call(self, func: Callable, *args):
+        """Вызывает обработчик обновления, профилируя его, если идет сеанс"""
+        session = self._session
+        if session is None:
+            return func(*args)
+        try:
+            if session.mode == 'cprofile':
+                with self._cprofile_lock:
+                    profile = cProfile.Profile()
+                    profile.enable()
+                    try:
+                        return func(*args)
+                    finally:
+                        profile.disable()
+                        self._add_profile(session, profile)
+
+            thread_id = threading.get_ident()
+            with self._lock:
+                session.threads.add(thread_id)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    session.threads.discard(thread_id)
+        finally:
+            self._count_update(session)
+
+    def _add_profile(self, session: _Session, profile: cProfile.Profile):
+        with self._lock:
+            if session.stats is None:
+                session.stats = pstats.Stats(profile)
+            else:
+                session.stats.add(profile)
+
+    def _count_update(self, session: _Session):
+        with self._lock:
+            session.updates += 1
+            done = session.updates_left is not None and session.updates >= session.updates_left
+        if done:
+            self._finish(session)
+
+    def _sample(self, session: _Session):
+        while self._session is session:
+            with self._lock:
+                threads = list(session.threads)
+            if threads:
+                frames = sys._current_frames()
+                for thread_id in threads:
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                        frame = frame.f_back
+                    session.stacks[';'.join(reversed(stack))] += 1
+                    session.samples += 1
+            time.sleep(self.sample_interval)
+
+    def _finish(self, session: _Session):
+        with self._lock:
+            if self._session is not session:
+                return
+            self._session = None
+        elapsed = time.monotonic() - session.started
+        summary = f"Профиль {session.mode}: {elapsed:.1f} с, обновлений: {session.updates}"
+        try:
+            report, filename = self.report(session, summary)
+            session.on_done(report, filename, summary)
+        except Exception as e:
+            logger.error(f"Ошибка при формировании отчета профилирования: {e}", exc_info=True)
+        logger.info(summary)
+
+    @staticmethod
+    def report(session: _Session, summary: str):
+        """Текст отчета и имя файла для него"""
+        if session.mode == 'sample':
+            lines = [f"{stack} {count}" for stack, count in session.stacks.most_common()]
+            return "\n".join(lines) + "\n", 'profile.collapsed'
+
+        out = io.StringIO()
+        out.write(summary + "\n\n")
+        if session.stats is None:
+            out.write("Нет профилированных вызовов\n")
+        else:
+            session.stats.stream = out
+            session.stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+            session.stats.sort_stats('tottime').print_stats(PROFILE_TOP)
+        return out.getvalue(), 'profile.txt'
+
+
+profiler = DispatchProfiler()
+
+
+def install_profile_signal(directory: str = 'logs', seconds: float = PROFILE_DEFAULT_SECONDS):
+    """SIGUSR1 включает профилирование sample на seconds секунд; отчет пишется в directory"""
+    import signal
+    if not hasattr(signal, 'SIGUSR1'):
+        return
+
+    def save(report, filename, summary):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d_%H%M%S')}_{filename}")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(report)
+        logger.info(f"{summary}. Отчет: {path}")
+
+    def handle(signum, frame):
+        if not profiler.start('sample', save, seconds=seconds):
+            profiler.stop()
+
+    signal.signal(signal.SIGUSR1, handle)
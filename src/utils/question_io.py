@@ -0,0 +1,125 @@
+from src.utils.exceptions import ValidationError
+from src.utils.logger import logger
+from dataclasses import dataclass, field
+from typing import IO, Iterator, List, Tuple
+import csv
+import json
+import os
+
+FORMATS = ('csv', 'jsonl')
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 20
+
+# Формат CSV: section,text,answer_1,answer_2,... (первый вариант ответа — правильный)
+CSV_HEADER = ['section', 'text']
+
+# Формат JSONL: {"section": "...", "text": "...", "answers": ["правильный", "..."]}
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    errors: List[str] = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line_no: int, error: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Строка {line_no}: {error}")
+
+
+def detect_format(filename: str) -> str:
+    """Определяет формат файла по расширению"""
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension == 'json':
+        extension = 'jsonl'
+    if extension not in FORMATS:
+        raise ValidationError(f"Неподдерживаемый формат файла: {filename}. Используйте CSV или JSONL")
+    return extension
+
+
+def iter_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Построчно читает файл, возвращая (номер строки, сырые данные строки)"""
+    if fmt == 'csv':
+        reader = csv.reader(stream)
+        for row in reader:
+            if reader.line_num == 1 and [cell.strip().lower() for cell in row[:2]] == CSV_HEADER:
+                continue
+            if not any(cell.strip() for cell in row):
+                continue
+            yield reader.line_num, {'section': row[0] if row else '', 'text': row[1] if len(row) > 1 else '',
+                                    'answers': row[2:]}
+    else:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, ValidationError(f"некорректный JSON ({e})")
+
+
+def validate_row(row) -> Tuple[str, str, List[str]]:
+    """Проверяет строку импорта и возвращает (текст, раздел, варианты ответов)"""
+    if isinstance(row, ValidationError):
+        raise row
+    if not isinstance(row, dict):
+        raise ValidationError("ожидается объект с полями section, text, answers")
+
+    section = str(row.get('section') or '').strip()
+    text = str(row.get('text') or '').strip()
+    answers = row.get('answers')
+    if not isinstance(answers, list):
+        raise ValidationError("поле answers должно быть списком")
+    answers = [str(answer).strip() for answer in answers if str(answer).strip()]
+
+    if not section:
+        raise ValidationError("не указан раздел")
+    if not text:
+        raise ValidationError("не указан текст вопроса")
+    if len(answers) < 2:
+        raise ValidationError("необходимо как минимум два варианта ответа")
+    return text, section, answers
+
+
+def import_questions(db_ops, stream: IO[str], fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> ImportResult:
+    """
+    Импортирует вопросы из потока CSV/JSONL.
+
+    Строки проверяются по одной, корректные накапливаются в пачки и
+    записываются bulk INSERT'ами, поэтому память ограничена размером пачки.
+    Некорректные строки пропускаются и попадают в отчет.
+    """
+    result = ImportResult()
+    batch = []
+    for line_no, row in iter_rows(stream, fmt):
+        try:
+            batch.append(validate_row(row))
+        except ValidationError as e:
+            result.add_error(line_no, str(e))
+            continue
+        if len(batch) >= batch_size:
+            result.imported += db_ops.bulk_create_questions(batch)
+            batch = []
+    if batch:
+        result.imported += db_ops.bulk_create_questions(batch)
+
+    logger.info(f"Импортировано вопросов: {result.imported}, ошибок: {result.error_count}")
+    return result
+
+
+def export_questions(db_ops, out: IO[str], fmt: str, section: str = None) -> int:
+    """Выгружает вопросы в поток CSV/JSONL. Возвращает число выгруженных вопросов"""
+    writer = csv.writer(out) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(CSV_HEADER + ['answers...'])
+
+    count = 0
+    for section_name, text, answers in db_ops.iter_questions_with_options(section):
+        if writer:
+            writer.writerow([section_name, text] + answers)
+        else:
+            out.write(json.dumps({'section': section_name, 'text': text, 'answers': answers}, ensure_ascii=False))
+            out.write('\n')
+        count += 1
+    return count
@@ -0,0 +1,186 @@
+from src.database.models import Question
+from src.utils.cluster import cluster
+from array import array
+from typing import Dict, Iterable, Optional
+import random
+import threading
+
+
+class AskedSet:
+    """
+    Множество уже заданных вопросов раздела для одного студента.
+
+    Хранится как перестановка позиций вопросов раздела в компактном массиве:
+    первые `remaining` элементов — еще не заданные вопросы, остальные — заданные.
+    Случайный выбор незаданного вопроса и сброс меток выполняются за O(1).
+    """
+
+    __slots__ = ('order', 'remaining')
+
+    def __init__(self, size: int = 0):
+        self.order = array('I', range(size))
+        self.remaining = size
+
+    def __len__(self):
+        return len(self.order)
+
+    def grow(self, size: int):
+        """Добавляет новые вопросы раздела в число незаданных"""
+        order = self.order
+        while len(order) < size:
+            order.append(len(order))
+            # Переносим новую позицию в незаданную часть массива
+            last = len(order) - 1
+            order[last], order[self.remaining] = order[self.remaining], order[last]
+            self.remaining += 1
+
+    def draw(self) -> int:
+        """Возвращает позицию случайного незаданного вопроса и помечает его заданным"""
+        order = self.order
+        j = random.randrange(self.remaining)
+        self.remaining -= 1
+        order[j], order[self.remaining] = order[self.remaining], order[j]
+        return order[self.remaining]
+
+    def reset(self):
+        """Снимает метки со всех вопросов раздела"""
+        self.remaining = len(self.order)
+
+
+class QuestionPool:
+    """
+    Выбор случайного еще не заданного вопроса раздела.
+
+    Идентификаторы вопросов раздела загружаются из базы один раз и дополняются
+    при создании новых вопросов; метки заданных вопросов хранятся в памяти
+    отдельно для каждой пары (студент, раздел) и не затрагивают историю ответов.
+    Метки студента освобождаются вызовом reset, когда его сессия тестирования
+    начинается или заканчивается.
+    """
+
+    def __init__(self):
+        self._sections: Dict[str, array] = {}
+        self._asked: Dict[int, Dict[str, AskedSet]] = {}
+        self._positions: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def section_ids(self, session, section: str) -> array:
+        """Возвращает идентификаторы вопросов раздела"""
+        ids = self._sections.get(section)
+        if ids is None:
+            rows = session.query(Question.id).filter_by(section=section).order_by(Question.id).all()
+            with self._lock:
+                ids = self._sections.setdefault(section, array('q', (row[0] for row in rows)))
+        return ids
+
+    def load_section(self, section: str, question_ids):
+        """Задает идентификаторы вопросов раздела без обращения к базе"""
+        with self._lock:
+            self._sections[section] = array('q', question_ids)
+            self._positions.pop(section, None)
+
+    def _asked_set(self, user_id: int, section: str) -> AskedSet:
+        # Вызывается под self._lock
+        sections = self._asked.get(user_id)
+        if sections is None:
+            sections = self._asked[user_id] = {}
+        asked = sections.get(section)
+        if asked is None:
+            asked = sections[section] = AskedSet()
+        return asked
+
+    def draw(self, session, user_id: int, section: str) -> Optional[int]:
+        """
+        Выбирает случайный незаданный вопрос раздела и помечает его заданным.
+
+        Когда все вопросы раздела заданы, метки сбрасываются и выбор
+        продолжается среди тех же вопросов. Для пустого раздела возвращает None.
+        """
+        ids = self.section_ids(session, section)
+        if not ids:
+            return None
+        with self._lock:
+            asked = self._asked_set(user_id, section)
+            if len(asked) < len(ids):
+                asked.grow(len(ids))
+            if not asked.remaining:
+                asked.reset()
+            return ids[asked.draw()]
+
+    def mark_asked(self, session, user_id: int, section: str, question_ids):
+        """Помечает вопросы раздела заданными (используется при восстановлении сессий)"""
+        ids = self.section_ids(session, section)
+        positions = self._positions.get(section)
+        if positions is None or len(positions) != len(ids):
+            positions = self._positions[section] = {question_id: pos for pos, question_id in enumerate(ids)}
+        with self._lock:
+            asked = self._asked_set(user_id, section)
+            if len(asked) < len(ids):
+                asked.grow(len(ids))
+            order = asked.order
+            for question_id in question_ids:
+                pos = positions.get(question_id)
+                if pos is None or not asked.remaining:
+                    continue
+                try:
+                    j = order.index(pos, 0, asked.remaining)
+                except ValueError:
+                    continue
+                asked.remaining -= 1
+                order[j], order[asked.remaining] = order[asked.remaining], order[j]
+
+    def remaining(self, user_id: int, section: str) -> Optional[int]:
+        """Количество незаданных вопросов раздела или None, если студент его еще не проходил"""
+        asked = self._asked.get(user_id, {}).get(section)
+        if asked is None:
+            return None
+        return asked.remaining + max(len(self._sections.get(section, ())) - len(asked), 0)
+
+    def reset(self, user_id: int, section: Optional[str] = None):
+        """Сбрасывает метки студента по разделу или по всем разделам и освобождает занятую ими память"""
+        with self._lock:
+            if section is None:
+                self._asked.pop(user_id, None)
+                return
+            sections = self._asked.get(user_id)
+            if sections is not None:
+                sections.pop(section, None)
+                if not sections:
+                    del self._asked[user_id]
+
+    def clear(self):
+        """Сбрасывает метки всех студентов"""
+        with self._lock:
+            self._asked.clear()
+
+    def add_question(self, section: str, question_id: int):
+        """Добавляет созданный вопрос в уже загруженный раздел"""
+        self.add_questions(section, [question_id])
+
+    def add_questions(self, section: str, question_ids: Iterable[int]):
+        """Добавляет созданные вопросы в уже загруженный раздел"""
+        with self._lock:
+            ids = self._sections.get(section)
+            if ids is not None:
+                ids.extend(question_ids)
+
+    def invalidate(self, section: Optional[str] = None):
+        """Сбрасывает кэш раздела (или всех разделов) вместе с метками студентов"""
+        with self._lock:
+            if section is None:
+                self._sections.clear()
+                self._positions.clear()
+                self._asked.clear()
+                return
+            self._sections.pop(section, None)
+            self._positions.pop(section, None)
+            for user_id in list(self._asked):
+                sections = self._asked[user_id]
+                sections.pop(section, None)
+                if not sections:
+                    del self._asked[user_id]
+
+
+question_pool = QuestionPool()
+# Созданные вопросы добавляются в пул каждого процесса-обработчика
+cluster.task('add_questions', question_pool.add_questions)
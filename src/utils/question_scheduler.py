@@ -0,0 +1,59 @@
+from src.utils.question_pool import QuestionPool, question_pool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class QuestionScheduler:
+    """
+    Порядок выдачи вопросов студенту по нескольким разделам.
+
+    Разделы чередуются по кругу, из каждого раздела берется случайный еще не
+    заданный вопрос (см. QuestionPool). Вопросы выбираются лениво генератором,
+    поэтому в памяти находится только следующий вопрос, а не весь тест.
+
+    По умолчанию тест длится один проход по всем вопросам выбранных разделов;
+    limit позволяет задать другое число вопросов. Раздел, все вопросы которого
+    уже заданы в этом тесте, выбывает из чередования, поэтому вопросы меньших
+    разделов не повторяются.
+    """
+
+    def __init__(self, user_id: int, sections: List[str], session=None,
+                 pool: QuestionPool = question_pool, limit: Optional[int] = None):
+        self.user_id = user_id
+        self.sections = list(sections)
+        self.session = session
+        self.pool = pool
+        self.limit = limit
+        self.issued = 0
+        # Сколько вопросов каждого раздела выдано в этом тесте
+        self.issued_by_section: Dict[str, int] = {}
+        self._iterator = None
+
+    @property
+    def total(self) -> int:
+        """Общее число вопросов в тесте"""
+        if self.limit is None:
+            self.limit = sum(len(self.pool.section_ids(self.session, section)) for section in self.sections)
+        return self.limit
+
+    def _left(self, section: str) -> int:
+        return len(self.pool.section_ids(self.session, section)) - self.issued_by_section.get(section, 0)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        total = self.total
+        while self.issued < total:
+            active = [section for section in self.sections if self._left(section) > 0]
+            if not active:
+                return
+            for section in active:
+                if self.issued >= total:
+                    return
+                question_id = self.pool.draw(self.session, self.user_id, section)
+                self.issued += 1
+                self.issued_by_section[section] = self.issued_by_section.get(section, 0) + 1
+                yield section, question_id
+
+    def next(self) -> Optional[Tuple[str, int]]:
+        """Возвращает (раздел, id вопроса) следующего вопроса или None, если тест окончен"""
+        if self._iterator is None:
+            self._iterator = iter(self)
+        return next(self._iterator, None)
@@ -0,0 +1,139 @@
+from src.utils.logger import logger
+from typing import IO, List, Optional
+import csv
+import io
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl указан в requirements.txt; без него рейтинг выгружается в CSV
+    Workbook = None
+
+# Сколько вопросов показывать в отчете в чате
+REPORT_QUESTIONS = 15
+# Вопросы для выгрузки обрабатываются пачками (запрос вариантов ответов на пачку)
+EXPORT_BATCH_SIZE = 500
+
+RATINGS_FORMATS = ('csv', 'xlsx')
+RATINGS_HEADER = ['Фамилия', 'Имя', 'Раздел', 'Баллы']
+
+QUESTION_STATS_HEADER = ['section', 'question', 'attempts', 'correct', 'correct_rate', 'mean_response_s',
+                         'options...']
+
+
+def correct_rate(stats) -> float:
+    return stats.correct / stats.attempts if stats.attempts else 0.0
+
+
+def mean_response_s(stats) -> Optional[float]:
+    if not stats.timed_attempts:
+        return None
+    return stats.response_ms_total / stats.timed_attempts / 1000
+
+
+def format_question_stats(rows, picks) -> str:
+    """Текст отчета по вопросам (строки get_question_stats и варианты из get_option_picks)"""
+    lines = ["📉 Статистика вопросов (сначала самые трудные):", ""]
+    for question, stats in rows:
+        mean = mean_response_s(stats)
+        lines.append(f"❓ {question.text} ({question.section})")
+        lines.append(
+            f"Верно: {stats.correct} из {stats.attempts} ({correct_rate(stats):.0%})"
+            + (f", ср. время: {mean:.1f} с" if mean is not None else "")
+        )
+        for text, is_correct, count in picks.get(question.id, []):
+            share = count / stats.attempts if stats.attempts else 0
+            lines.append(f"  {'✅' if is_correct else '▫️'} {text}: {count} ({share:.0%})")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def export_question_stats(db_ops, out: IO[str], section: Optional[str] = None) -> int:
+    """Выгружает статистику вопросов в CSV. Возвращает число выгруженных вопросов"""
+    writer = csv.writer(out)
+    writer.writerow(QUESTION_STATS_HEADER)
+    rows = db_ops.get_question_stats(section)
+    for start in range(0, len(rows), EXPORT_BATCH_SIZE):
+        batch = rows[start:start + EXPORT_BATCH_SIZE]
+        picks = db_ops.get_option_picks([question.id for question, _ in batch])
+        for question, stats in batch:
+            mean = mean_response_s(stats)
+            options: List = []
+            for text, _, count in picks.get(question.id, []):
+                options += [text, count]
+            writer.writerow([
+                question.section, question.text, stats.attempts, stats.correct,
+                f"{correct_rate(stats):.3f}", f"{mean:.2f}" if mean is not None else '',
+            ] + options)
+    return len(rows)
+
+
+def format_duration(microseconds: Optional[float]) -> str:
+    if microseconds is None:
+        return '-'
+    if microseconds >= 1_000_000:
+        return f"{microseconds / 1_000_000:.1f} с"
+    return f"{microseconds / 1000:.0f} мс"
+
+
+def format_percentiles(histogram) -> str:
+    values = histogram.percentiles((50, 90, 99))
+    return (f"p50 {format_duration(values[50])}, p90 {format_duration(values[90])}, "
+            f"p99 {format_duration(values[99])}, max {format_duration(histogram.max)} (n={histogram.total})")
+
+
+def format_latency_report(stats, question_texts, student_names, limit: int = 10) -> str:
+    """Текст отчета о времени ответов студентов и времени обработки ботом"""
+    lines = [
+        "⏱ Время ответов",
+        "",
+        f"Обдумывание (от вопроса до ответа): {format_percentiles(stats.think_total)}",
+        f"Обработка ответа ботом: {format_percentiles(stats.processing_total)}",
+        "",
+        "Самые долгие вопросы (по медиане):",
+    ]
+    for question_id, histogram in stats.slowest(stats.think_by_question, limit):
+        lines.append(f"• {question_texts.get(question_id, question_id)}: {format_percentiles(histogram)}")
+    lines += ["", "Студенты с самым долгим временем ответа (по медиане):"]
+    for user_id, histogram in stats.slowest(stats.think_by_student, limit):
+        lines.append(f"• {student_names.get(user_id, user_id)}: {format_percentiles(histogram)}")
+    return "\n".join(lines)
+
+
+def ratings_format(fmt: str) -> str:
+    """Формат выгрузки рейтинга с учетом доступности openpyxl"""
+    if fmt == 'xlsx' and Workbook is None:
+        logger.warning("openpyxl не установлен, рейтинг будет выгружен в CSV")
+        return 'csv'
+    return fmt
+
+
+def export_ratings(db_ops, stream: IO[bytes], fmt: str, name: Optional[str] = None,
+                   section: Optional[str] = None) -> int:
+    """
+    Выгружает рейтинг в бинарный поток в формате CSV или XLSX.
+
+    Строки читаются из базы пачками и сразу пишутся в файл; XLSX создается
+    в режиме write_only, который не держит лист в памяти.
+    Возвращает число выгруженных строк.
+    """
+    rows = db_ops.iter_scores(name=name, section=section)
+    count = 0
+    if ratings_format(fmt) == 'xlsx':
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Рейтинг')
+        sheet.append(RATINGS_HEADER)
+        for row in rows:
+            sheet.append(row)
+            count += 1
+        workbook.save(stream)
+        return count
+
+    out = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    writer = csv.writer(out)
+    writer.writerow(RATINGS_HEADER)
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    out.flush()
+    out.detach()
+    return count
@@ -0,0 +1,41 @@
+from typing import Callable, Dict, Optional
+import threading
+
+ROLE_TEACHER = 'teacher'
+ROLE_STUDENT = 'student'
+
+
+class RoleCache:
+    """
+    Кэш ролей пользователей по telegram_id.
+
+    Роль нужна для маршрутизации каждого входящего обновления, поэтому она
+    читается из базы один раз и затем берется из памяти. Кэш сбрасывается
+    операциями, меняющими роль (создание пользователя, назначение преподавателем).
+    """
+
+    def __init__(self):
+        self._roles: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, loader: Callable[[int], str]) -> str:
+        role = self._roles.get(user_id)
+        if role is None:
+            role = loader(user_id)
+            with self._lock:
+                self._roles[user_id] = role
+        return role
+
+    def set(self, user_id: int, role: str):
+        with self._lock:
+            self._roles[user_id] = role
+
+    def invalidate(self, user_id: Optional[int] = None):
+        with self._lock:
+            if user_id is None:
+                self._roles.clear()
+            else:
+                self._roles.pop(user_id, None)
+
+
+role_cache = RoleCache()
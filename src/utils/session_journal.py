@@ -0,0 +1,207 @@
+from src.utils.logger import logger
+from typing import Any, Dict, Optional
+import json
+import os
+import queue
+import threading
+import time
+
+JOURNAL_FILE = 'sessions.journal'
+SNAPSHOT_FILE = 'sessions.snapshot'
+
+# Записи пачкой сбрасываются на диск (fsync) не реже FSYNC_INTERVAL секунд
+FSYNC_INTERVAL = float(os.getenv('SESSION_JOURNAL_FSYNC_INTERVAL', '0.05'))
+FSYNC_BATCH = 256
+# После COMPACT_RECORDS записей журнал сворачивается в снимок
+COMPACT_RECORDS = int(os.getenv('SESSION_JOURNAL_COMPACT_RECORDS', '100000'))
+
+
+def apply_record(state: Dict[int, dict], record: dict):
+    """
+    Применяет запись журнала к состоянию сессий.
+
+    Типы записей:
+        start    — запуск теста (разделы, эпоха, ограничение времени на вопрос)
+        question — студенту отправлен вопрос (id вопроса, варианты ответов в порядке кнопок)
+        answer   — студент ответил на текущий вопрос
+        finish   — тест завершен, сессия больше не восстанавливается
+        drop     — сессии сброшены (по пользователю, по запуску или все)
+    """
+    kind = record['t']
+    user_id = record.get('u')
+    if kind == 'start':
+        state[user_id] = {
+            'sections': record['sections'],
+            'epoch': record['epoch'],
+            'time_limit': record.get('time_limit'),
+            'index': 0,
+            'score': 0,
+            'question': None,
+            'options': None,
+            'asked': {},
+            'ts': record['ts'],
+        }
+        return
+    if kind == 'drop':
+        if user_id is not None:
+            state.pop(user_id, None)
+        elif record.get('epoch') is not None:
+            for key in [key for key, session in state.items() if session['epoch'] == record['epoch']]:
+                del state[key]
+        else:
+            state.clear()
+        return
+
+    session = state.get(user_id)
+    if session is None:
+        return
+    session['ts'] = record['ts']
+    if kind == 'question':
+        session['question'] = record['q']
+        session['options'] = record['options']
+        session['asked'].setdefault(record['section'], []).append(record['q'])
+    elif kind == 'answer':
+        session['index'] += 1
+        session['score'] += 1 if record['correct'] else 0
+        session['question'] = None
+        session['options'] = None
+    elif kind == 'finish':
+        del state[user_id]
+
+
+class SessionJournal:
+    """
+    Журнал переходов сессий тестирования на локальном диске.
+
+    Переходы дописываются в файл JSON-строками фоновым потоком, fsync
+    выполняется пачками. Поток ведет в памяти текущее состояние сессий и
+    периодически сохраняет его снимком, после чего журнал обрезается.
+    При запуске бота снимок и хвост журнала воспроизводятся, и незавершенные
+    сессии восстанавливаются. Пока журнал не открыт, record() ничего не делает.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None):
+        self.directory = directory
+        self.ttl = ttl
+        self._queue = queue.Queue()
+        self._state: Dict[int, dict] = {}
+        self._seq = 0
+        self._file = None
+        self._thread = None
+        self._records_since_compact = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load(self) -> Dict[int, dict]:
+        """Читает снимок и воспроизводит журнал. Возвращает состояние незавершенных сессий"""
+        state, last_seq = {}, 0
+        snapshot_path = self._path(SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            last_seq = snapshot['seq']
+            state = {int(user_id): session for user_id, session in snapshot['sessions'].items()}
+
+        seq = last_seq
+        journal_path = self._path(JOURNAL_FILE)
+        if os.path.exists(journal_path):
+            with open(journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Недописанная последняя строка после аварийного завершения
+                        logger.warning("Пропущена поврежденная запись журнала сессий")
+                        continue
+                    if record['seq'] <= last_seq:
+                        continue
+                    apply_record(state, record)
+                    seq = record['seq']
+
+        self._expire(state)
+        self._state, self._seq = state, seq
+        return state
+
+    def open(self) -> Dict[int, dict]:
+        """Восстанавливает состояние, сворачивает журнал и начинает запись новых переходов"""
+        os.makedirs(self.directory, exist_ok=True)
+        state = self.load()
+        self._compact()
+        self._file = open(self._path(JOURNAL_FILE), 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='session-journal', daemon=True)
+        self._thread.start()
+        return state
+
+    def record(self, kind: str, user_id: Optional[int] = None, **fields: Any):
+        """Ставит переход сессии в очередь записи"""
+        if self._file is None:
+            return
+        fields.update(t=kind, u=user_id, ts=time.time())
+        self._queue.put(fields)
+
+    def flush(self):
+        """Дожидается записи всех поставленных переходов на диск"""
+        if self._file is not None:
+            self._queue.join()
+
+    def _expire(self, state: Dict[int, dict]):
+        if self.ttl is None:
+            return
+        deadline = time.time() - self.ttl
+        for user_id in [user_id for user_id, session in state.items() if session['ts'] < deadline]:
+            del state[user_id]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FSYNC_INTERVAL
+            while len(batch) < FSYNC_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                if self._records_since_compact >= COMPACT_RECORDS:
+                    self._file.close()
+                    self._compact()
+                    self._file = open(self._path(JOURNAL_FILE), 'a', encoding='utf-8')
+            except Exception as e:
+                logger.error(f"Ошибка записи журнала сессий: {e}", exc_info=True)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            self._seq += 1
+            record['seq'] = self._seq
+            apply_record(self._state, record)
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records_since_compact += len(batch)
+
+    def _compact(self):
+        # Снимок пишется во временный файл и атомарно подменяет старый;
+        # записи журнала с seq <= seq снимка при чтении пропускаются
+        self._expire(self._state)
+        tmp_path = self._path(SNAPSHOT_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'seq': self._seq, 'sessions': self._state}, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(SNAPSHOT_FILE))
+        open(self._path(JOURNAL_FILE), 'w').close()
+        self._records_since_compact = 0
+        logger.info(f"Журнал сессий свернут в снимок: {len(self._state)} сессий")
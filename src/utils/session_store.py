@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from src.utils.logger import logger
+from typing import Any, Callable, Dict, Hashable, Optional
+import sys
+import threading
+import time
+
+STATS_SAMPLE_SIZE = 100
+
+
+class _Entry:
+    __slots__ = ('value', 'created', 'accessed', 'run_id')
+
+    def __init__(self, value, now: float, run_id=None):
+        self.value = value
+        self.created = now
+        self.accessed = now
+        self.run_id = run_id
+
+
+def _deep_sizeof(obj, seen=None) -> int:
+    # Приблизительный размер словарей/списков сессии вместе с содержимым
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+class SessionStore(MutableMapping):
+    """
+    Словарь сессий с ограниченным временем жизни и размером.
+
+    Запись удаляется, если с момента создания прошло больше ttl секунд или
+    к ней не обращались дольше idle_ttl секунд. При превышении max_size
+    вытесняются записи, к которым дольше всего не обращались (LRU).
+    Просроченные записи удаляются при обращении и фоновым потоком (sweeper).
+
+    Записи можно пометить идентификатором запуска теста (run_id), чтобы
+    сбрасывать сессии одного запуска, не затрагивая остальных пользователей.
+
+    on_evict(key, reason) вызывается для каждой записи, вытесненной по
+    времени жизни или размеру (reason - 'ttl', 'idle' или 'size').
+    """
+
+    def __init__(self, ttl: Optional[float] = None, idle_ttl: Optional[float] = None,
+                 max_size: Optional[int] = None, name: str = 'sessions', clock=time.monotonic,
+                 on_evict: Optional[Callable[[Hashable, str], None]] = None):
+        self.ttl = ttl
+        self.idle_ttl = idle_ttl
+        self.max_size = max_size
+        self.name = name
+        self.on_evict = on_evict
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._sweeper = None
+        self._stopped = threading.Event()
+        self.evicted = {'ttl': 0, 'idle': 0, 'size': 0, 'run': 0}
+
+    def _expired(self, entry: _Entry, now: float) -> Optional[str]:
+        if self.ttl is not None and now - entry.created > self.ttl:
+            return 'ttl'
+        if self.idle_ttl is not None and now - entry.accessed > self.idle_ttl:
+            return 'idle'
+        return None
+
+    def _evict(self, key, reason: str):
+        del self._entries[key]
+        self.evicted[reason] += 1
+        if self.on_evict is not None:
+            try:
+                self.on_evict(key, reason)
+            except Exception as e:
+                logger.error(f"Хранилище {self.name}: ошибка обработки вытеснения {key}: {e}", exc_info=True)
+
+    def _live_entry(self, key) -> _Entry:
+        entry = self._entries[key]
+        now = self._clock()
+        reason = self._expired(entry, now)
+        if reason:
+            self._evict(key, reason)
+            raise KeyError(key)
+        entry.accessed = now
+        self._entries.move_to_end(key)
+        return entry
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._live_entry(key).value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def set(self, key, value, run_id=None):
+        """Сохраняет запись. run_id помечает запись запуском теста (метка сохраняется при обновлении)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry, self._clock()):
+                entry.value = value
+                entry.accessed = self._clock()
+                if run_id is not None:
+                    entry.run_id = run_id
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = _Entry(value, self._clock(), run_id)
+            self._entries.move_to_end(key)
+            if self.max_size is not None:
+                while len(self._entries) > self.max_size:
+                    self._evict(next(iter(self._entries)), 'size')
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._entries[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            try:
+                self._live_entry(key)
+                return True
+            except KeyError:
+                return False
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def run_id(self, key) -> Any:
+        """Метка запуска теста для записи"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.run_id if entry else None
+
+    def evict_run(self, run_id) -> int:
+        """Удаляет все записи запуска теста. Возвращает число удаленных записей"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.run_id == run_id]
+            for key in keys:
+                del self._entries[key]
+            self.evicted['run'] += len(keys)
+            return len(keys)
+
+    def sweep(self) -> int:
+        """Удаляет просроченные записи. Возвращает число удаленных записей"""
+        removed = 0
+        with self._lock:
+            now = self._clock()
+            for key in list(self._entries):
+                reason = self._expired(self._entries[key], now)
+                if reason:
+                    self._evict(key, reason)
+                    removed += 1
+        return removed
+
+    def start_sweeper(self, interval: float = 60.0):
+        """Запускает фоновый поток очистки просроченных записей"""
+        if self._sweeper is not None:
+            return
+        self._stopped.clear()
+
+        def run():
+            while not self._stopped.wait(interval):
+                try:
+                    removed = self.sweep()
+                    if removed:
+                        logger.info(f"Хранилище {self.name}: удалено просроченных записей: {removed}")
+                except Exception as e:
+                    logger.error(f"Ошибка очистки хранилища {self.name}: {e}", exc_info=True)
+
+        self._sweeper = threading.Thread(target=run, name=f'{self.name}-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stopped.set()
+        self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер хранилища, счетчики вытеснения и оценка занимаемой памяти"""
+        with self._lock:
+            size = len(self._entries)
+            sample = [entry.value for _, entry in zip(range(STATS_SAMPLE_SIZE), reversed(self._entries.values()))]
+        approx_bytes = 0
+        if sample:
+            approx_bytes = sum(_deep_sizeof(value) for value in sample) * size // len(sample)
+        return {
+            'name': self.name,
+            'size': size,
+            'max_size': self.max_size,
+            'evicted': dict(self.evicted),
+            'approx_bytes': approx_bytes,
+        }
@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+from src.utils.logger import logger
+from typing import Callable, Dict
+import os
+import time
+
+# Ожидаемое время подготовки процесса, секунды; превышение пишется в журнал предупреждением
+STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET', '5'))
+
+
+class StartupTimer:
+    """Замеры этапов запуска процесса"""
+
+    def __init__(self, budget: float = STARTUP_BUDGET, clock: Callable[[], float] = time.perf_counter):
+        self.budget = budget
+        self.clock = clock
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + self.clock() - started
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def snapshot(self) -> Dict[tuple, float]:
+        """Длительности этапов для метрики bot_startup_seconds"""
+        return {(('phase', name),): seconds for name, seconds in self.phases.items()}
+
+    def report(self) -> bool:
+        """Пишет длительности этапов в журнал. Возвращает False, если бюджет превышен"""
+        summary = ", ".join(f"{name} {seconds:.3f}" for name, seconds in self.phases.items())
+        if self.budget and self.total > self.budget:
+            logger.warning(f"Запуск занял {self.total:.3f} с при бюджете {self.budget:.1f} с: {summary}")
+            return False
+        logger.info(f"Запуск занял {self.total:.3f} с: {summary}")
+        return True
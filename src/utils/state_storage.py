@@ -1,11 +1,44 @@
 from telebot.storage import StateMemoryStorage
+from src.utils.session_store import SessionStore
+from src.utils.session_journal import SessionJournal
+from src.utils.question_pool import question_pool
+import os
+
+# Ограничения хранилищ сессий (секунды / число записей)
+SESSION_TTL = float(os.getenv('SESSION_TTL', 12 * 60 * 60))
+SESSION_IDLE_TTL = float(os.getenv('SESSION_IDLE_TTL', 2 * 60 * 60))
+SESSION_MAX_SIZE = int(os.getenv('SESSION_MAX_SIZE', 20000))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', 60))
+# Каталог журнала сессий (пустое значение отключает журнал)
+SESSION_JOURNAL_DIR = os.getenv('SESSION_JOURNAL_DIR', 'data')
+
+class BoundedStateMemoryStorage(StateMemoryStorage):
+    """Хранилище состояний telebot поверх SessionStore"""
+
+    def __init__(self):
+        super().__init__()
+        self.data = SessionStore(SESSION_TTL, SESSION_IDLE_TTL, SESSION_MAX_SIZE, name='states')
 
 # Создаем глобальное хранилище состояний
-state_storage = StateMemoryStorage()
+state_storage = BoundedStateMemoryStorage()
+
+# Журнал переходов сессий тестирования для восстановления после перезапуска
+session_journal = SessionJournal(SESSION_JOURNAL_DIR or None, ttl=SESSION_TTL)
+
+def drop_evicted_session(user_id, reason):
+    # Вытесненная сессия не должна восстанавливаться после перезапуска
+    session_journal.record('drop', user_id)
+    question_pool.reset(user_id)
 
 # Добавляем глобальное хранилище данных
 class DataStorage:
     def __init__(self):
-        self.data = {}
+        self.data = SessionStore(SESSION_TTL, SESSION_IDLE_TTL, SESSION_MAX_SIZE, name='test_sessions',
+                                 on_evict=drop_evicted_session)
+
+data_storage = DataStorage()
 
-data_storage = DataStorage() 
\ No newline at end of file
+def start_session_sweepers(interval: float = SESSION_SWEEP_INTERVAL):
+    # Фоновая очистка просроченных сессий
+    state_storage.data.start_sweeper(interval)
+    data_storage.data.start_sweeper(interval)
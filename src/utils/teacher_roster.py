@@ -0,0 +1,78 @@
+"""
+Список преподавателей для DatabaseOperations.init_teachers.
+
+Преподаватели берутся из ADMIN_USER_IDS (id через запятую) и из файла
+TEACHERS_FILE - CSV в формате telegram_id[,фамилия,имя]. Строка заголовка
+(telegram_id,...), пустые строки и строки, начинающиеся с #, пропускаются.
+"""
+from dataclasses import dataclass
+from src.utils.logger import logger
+from typing import IO, Dict, Iterable, List, Optional
+import csv
+
+ROSTER_HEADER = 'telegram_id'
+
+
+@dataclass
+class RosterEntry:
+    telegram_id: int
+    last_name: Optional[str] = None
+    first_name: Optional[str] = None
+
+
+def _entry(values: List[str], source: str) -> Optional[RosterEntry]:
+    values = [value.strip() for value in values]
+    try:
+        telegram_id = int(values[0])
+    except ValueError:
+        logger.error(f"Неверный id преподавателя ({source}): {values[0]}")
+        return None
+    last_name = values[1] if len(values) > 1 and values[1] else None
+    first_name = ' '.join(value for value in values[2:] if value) or None
+    return RosterEntry(telegram_id, last_name, first_name)
+
+
+def parse_admin_ids(value: str) -> List[RosterEntry]:
+    """Разбирает ADMIN_USER_IDS"""
+    entries = (_entry([item], 'ADMIN_USER_IDS') for item in value.split(',') if item.strip())
+    return [entry for entry in entries if entry]
+
+
+def read_roster(stream: IO[str]) -> List[RosterEntry]:
+    """Разбирает CSV-список преподавателей"""
+    entries = []
+    for line_no, row in enumerate(csv.reader(stream), 1):
+        if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+            continue
+        if line_no == 1 and row[0].strip().lower() == ROSTER_HEADER:
+            continue
+        entry = _entry(row, f"строка {line_no}")
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+def merge_entries(*sources: Iterable[RosterEntry]) -> List[RosterEntry]:
+    """Объединяет списки: каждый id один раз, имена берутся из записи, где они указаны"""
+    merged: Dict[int, RosterEntry] = {}
+    for source in sources:
+        for entry in source:
+            known = merged.get(entry.telegram_id)
+            if known is None:
+                merged[entry.telegram_id] = entry
+            else:
+                known.last_name = entry.last_name or known.last_name
+                known.first_name = entry.first_name or known.first_name
+    return list(merged.values())
+
+
+def load_teachers(admin_ids: str, roster_path: Optional[str] = None) -> List[RosterEntry]:
+    """Преподаватели из ADMIN_USER_IDS и файла roster_path (если задан)"""
+    sources = [parse_admin_ids(admin_ids or '')]
+    if roster_path:
+        try:
+            with open(roster_path, encoding='utf-8-sig', newline='') as stream:
+                sources.append(read_roster(stream))
+        except OSError as e:
+            logger.error(f"Не удалось прочитать список преподавателей {roster_path}: {e}")
+    return merge_entries(*sources)
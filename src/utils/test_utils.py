@@ -1,9 +1,33 @@
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+from src.database.models import Question, RECIPIENT_FAILED, db_session
 from src.database.operations import DatabaseOperations
 from src.utils.logger import logger
 from src.bot.states import StudentStates
-from src.utils.state_storage import state_storage, data_storage
+from src.utils.state_storage import state_storage, data_storage, session_journal
+from src.utils.helpers import get_result_criteria, get_video_for_results
+from src.utils.outbound_queue import outbound_queue
+from src.utils.question_scheduler import QuestionScheduler
+from src.utils.question_pool import question_pool
+from src.utils.timer_wheel import question_timers
+from src.utils.launch_progress import launch_progress
+from src.utils.launch_jobs import LAUNCH_MAX_ATTEMPTS, LAUNCH_RETRY_DELAY
+from src.bot.callback_codec import OP_ANSWER, encode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+import os
 import random
+import threading
+import time
+
+# Время на ответ на вопрос по умолчанию, секунды (0 - без ограничения)
+QUESTION_TIME_LIMIT = int(os.getenv('QUESTION_TIME_LIMIT', '0'))
+TIMEOUT_WORKERS = 4
+
+# Ответ студента и истечение времени могут прийти одновременно: вопрос забирается под блокировкой
+_answer_lock = threading.Lock()
+# Истекшие сроки обрабатываются вне потока колеса таймеров
+_timeout_executor = ThreadPoolExecutor(max_workers=TIMEOUT_WORKERS, thread_name_prefix='question-timeout')
 
 def send_test_question(bot, user_id, session):
     """
@@ -11,7 +35,6 @@ def send_test_question(bot, user_id, session):
     """
     try:
         logger.info(f"Начало send_test_question для пользователя {user_id}")
-        logger.info(f"Данные в хранилище: {data_storage.data}")
         
         # Получаем данные пользователя из глобального хранилища данных
         user_data = data_storage.data.get(user_id, {})
@@ -19,60 +42,305 @@ def send_test_question(bot, user_id, session):
         test_sections = test_data.get('test_sections', [])
         current_index = test_data.get('current_question_index', 0)
         
-        logger.info(f"Полученные данные пользователя: {user_data}")
         logger.info(f"Разделы для тестирования: {test_sections}")
         
-        # Получаем вопросы для всех выбранных разделов
-        db_ops = DatabaseOperations(session)
-        questions = []
-        for section in test_sections:
-            section_questions = db_ops.get_questions_by_section(section)
-            logger.info(f"Получено {len(section_questions)} вопросов для раздела {section}")
-            questions.extend(section_questions)
+        # Планировщик чередует разделы и выбирает следующий вопрос лениво
+        scheduler = test_data.get('scheduler')
+        if scheduler is None:
+            scheduler = QuestionScheduler(user_id, test_sections, session=session)
+            test_data['scheduler'] = scheduler
         
-        logger.info(f"Всего получено вопросов: {len(questions)}")
+        db_ops = DatabaseOperations(session)
+        next_question = scheduler.next()
         
-        if questions and current_index < len(questions):
-            current_question = questions[current_index]
-            logger.info(f"Текущий вопрос: {current_question.text}")
+        if next_question:
+            section, question_id = next_question
+            current_question = session.get(Question, question_id)
+            logger.info(f"Текущий вопрос (раздел {section}): {current_question.text}")
             
             # Получаем и перемешиваем варианты ответов
             answers = list(db_ops.get_answer_options(current_question.id))
             random.shuffle(answers)
             
-            # Сохраняем маппинг ответов и обновляем состояние
-            test_data['current_answer_mapping'] = {i: answer for i, answer in enumerate(answers)}
-            test_data['current_question'] = current_question
+            # Сохраняем маппинг ответов (id варианта, правильность) и обновляем состояние
+            test_data['current_answer_mapping'] = {i: (answer.id, answer.is_correct) for i, answer in enumerate(answers)}
+            test_data['current_question_id'] = current_question.id
             
             # Обновляем данные в хранилище
             user_data['data'] = test_data
             data_storage.data[user_id] = user_data
-            
-            logger.info(f"Обновленная структура хранилища: {data_storage.data}")
+            session_journal.record(
+                'question', user_id,
+                section=section,
+                q=current_question.id,
+                options=[[answer.id, answer.is_correct] for answer in answers]
+            )
             
             # Создаем клавиатуру
             markup = InlineKeyboardMarkup()
             for i, answer in enumerate(answers):
                 markup.add(InlineKeyboardButton(
                     answer.text,
-                    callback_data=f"answer_{i}"
+                    callback_data=encode(OP_ANSWER, a=current_question.id, b=i, epoch=test_data.get('epoch', 0))
                 ))
             
             # Отправляем вопрос
-            bot.send_message(
-                user_id,
-                f"Вопрос {current_index + 1}: {current_question.text}",
-                reply_markup=markup
-            )
+            time_limit = test_data.get('time_limit')
+            text = f"Вопрос {current_index + 1}: {current_question.text}"
+            if time_limit:
+                text += f"\n⏱ На ответ: {time_limit} с"
+            sent = bot.send_message(user_id, text, reply_markup=markup)
+            # Время доставки вопроса - начало отсчета времени на ответ
+            test_data['question_sent_at'] = time.time()
+            test_data['question_message_id'] = getattr(sent, 'message_id', None)
+            if time_limit:
+                schedule_question_timeout(bot, session, user_id, current_question.id, test_data.get('epoch', 0), time_limit)
             logger.info(f"Вопрос успешно отправлен пользователю {user_id}")
             
             return True
         else:
-            logger.warning(f"Нет доступных вопросов для пользователя {user_id}")
-            bot.send_message(user_id, "Тестирование завершено!")
+            logger.info(f"Вопросы для пользователя {user_id} закончились")
+            finish_test(bot, user_id)
             return False
             
     except Exception as e:
         logger.error(f"Ошибка при отправке вопроса: {e}", exc_info=True)
         bot.send_message(user_id, "Произошла ошибка при получении вопроса")
-        return False 
\ No newline at end of file
+        return False
+
+def finish_test(bot, user_id):
+    """
+    Завершает тест пользователя: подводит итог и отправляет видео-комментарий.
+
+    Результат считается по счетчикам сессии в data_storage (без чтения answers),
+    а сообщения ставятся в исходящую очередь с ограничением скорости, чтобы
+    одновременное завершение теста всей группой не упиралось в лимиты Telegram.
+    """
+    user_data = data_storage.data.get(user_id, {})
+    test_data = user_data.get('data', {})
+    if test_data.get('finished'):
+        return False
+
+    correct_answers = test_data.get('score', 0)
+    total_questions = test_data.get('current_question_index', 0)
+    test_data['finished'] = True
+    user_data['data'] = test_data
+    data_storage.data[user_id] = user_data
+    session_journal.record('finish', user_id)
+    question_pool.reset(user_id)
+    launch_progress.finished(test_data.get('epoch', 0), user_id, correct_answers, total_questions)
+
+    if not total_questions:
+        outbound_queue.put(bot.send_message, user_id, "Тестирование завершено!")
+        return True
+
+    outbound_queue.put(
+        bot.send_message,
+        user_id,
+        f"Тестирование завершено!\nПравильных ответов: {correct_answers} из {total_questions}"
+    )
+    send_result_video(bot, user_id, correct_answers, total_questions)
+    logger.info(f"Тест пользователя {user_id} завершен: {correct_answers}/{total_questions}")
+    return True
+
+def send_result_video(bot, user_id, correct_answers, total_questions):
+    """
+    Ставит в исходящую очередь видео-комментарий по результатам теста.
+
+    Видео отправляется по закэшированному file_id, повторная загрузка файла
+    и запрос к таблице videos не требуются.
+    """
+    file_id = get_video_for_results(correct_answers, total_questions)
+    if not file_id:
+        logger.warning(
+            f"Нет видео для критерия {get_result_criteria(correct_answers, total_questions)}, "
+            f"пользователь {user_id}"
+        )
+        return False
+
+    outbound_queue.put(bot.send_video, user_id, file_id)
+    logger.info(f"Видео с результатами поставлено в очередь для пользователя {user_id}")
+    return True
+
+def take_current_question(test_data, question_id):
+    """
+    Забирает текущий вопрос сессии, чтобы ответ на него был записан ровно один раз.
+
+    Возвращает (варианты ответов, время отправки вопроса) или None, если
+    вопрос уже отвечен или время на него истекло.
+    """
+    with _answer_lock:
+        if question_id is None or test_data.get('current_question_id') != question_id:
+            return None
+        del test_data['current_question_id']
+        mapping = test_data.pop('current_answer_mapping', {})
+        sent_at = test_data.pop('question_sent_at', None)
+        test_data.pop('question_message_id', None)
+    return mapping, sent_at
+
+def record_test_answer(user_id, session, user_data, question_id, option_id, is_correct, sent_at, answered_at):
+    """
+    Записывает ответ на забранный вопрос: счет сессии, база данных и журнал сессий.
+
+    option_id равен None, если время на ответ истекло (ответ засчитывается неправильным).
+    """
+    test_data = user_data['data']
+    if is_correct:
+        test_data['score'] = test_data.get('score', 0) + 1
+
+    # Баллы в рейтинге и статистику вопроса обновляет record_answer
+    DatabaseOperations(session).record_answer(
+        student_id=user_id,
+        question_id=question_id,
+        answer_option_id=option_id,
+        is_correct=is_correct,
+        question_sent_at=datetime.utcfromtimestamp(sent_at) if sent_at else None,
+        answered_at=answered_at
+    )
+    logger.info(f"Сохранен ответ пользователя {user_id} на вопрос {question_id}")
+
+    test_data['current_question_index'] = test_data.get('current_question_index', 0) + 1
+    session_journal.record('answer', user_id, correct=is_correct)
+    data_storage.data[user_id] = user_data
+    launch_progress.answered(test_data.get('epoch', 0), user_id)
+
+def schedule_question_timeout(bot, session, user_id, question_id, epoch, delay):
+    """Ставит срок ответа на вопрос в колесо таймеров"""
+    question_timers.schedule(
+        user_id,
+        delay,
+        partial(_timeout_executor.submit, handle_question_timeout, bot, session, user_id, question_id, epoch)
+    )
+
+def handle_question_timeout(bot, session, user_id, question_id, epoch):
+    """Время на вопрос истекло: засчитываем неправильный ответ и отправляем следующий вопрос"""
+    try:
+        user_data = data_storage.data.get(user_id)
+        if not user_data:
+            return
+        test_data = user_data.get('data', {})
+        if test_data.get('finished') or test_data.get('epoch', 0) != epoch:
+            return
+        message_id = test_data.get('question_message_id')
+        taken = take_current_question(test_data, question_id)
+        if taken is None:
+            return
+
+        logger.info(f"Время на вопрос {question_id} истекло, пользователь {user_id}")
+        _, sent_at = taken
+        record_test_answer(user_id, session, user_data, question_id, None, False, sent_at, datetime.utcnow())
+        if message_id:
+            bot.edit_message_reply_markup(user_id, message_id)
+        bot.send_message(user_id, "⏰ Время на ответ истекло")
+        send_test_question(bot, user_id, session)
+    except Exception as e:
+        logger.error(f"Ошибка при обработке истечения времени: {e}", exc_info=True)
+    finally:
+        # Потоки пула сроков живут долго: сессия закрывается после каждого срока
+        db_session.remove()
+
+def start_test_session(user_id, sections, epoch, time_limit=None):
+    """
+    Создает сессию тестирования студента для запуска с эпохой epoch.
+
+    time_limit - время на ответ на каждый вопрос в секундах (None - без ограничения).
+    """
+    student_data = {
+        'state': str(StudentStates.waiting_for_answer),
+        'data': {
+            'test_sections': list(sections),
+            'epoch': epoch,
+            'time_limit': time_limit,
+            'current_question_index': 0,
+            'score': 0
+        }
+    }
+    # Метки заданных вопросов прошлого теста не переносятся в новый
+    question_pool.reset(user_id)
+    # Сохраняем данные с меткой запуска, чтобы запуск можно было сбросить отдельно
+    data_storage.data.set(user_id, student_data, run_id=epoch)
+    session_journal.record('start', user_id, sections=list(sections), epoch=epoch, time_limit=time_limit)
+    return student_data
+
+def begin_test(bot, session, student_id, sections, epoch, time_limit=None, job_id=None):
+    """
+    Начинает тестирование студента: сессия, сообщение о начале и первый вопрос.
+
+    job_id - запуск из launch_jobs: результат отправки отмечается в базе, а
+    повторная задача для уже начатой сессии этого запуска ничего не отправляет.
+    Возвращает True, если студенту удалось отправить сообщение.
+    """
+    db_ops = DatabaseOperations(session)
+    existing = data_storage.data.get(student_id)
+    if job_id is not None and existing and existing.get('data', {}).get('epoch') == epoch:
+        db_ops.complete_launch_recipient(job_id, student_id, True)
+        return True
+
+    try:
+        student_data = start_test_session(student_id, sections, epoch, time_limit)
+        logger.info(f"Инициализированы данные для студента {student_id}: {student_data}")
+
+        # Отправляем сигнал начала тестирования и первый вопрос
+        bot.send_message(student_id, "Начинается тестирование!")
+        send_test_question(bot, student_id, session)
+    except Exception as e:
+        logger.error(f"Ошибка при запуске теста для студента {student_id}: {e}")
+        # Сессия без доставленного сообщения не должна мешать повторной попытке
+        data_storage.data.pop(student_id, None)
+        session_journal.record('drop', student_id)
+        question_pool.reset(student_id)
+        status = RECIPIENT_FAILED
+        if job_id is not None:
+            status = db_ops.complete_launch_recipient(
+                job_id, student_id, False, str(e)[:200], LAUNCH_MAX_ATTEMPTS, LAUNCH_RETRY_DELAY
+            )
+        if status == RECIPIENT_FAILED:
+            launch_progress.failed(epoch)
+        return False
+
+    if job_id is not None:
+        db_ops.complete_launch_recipient(job_id, student_id, True)
+    launch_progress.delivered(epoch)
+    return True
+
+def restore_test_sessions(session, bot=None):
+    """
+    Восстанавливает незавершенные сессии тестирования из журнала.
+
+    Если передан bot, сроки ответа на ожидающие вопросы ставятся заново
+    с учетом уже прошедшего времени.
+    Возвращает число восстановленных сессий (0, если журнал отключен).
+    """
+    if not session_journal.directory:
+        return 0
+
+    saved_sessions = session_journal.open()
+    for user_id, saved in saved_sessions.items():
+        test_data = {
+            'test_sections': saved['sections'],
+            'epoch': saved['epoch'],
+            'time_limit': saved.get('time_limit'),
+            'current_question_index': saved['index'],
+            'score': saved['score'],
+        }
+        # Планировщик продолжает с того же места, заданные вопросы снова помечаются
+        scheduler = QuestionScheduler(user_id, saved['sections'], session=session)
+        scheduler.issued = saved['index'] + (1 if saved['question'] else 0)
+        test_data['scheduler'] = scheduler
+        for section, question_ids in saved['asked'].items():
+            scheduler.issued_by_section[section] = len(question_ids)
+            question_pool.mark_asked(session, user_id, section, question_ids)
+        if saved['question']:
+            test_data['current_question_id'] = saved['question']
+            test_data['current_answer_mapping'] = {i: tuple(option) for i, option in enumerate(saved['options'])}
+            test_data['question_sent_at'] = saved['ts']
+            if bot is not None and test_data['time_limit']:
+                remaining = test_data['time_limit'] - (time.time() - saved['ts'])
+                schedule_question_timeout(bot, session, user_id, saved['question'], saved['epoch'], max(remaining, 1))
+
+        data_storage.data.set(
+            user_id,
+            {'state': str(StudentStates.waiting_for_answer), 'data': test_data},
+            run_id=saved['epoch']
+        )
+    return len(saved_sessions)
@@ -0,0 +1,144 @@
+from src.utils.logger import logger
+from typing import Callable, Dict, Hashable, List, Optional
+import math
+import threading
+import time
+
+TICK = 0.1
+SLOT_BITS = 8
+LEVELS = 4
+
+
+class _Timer:
+    __slots__ = ('key', 'deadline', 'callback', 'slot')
+
+    def __init__(self, key, deadline: int, callback: Callable):
+        self.key = key
+        self.deadline = deadline
+        self.callback = callback
+        self.slot: Optional[dict] = None
+
+
+class TimerWheel:
+    """
+    Иерархическое колесо таймеров.
+
+    Время делится на тики длиной tick секунд. Уровень 0 содержит 2^slot_bits
+    ячеек по одному тику, каждый следующий уровень - ячейки в 2^slot_bits раз
+    длиннее. Таймер кладется в ячейку самого нижнего уровня, в диапазон
+    которого попадает его срок; когда колесо уровня 0 делает оборот, ячейка
+    верхнего уровня раскладывается по нижним. Постановка и отмена таймера -
+    O(1), обработка тика - O(1) плюс число сработавших таймеров.
+
+    Таймеры адресуются ключом (например, id студента): повторная постановка
+    по тому же ключу заменяет прежний таймер.
+    """
+
+    def __init__(self, tick: float = TICK, slot_bits: int = SLOT_BITS, levels: int = LEVELS,
+                 clock=time.monotonic):
+        self.tick = tick
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels = levels
+        self._wheels: List[List[Dict[Hashable, _Timer]]] = [
+            [{} for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._timers: Dict[Hashable, _Timer] = {}
+        self._clock = clock
+        self._origin = clock()
+        self._current = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __len__(self):
+        return len(self._timers)
+
+    def schedule(self, key, delay: float, callback: Callable):
+        """Ставит таймер: callback() будет вызван через delay секунд"""
+        with self._lock:
+            self._cancel(key)
+            now_tick = max(self._current, int((self._clock() - self._origin) / self.tick))
+            deadline = now_tick + max(1, math.ceil(delay / self.tick))
+            timer = _Timer(key, deadline, callback)
+            self._timers[key] = timer
+            self._place(timer)
+
+    def cancel(self, key) -> bool:
+        with self._lock:
+            return self._cancel(key)
+
+    def _cancel(self, key) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.slot.pop(key, None)
+        return True
+
+    def _place(self, timer: _Timer):
+        remaining = timer.deadline - self._current
+        level = 0
+        while level < self._levels - 1 and remaining >= 1 << (self._bits * (level + 1)):
+            level += 1
+        # Сроки за пределами последнего уровня ждут в его ячейках и раскладываются повторно
+        index = (timer.deadline >> (self._bits * level)) & self._mask
+        timer.slot = self._wheels[level][index]
+        timer.slot[timer.key] = timer
+
+    def _cascade(self, level: int):
+        index = (self._current >> (self._bits * level)) & self._mask
+        slot = self._wheels[level][index]
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            self._place(timer)
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Обрабатывает тики до момента now и вызывает сработавшие таймеры. Возвращает их число"""
+        now = self._clock() if now is None else now
+        target = int((now - self._origin) / self.tick)
+        expired = []
+        with self._lock:
+            while self._current < target:
+                self._current += 1
+                # При обороте нижнего колеса раскладываем ячейки верхних уровней (сверху вниз)
+                if not self._current & self._mask:
+                    level = 1
+                    while level < self._levels - 1 and not (self._current >> (self._bits * level)) & self._mask:
+                        level += 1
+                    for cascade_level in range(level, 0, -1):
+                        self._cascade(cascade_level)
+                slot = self._wheels[0][self._current & self._mask]
+                for key, timer in list(slot.items()):
+                    if timer.deadline <= self._current:
+                        del slot[key]
+                        del self._timers[key]
+                        expired.append(timer)
+
+        for timer in expired:
+            try:
+                timer.callback()
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике таймера {timer.key}: {e}", exc_info=True)
+        return len(expired)
+
+    def start(self):
+        """Запускает фоновый поток, продвигающий колесо каждый тик"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+
+        def run():
+            while not self._stopped.wait(self.tick):
+                self.advance()
+
+        self._thread = threading.Thread(target=run, name='timer-wheel', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread = None
+
+
+# Сроки ответа на вопросы (ключ - id студента)
+question_timers = TimerWheel()
@@ -0,0 +1,70 @@
+from src.database.models import Video
+from src.utils.cluster import cluster
+from typing import Dict, List, Optional
+import random
+import threading
+
+VIDEO_CRITERIA = ('success', 'partial', 'failure')
+
+
+class VideoCache:
+    """
+    Кэш file_id видео-комментариев, сгруппированных по критерию.
+
+    Пул критерия загружается из таблицы videos один раз (или заранее через
+    prefetch) и затем пополняется при сохранении нового видео, поэтому выбор
+    видео по окончании теста не обращается к базе данных.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, session) -> int:
+        """Загружает пулы всех критериев одним запросом. Возвращает число видео"""
+        rows = session.query(Video.criteria, Video.file_id).order_by(Video.id).all()
+        pools = {criteria: [] for criteria in VIDEO_CRITERIA}
+        for criteria, file_id in rows:
+            pools.setdefault(criteria, []).append(file_id)
+        with self._lock:
+            self._pools = pools
+        return len(rows)
+
+    def _load(self, session, criteria: str) -> List[str]:
+        rows = (
+            session.query(Video.file_id)
+            .filter_by(criteria=criteria)
+            .order_by(Video.id)
+            .all()
+        )
+        with self._lock:
+            # Пул мог быть заполнен другим потоком, пока шел запрос
+            return self._pools.setdefault(criteria, [row[0] for row in rows])
+
+    def add(self, criteria: str, file_id: str):
+        """Добавляет видео в уже загруженный пул критерия"""
+        with self._lock:
+            pool = self._pools.get(criteria)
+            # Незагруженный пул не трогаем: при первом обращении он будет прочитан целиком
+            if pool is not None:
+                pool.append(file_id)
+
+    def choice(self, session, criteria: str) -> Optional[str]:
+        """Возвращает случайный file_id для критерия или None, если видео нет"""
+        pool = self._pools.get(criteria)
+        if pool is None:
+            pool = self._load(session, criteria)
+        return random.choice(pool) if pool else None
+
+    def invalidate(self, criteria: Optional[str] = None):
+        """Сбрасывает пул критерия (или все пулы), чтобы перечитать его из базы"""
+        with self._lock:
+            if criteria is None:
+                self._pools.clear()
+            else:
+                self._pools.pop(criteria, None)
+
+
+video_cache = VideoCache()
+# Сохраненное видео добавляется в кэш каждого процесса-обработчика
+cluster.task('add_video', video_cache.add)
@@ -1,5 +1,5 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from src.database.models import Base
 from src.database.operations import DatabaseOperations
@@ -20,4 +20,35 @@ def session(engine):
 
 @pytest.fixture(scope="function")
 def db_ops(session):
-    return DatabaseOperations(session) 
\ No newline at end of file
+    return DatabaseOperations(session) 
+
+@pytest.fixture(scope="function")
+def sqlite_session():
+    # Изолированная in-memory база для тестов без PostgreSQL
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture(scope="function")
+def concurrent_insert(sqlite_session):
+    # Другой писатель добавляет строку в таблицу сразу перед первой вставкой в нее из sqlite_session
+    engine = sqlite_session.get_bind()
+    listeners = []
+
+    def insert_before(table, row_sql):
+        done = []
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            if not done and statement.startswith(f"INSERT INTO {table} "):
+                done.append(True)
+                conn.connection.cursor().execute(row_sql)
+
+        event.listen(engine, 'before_cursor_execute', before)
+        listeners.append(before)
+
+    yield insert_before
+    for before in listeners:
+        event.remove(engine, 'before_cursor_execute', before)
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from src.database.operations import DatabaseOperations
+from src.supervisor import Supervisor, handle_message
+from src.utils.cluster import cluster
+from src.utils.latency_stats import latency_stats
+from src.utils.question_pool import question_pool
+from src.utils.video_cache import video_cache
+
+def relay_tasks(supervisor, count):
+    # Работа супервизора и обработчиков: задачи из control раздаются по кольцу и выполняются в каждой очереди
+    for _ in range(count):
+        kind, task, key, payload = supervisor._control.get(timeout=5)
+        assert kind == 'task'
+        supervisor.dispatch_task(task, key, payload)
+    delivered = {}
+    for index, inbox in supervisor._inboxes.items():
+        messages = [inbox.get(timeout=5) for _ in range(count)]
+        for message in messages:
+            handle_message(None, index, message)
+        delivered[index] = [message[1][0] for message in messages]
+    return delivered
+
+def test_cache_updates_are_broadcast_to_every_worker(sqlite_session, monkeypatch):
+    supervisor = Supervisor(2, token='1:test')
+    monkeypatch.setattr(cluster, '_control', supervisor._control)
+    monkeypatch.setattr(cluster, 'worker', 0)
+    question_pool.load_section("Кластер", [])
+    video_cache.invalidate()
+    video_cache.prefetch(sqlite_session)
+    think_total = latency_stats.think_total.total
+    try:
+        db_ops = DatabaseOperations(sqlite_session)
+        db_ops.create_user(1001, "Иван", "Иванов", "+7")
+        question = db_ops.create_question("2+2?", "Кластер", ["4", "5"])
+        db_ops.bulk_create_questions([("3+3?", "Кластер", ["6", "7"]), ("4+4?", "Кластер", ["8", "9"])])
+        db_ops.save_video("video-1", "success")
+        sent = datetime(2026, 1, 1, 10)
+        db_ops.record_answer(1001, question.id, question.answers_options[0].id, True, sent, sent + timedelta(seconds=2))
+
+        # Обновления кэшей доходят только через супервизора
+        assert len(question_pool.section_ids(sqlite_session, "Кластер")) == 0
+        delivered = relay_tasks(supervisor, 4)
+        expected = ['add_questions', 'add_questions', 'add_video', 'record_think']
+        assert delivered == {0: expected, 1: expected}
+
+        # Оба обработчика живут в этом процессе, поэтому каждое обновление применено дважды
+        assert len(question_pool.section_ids(sqlite_session, "Кластер")) == 6
+        assert video_cache.choice(sqlite_session, "success") == "video-1"
+        assert latency_stats.think_total.total == think_total + 2
+    finally:
+        question_pool.invalidate("Кластер")
+        video_cache.invalidate()
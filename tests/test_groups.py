@@ -0,0 +1,25 @@
+from src.database.operations import DatabaseOperations
+
+def test_group_membership_and_targeted_students(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    teacher = db_ops.create_user(1, "Анна", "Учитель", "+7")
+    teacher.is_teacher = True
+    sqlite_session.commit()
+    for telegram_id, last_name in [(101, "Иванов"), (102, "Петров"), (103, "Сидоров")]:
+        db_ops.create_user(telegram_id, "Студент", last_name, "+7")
+
+    group_a = db_ops.create_group(1, "9А")
+    group_b = db_ops.create_group(1, "9Б")
+    assert len(group_a.join_code) == 6 and group_a.join_code != group_b.join_code
+
+    assert db_ops.join_group(101, group_a.join_code.lower()).id == group_a.id
+    assert db_ops.join_group(101, group_a.join_code).id == group_a.id  # повторное вступление
+    db_ops.join_group(102, group_a.join_code)
+    db_ops.join_group(102, group_b.join_code)
+    assert db_ops.join_group(103, "NOPE00") is None
+    assert db_ops.join_group(1, group_a.join_code) is None  # преподаватель не вступает
+
+    assert [(group.name, members) for group, members in db_ops.get_teacher_groups(1)] == [("9А", 2), ("9Б", 1)]
+    assert db_ops.get_teacher_groups(101) == []
+    students = db_ops.get_group_students([group_a.id, group_b.id])
+    assert [student.telegram_id for student in students] == [101, 102]
@@ -0,0 +1,32 @@
+from src.supervisor import update_user_id
+from src.utils.hash_ring import HashRing
+
+
+def test_keys_are_spread_and_stable():
+    ring = HashRing(range(4))
+    owners = {user_id: ring.node_for(user_id) for user_id in range(10_000)}
+
+    counts = [list(owners.values()).count(node) for node in range(4)]
+    assert min(counts) > 1500
+    same = HashRing(range(4))
+    assert owners == {user_id: same.node_for(user_id) for user_id in range(10_000)}
+
+
+def test_removing_node_moves_only_its_keys():
+    ring = HashRing(range(4))
+    before = {user_id: ring.node_for(user_id) for user_id in range(10_000)}
+
+    ring.remove(2)
+    after = {user_id: ring.node_for(user_id) for user_id in range(10_000)}
+    moved = [user_id for user_id in before if before[user_id] != after[user_id]]
+    assert moved and all(before[user_id] == 2 for user_id in moved)
+    assert 2 not in after.values()
+
+    ring.add(2)
+    assert {user_id: ring.node_for(user_id) for user_id in range(10_000)} == before
+
+
+def test_update_user_id():
+    assert update_user_id({'update_id': 1, 'message': {'from': {'id': 42}, 'chat': {'id': 42}}}) == 42
+    assert update_user_id({'update_id': 2, 'callback_query': {'from': {'id': 7}}}) == 7
+    assert update_user_id({'update_id': 3, 'channel_post': {'chat': {'id': -100}}}) == 0
@@ -0,0 +1,29 @@
+import random
+from src.utils.histogram import Histogram
+
+def test_bucket_ranges_cover_values_with_bounded_error():
+    histogram = Histogram()
+    for value in [0, 1, 255, 256, 257, 1000, 123456, 10 ** 9]:
+        low, high = histogram.bucket_range(histogram.index_for(value))
+        assert low <= value <= high
+        assert high - low <= max(value, 1) / 100
+
+def test_percentiles_within_one_percent():
+    rng = random.Random(1)
+    values = sorted(rng.randint(1, 10_000_000) for _ in range(10_000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+
+    assert histogram.total == len(values)
+    assert len(histogram.counts) < 2000
+    for percent in (50, 90, 99):
+        exact = values[int(len(values) * percent / 100) - 1]
+        assert abs(histogram.percentile(percent) - exact) <= exact * 0.01
+    assert histogram.percentile(100) == values[-1]
+
+    other = Histogram()
+    other.record(5)
+    histogram.merge(other)
+    assert histogram.min == 5
+    assert histogram.total == len(values) + 1
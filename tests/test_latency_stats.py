@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from src.database.models import Answer, LatencyBucket
+from src.database.operations import DatabaseOperations
+from src.utils.latency_stats import LatencyStats
+
+def test_histograms_are_restored_from_buckets(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    user = db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    question = db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    right = question.answers_options[0]
+
+    sent = datetime(2026, 1, 1, 10)
+    for seconds in (1, 2, 2, 30):
+        db_ops.record_answer(1001, question.id, right.id, True, sent, sent + timedelta(seconds=seconds))
+    db_ops.record_answer(1001, question.id, None, False, sent, sent + timedelta(seconds=60))
+    # Одна корзина на значение и область, а не строка на ответ
+    assert sqlite_session.query(LatencyBucket).count() == 6
+
+    # Ответы больше не читаются при запуске
+    sqlite_session.query(Answer).delete()
+    stats = LatencyStats()
+    assert stats.load(sqlite_session) == 4
+    for histogram in (stats.think_total, stats.think_by_question[question.id], stats.think_by_student[user.id]):
+        assert histogram.total == 4
+        assert abs(histogram.percentile(50) - 2_000_000) <= 20_000
+        assert abs(histogram.max - 30_000_000) <= 300_000
+
+def test_buckets_are_backfilled_from_answers_once(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    user = db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    question = db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    right = question.answers_options[0]
+
+    # Ответы, записанные до появления таблицы корзин
+    sent = datetime(2026, 1, 1, 10)
+    sqlite_session.execute(insert(Answer), [
+        {'user_id': user.id, 'question_id': question.id, 'answer_option_id': right.id, 'is_correct': True,
+         'question_sent_at': sent, 'answered_at': sent + timedelta(seconds=seconds)}
+        for seconds in (1, 3)
+    ])
+    sqlite_session.commit()
+
+    assert LatencyStats().load(sqlite_session) == 2
+    assert sqlite_session.query(LatencyBucket).count() == 4
+    stats = LatencyStats()
+    assert stats.load(sqlite_session) == 2
+    assert stats.think_by_student[user.id].total == 2
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from src.database.models import LaunchRecipient, RECIPIENT_CLAIMED, RECIPIENT_FAILED, RECIPIENT_PENDING, RECIPIENT_SENT
+from src.database.operations import DatabaseOperations
+
+
+def statuses(session):
+    return {recipient.user_id: recipient.status for recipient in session.query(LaunchRecipient)}
+
+
+def test_claim_complete_retry_and_finish(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    job = db_ops.create_launch_job(1, 1, 10, ["Алгебра"], 42, None, "всех студентов", [101, 102, 103])
+
+    claimed = db_ops.claim_launch_recipients(2, lease=60, max_attempts=3)
+    assert [(claimed_job.epoch, user_id) for claimed_job, user_id in claimed] == [(42, 101), (42, 102)]
+    assert claimed[0][0].sections == ["Алгебра"]
+    # Арендованные строки не забираются повторно
+    assert [user_id for _, user_id in db_ops.claim_launch_recipients(10, lease=60, max_attempts=3)] == [103]
+    assert db_ops.claim_launch_recipients(10, lease=60, max_attempts=3) == []
+
+    assert db_ops.complete_launch_recipient(job.id, 101, True) == RECIPIENT_SENT
+    assert db_ops.complete_launch_recipient(job.id, 102, False, "blocked", max_attempts=3) == RECIPIENT_PENDING
+    assert db_ops.complete_launch_recipient(job.id, 103, False, "blocked", max_attempts=1) == RECIPIENT_FAILED
+    assert statuses(sqlite_session) == {101: RECIPIENT_SENT, 102: RECIPIENT_PENDING, 103: RECIPIENT_FAILED}
+    assert db_ops.finish_launch_jobs() == 0
+
+    # Повтор доступен только после паузы
+    assert db_ops.claim_launch_recipients(10, lease=60, max_attempts=3) == []
+    sqlite_session.query(LaunchRecipient).filter_by(user_id=102).update({'available_at': datetime.utcnow()})
+    sqlite_session.commit()
+    assert [user_id for _, user_id in db_ops.claim_launch_recipients(10, lease=60, max_attempts=3)] == [102]
+    db_ops.complete_launch_recipient(job.id, 102, True)
+
+    assert db_ops.finish_launch_jobs() == 1
+    [(listed, counts)] = db_ops.get_launch_jobs(1)
+    assert listed.status == 'done'
+    assert counts == {RECIPIENT_SENT: 2, RECIPIENT_FAILED: 1}
+
+
+def test_expired_lease_is_reclaimed_until_attempts_run_out(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_launch_job(1, 1, 10, ["Алгебра"], 7, 30, "всех студентов", [101])
+
+    def expire_lease():
+        sqlite_session.query(LaunchRecipient).update({'available_at': datetime.utcnow() - timedelta(seconds=1)})
+        sqlite_session.commit()
+
+    # Обработчик забрал получателя и "упал", не отметив результат
+    assert len(db_ops.claim_launch_recipients(10, lease=60, max_attempts=2)) == 1
+    expire_lease()
+    assert len(db_ops.claim_launch_recipients(10, lease=60, max_attempts=2)) == 1
+    assert statuses(sqlite_session) == {101: RECIPIENT_CLAIMED}
+    expire_lease()
+    assert db_ops.claim_launch_recipients(10, lease=60, max_attempts=2) == []
+    assert statuses(sqlite_session) == {101: RECIPIENT_FAILED}
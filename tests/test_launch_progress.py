@@ -0,0 +1,53 @@
+from src.utils.launch_progress import ProgressBoard
+
+
+def test_events_are_coalesced_into_one_edit():
+    board = ProgressBoard()
+    board.open(7, chat_id=1, message_id=10, title="Запуск", total=3)
+    edits = []
+
+    for _ in range(3):
+        board.delivered(7)
+    for user_id in (101, 102, 101, 102):
+        board.answered(7, user_id)
+
+    assert board.flush(lambda *args: edits.append(args)) == 1
+    text, chat_id, message_id = edits[0]
+    assert (chat_id, message_id) == (1, 10)
+    assert "Доставлено: 3 из 3" in text
+    assert "Отвечают: 2" in text
+
+    # Без новых событий сообщение не редактируется
+    assert board.flush(lambda *args: edits.append(args)) == 0
+    assert len(edits) == 1
+
+
+def test_complete_launch_is_shown_once_and_forgotten():
+    board = ProgressBoard()
+    board.open(7, chat_id=1, message_id=10, title="Запуск", total=2)
+    edits = []
+
+    board.delivered(7)
+    board.failed(7)
+    board.answered(7, 101)
+    board.finished(7, 101, correct=3, total_questions=4)
+    # События чужих запусков не влияют на этот
+    board.finished(8, 102, correct=0, total_questions=4)
+
+    assert board.flush(lambda *args: edits.append(args)) == 1
+    text = edits[0][0]
+    assert "Завершили: 1" in text
+    assert "Не доставлено: 1" in text
+    assert "Средний результат: 75%" in text
+    assert "Отвечают: 0" in text
+    assert len(board) == 0
+
+
+def test_take_text_marks_launch_as_shown():
+    board = ProgressBoard()
+    board.open(7, chat_id=1, message_id=10, title="Запуск", total=2)
+    board.delivered(7)
+
+    assert "Доставлено: 1 из 2" in board.take_text(7)
+    assert board.flush(lambda *args: None) == 0
+    assert board.take_text(8) is None
@@ -0,0 +1,38 @@
+from datetime import datetime
+from src.database import partitions
+from src.database.maintenance import drop_expired_answers, roll_up_answers
+from src.database.models import Answer, DailyQuestionStats, DailyStudentStats, RollupWatermark
+from src.database.operations import DatabaseOperations
+
+def add_answers(session, user_id, question_id, moments):
+    for moment, is_correct in moments:
+        session.add(Answer(user_id=user_id, question_id=question_id, answer_option_id=0,
+                           is_correct=is_correct, created_at=moment))
+    session.commit()
+
+def test_roll_up_is_incremental_and_retention_keeps_unrolled_days(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    user = db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    question = db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    add_answers(sqlite_session, user.id, question.id, [
+        (datetime(2026, 1, 1, 10), True),
+        (datetime(2026, 1, 1, 11), False),
+        (datetime(2026, 1, 2, 9), True),
+        (datetime(2026, 1, 3, 9), True),
+    ])
+
+    assert roll_up_answers(sqlite_session, now=datetime(2026, 1, 3, 12)) == 2
+    # Повторный запуск в тот же день ничего не сворачивает
+    assert roll_up_answers(sqlite_session, now=datetime(2026, 1, 3, 13)) == 0
+    stats = {(str(s.day), s.attempts, s.correct) for s in sqlite_session.query(DailyStudentStats)}
+    assert stats == {("2026-01-01", 2, 1), ("2026-01-02", 1, 1)}
+    assert sqlite_session.query(DailyQuestionStats).count() == 2
+    assert sqlite_session.get(RollupWatermark, 'answers').rolled_up_to == datetime(2026, 1, 3)
+
+    # Срок хранения - 1 день, но 3 января еще не свернуто и остается в answers
+    assert drop_expired_answers(sqlite_session, retention_days=1, now=datetime(2026, 1, 10)) == 3
+    assert [a.created_at for a in sqlite_session.query(Answer)] == [datetime(2026, 1, 3, 9)]
+
+def test_partition_names_and_bounds():
+    assert partitions.partition_name(datetime(2026, 12, 15)) == "answers_p2026_12"
+    assert partitions.partition_bounds("answers_p2026_12") == (datetime(2026, 12, 1), datetime(2027, 1, 1))
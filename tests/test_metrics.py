@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine
+from src.utils.metrics import Metrics, check_health
+
+
+def test_render_prometheus_text():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.describe('updates_total', 'counter', 'Обновления')
+    metrics.inc('updates_total', handler='start')
+    metrics.inc('updates_total', 2, handler='start')
+    metrics.observe('handler_seconds', 0.05, handler='start')
+    metrics.observe('handler_seconds', 0.5, handler='start')
+    metrics.observe('handler_seconds', 3, handler='start')
+    metrics.gauge('sessions', 'Сессии', lambda: {(('store', 'test_sessions'),): 4})
+    metrics.gauge('pool', 'Пул', lambda: None)
+
+    text = metrics.render()
+    assert "# HELP updates_total Обновления\n# TYPE updates_total counter\n" in text
+    assert 'updates_total{handler="start"} 3\n' in text
+    assert 'handler_seconds_bucket{handler="start",le="0.1"} 1\n' in text
+    assert 'handler_seconds_bucket{handler="start",le="1"} 2\n' in text
+    assert 'handler_seconds_bucket{handler="start",le="+Inf"} 3\n' in text
+    assert 'handler_seconds_count{handler="start"} 3\n' in text
+    assert 'sessions{store="test_sessions"} 4\n' in text
+    assert 'pool' not in text
+
+
+def test_health_check():
+    assert check_health(create_engine('sqlite://')) is None
+    assert check_health(create_engine('sqlite:////nonexistent/dir/db.sqlite')) is not None
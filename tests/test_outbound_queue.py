@@ -0,0 +1,24 @@
+import pytest
+from unittest.mock import Mock
+from telebot.apihelper import ApiTelegramException
+from src.utils.outbound_queue import OutboundQueue
+
+def test_calls_are_delivered_in_order():
+    calls = []
+    queue = OutboundQueue(rate=1000)
+    for i in range(5):
+        queue.put(calls.append, i)
+    queue.join()
+    assert calls == [0, 1, 2, 3, 4]
+
+def test_retries_after_rate_limit():
+    response = Mock(status_code=429, reason="Too Many Requests")
+    error = ApiTelegramException(
+        "sendMessage", response,
+        {"error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 0}}
+    )
+    send = Mock(side_effect=[error, "ok"])
+    queue = OutboundQueue(rate=1000)
+    queue.put(send, 1, "text")
+    queue.join()
+    assert send.call_count == 2
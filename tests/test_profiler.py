@@ -0,0 +1,43 @@
+import time
+from src.utils.profiler import DispatchProfiler
+
+
+def busy_handler(update, ctx):
+    return sum(i * i for i in range(20000))
+
+
+def sleepy_handler(update, ctx):
+    time.sleep(0.05)
+
+
+def test_cprofile_session_ends_after_n_updates():
+    profiler = DispatchProfiler()
+    reports = []
+    assert profiler.start('cprofile', lambda *report: reports.append(report), seconds=60, updates=2)
+    assert not profiler.start('sample', lambda *report: None)
+
+    profiler.call(busy_handler, None, None)
+    assert profiler.active
+    profiler.call(busy_handler, None, None)
+    assert not profiler.active
+
+    [(report, filename, summary)] = reports
+    assert filename == 'profile.txt'
+    assert 'обновлений: 2' in summary
+    assert 'busy_handler' in report
+    # Вне сеанса обработчик вызывается как обычно
+    assert profiler.call(busy_handler, None, None) == busy_handler(None, None)
+
+
+def test_sampling_collects_collapsed_stacks():
+    profiler = DispatchProfiler(sample_interval=0.001)
+    reports = []
+    profiler.start('sample', lambda *report: reports.append(report), seconds=60)
+    for _ in range(3):
+        profiler.call(sleepy_handler, None, None)
+    assert profiler.stop()
+
+    [(report, filename, _)] = reports
+    assert filename == 'profile.collapsed'
+    stack, count = report.splitlines()[0].rsplit(' ', 1)
+    assert stack.endswith('test_profiler.py:sleepy_handler') and int(count) > 0
@@ -0,0 +1,48 @@
+import io
+import pytest
+from src.database.models import AnswerOption, Question
+from src.database.operations import DatabaseOperations
+from src.utils.exceptions import ValidationError
+from src.utils.question_io import detect_format, export_questions, import_questions
+
+def test_import_csv_in_batches(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    stream = io.StringIO(
+        "section,text,answers\n"
+        "Алгебра,2+2?,4,5,3\n"
+        "Алгебра,Без вариантов,1\n"
+        "Геометрия,Углов в треугольнике?,3,4\n"
+    )
+    result = import_questions(db_ops, stream, 'csv', batch_size=1)
+
+    assert result.imported == 2
+    assert result.error_count == 1
+    assert result.errors[0].startswith("Строка 3")
+    question = sqlite_session.query(Question).filter_by(text="2+2?").one()
+    correct = [option.text for option in question.answers_options if option.is_correct]
+    assert correct == ["4"]
+    assert sqlite_session.query(AnswerOption).count() == 5
+
+def test_jsonl_round_trip(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_question("Столица Франции?", "География", ["Париж", "Лион"])
+    db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+
+    out = io.StringIO()
+    assert export_questions(db_ops, out, 'jsonl') == 2
+
+    sqlite_session.query(AnswerOption).delete()
+    sqlite_session.query(Question).delete()
+    sqlite_session.commit()
+
+    result = import_questions(db_ops, io.StringIO(out.getvalue() + "{broken\n"), 'jsonl')
+    assert result.imported == 2
+    assert result.error_count == 1
+    exported = list(db_ops.iter_questions_with_options("География"))
+    assert exported == [("География", "Столица Франции?", ["Париж", "Лион"])]
+
+def test_detect_format():
+    assert detect_format("bank.CSV") == 'csv'
+    assert detect_format("bank.json") == 'jsonl'
+    with pytest.raises(ValidationError):
+        detect_format("bank.xlsx")
@@ -0,0 +1,94 @@
+import pytest
+from src.database.models import Question
+from src.database.operations import DatabaseOperations
+from src.utils.question_pool import AskedSet, QuestionPool, question_pool
+from src.utils.question_scheduler import QuestionScheduler
+from src.utils.state_storage import data_storage
+from src.utils.test_utils import start_test_session
+
+def test_asked_set_draws_every_position_once():
+    asked = AskedSet(10)
+    drawn = {asked.draw() for _ in range(10)}
+    assert drawn == set(range(10))
+    assert asked.remaining == 0
+
+    asked.reset()
+    assert asked.remaining == 10
+
+def test_asked_set_grow_keeps_asked_marks():
+    asked = AskedSet(3)
+    first = asked.draw()
+    asked.grow(5)
+    assert asked.remaining == 4
+    drawn = {asked.draw() for _ in range(4)}
+    assert first not in drawn
+    assert drawn | {first} == set(range(5))
+
+def test_pool_cycles_section_without_touching_answers(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    ids = {db_ops.create_question(f"Q{i}", "Алгебра", ["a", "b"]).id for i in range(4)}
+    db_ops.create_question("Other", "Геометрия", ["a", "b"])
+
+    pool = QuestionPool()
+    first_round = [pool.draw(sqlite_session, 1, "Алгебра") for _ in range(4)]
+    assert set(first_round) == ids
+    assert pool.remaining(1, "Алгебра") == 0
+
+    # Метки сбрасываются автоматически, другие студенты независимы
+    assert pool.draw(sqlite_session, 1, "Алгебра") in ids
+    assert pool.remaining(2, "Алгебра") is None
+    assert pool.draw(sqlite_session, 1, "Пустой раздел") is None
+
+def test_pool_picks_up_new_questions(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_question("Q1", "Алгебра", ["a", "b"])
+
+    pool = QuestionPool()
+    pool.draw(sqlite_session, 1, "Алгебра")
+    new_id = db_ops.create_question("Q2", "Алгебра", ["a", "b"]).id
+    pool.add_question("Алгебра", new_id)
+    assert pool.draw(sqlite_session, 1, "Алгебра") == new_id
+
+def test_scheduler_interleaves_sections():
+    pool = QuestionPool()
+    pool.load_section("A", [1, 2, 3])
+    pool.load_section("B", [10, 20])
+    pool.load_section("Empty", [])
+
+    scheduler = QuestionScheduler(1, ["A", "B", "Empty"], pool=pool)
+    drawn = list(scheduler)
+    assert scheduler.total == 5
+    assert [section for section, _ in drawn] == ["A", "B", "A", "B", "A"]
+    assert {question_id for _, question_id in drawn} == {1, 2, 3, 10, 20}
+    assert scheduler.next() is None
+
+def test_pool_reset_frees_student_marks():
+    pool = QuestionPool()
+    pool.load_section("A", [1, 2])
+    pool.load_section("B", [10])
+    pool.draw(None, 1, "A")
+    pool.draw(None, 1, "B")
+    pool.draw(None, 2, "A")
+
+    pool.reset(1, "A")
+    assert pool.remaining(1, "A") is None
+    assert pool.remaining(1, "B") == 0
+    pool.reset(1)
+    assert pool.remaining(1, "B") is None
+    assert pool.remaining(2, "A") == 1
+
+def test_new_session_does_not_inherit_asked_marks():
+    question_pool.load_section("Сессии", [1, 2, 3, 4, 5])
+    try:
+        # Тест прерван после трех вопросов
+        start_test_session(1, ["Сессии"], epoch=1)
+        scheduler = QuestionScheduler(1, ["Сессии"], pool=question_pool)
+        for _ in range(3):
+            scheduler.next()
+
+        start_test_session(1, ["Сессии"], epoch=2)
+        drawn = [question_id for _, question_id in QuestionScheduler(1, ["Сессии"], pool=question_pool)]
+        assert sorted(drawn) == [1, 2, 3, 4, 5]
+    finally:
+        data_storage.data.pop(1, None)
+        question_pool.invalidate("Сессии")
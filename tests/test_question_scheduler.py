@@ -0,0 +1,38 @@
+from src.utils.question_pool import QuestionPool
+from src.utils.question_scheduler import QuestionScheduler
+
+def test_every_question_is_asked_once_in_sections_of_different_size():
+    pool = QuestionPool()
+    pool.load_section("A", [1, 2, 3, 4, 5])
+    pool.load_section("B", [10])
+    pool.load_section("C", [20, 21])
+
+    scheduler = QuestionScheduler(1, ["A", "B", "C"], pool=pool)
+    drawn = list(scheduler)
+    assert scheduler.total == 8
+    assert sorted(question_id for _, question_id in drawn) == [1, 2, 3, 4, 5, 10, 20, 21]
+    # Выбывший раздел больше не участвует в чередовании
+    assert [section for section, _ in drawn] == ["A", "B", "C", "A", "C", "A", "A", "A"]
+    assert scheduler.next() is None
+
+def test_limit_is_reached_without_repeating_questions():
+    pool = QuestionPool()
+    pool.load_section("A", [1, 2, 3])
+    pool.load_section("B", [10])
+
+    drawn = list(QuestionScheduler(1, ["A", "B"], pool=pool, limit=3))
+    assert len(drawn) == len({question_id for _, question_id in drawn}) == 3
+    assert len(list(QuestionScheduler(2, ["A", "B"], pool=pool, limit=10))) == 4
+
+def test_continued_test_skips_exhausted_sections():
+    pool = QuestionPool()
+    pool.load_section("A", [1, 2, 3])
+    pool.load_section("B", [10])
+    pool.mark_asked(None, 1, "A", [1])
+    pool.mark_asked(None, 1, "B", [10])
+
+    # Тест после перезапуска: раздел B уже пройден
+    scheduler = QuestionScheduler(1, ["A", "B"], pool=pool)
+    scheduler.issued = 2
+    scheduler.issued_by_section.update({"A": 1, "B": 1})
+    assert sorted(question_id for _, question_id in scheduler) == [2, 3]
@@ -0,0 +1,50 @@
+import io
+from datetime import datetime, timedelta
+from src.database.operations import DatabaseOperations
+from src.utils.reports import export_question_stats, format_question_stats
+
+def test_question_stats_are_counted_on_answer_write(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    easy = db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    hard = db_ops.create_question("Корень из 2?", "Алгебра", ["1.41", "1.5", "2"])
+    right, wrong, other = hard.answers_options
+
+    sent = datetime(2026, 1, 1, 10)
+    db_ops.record_answer(1001, easy.id, easy.answers_options[0].id, True, sent, sent + timedelta(seconds=1))
+    db_ops.record_answer(1001, hard.id, wrong.id, False, sent, sent + timedelta(seconds=4))
+    db_ops.record_answer(1001, hard.id, wrong.id, False, sent, sent + timedelta(seconds=6))
+    db_ops.record_answer(1001, hard.id, right.id, True)
+
+    rows = db_ops.get_question_stats()
+    assert [question.id for question, _ in rows] == [hard.id, easy.id]
+    stats = rows[0][1]
+    assert (stats.attempts, stats.correct, stats.timed_attempts, stats.response_ms_total) == (3, 1, 2, 10000)
+
+    picks = db_ops.get_option_picks([hard.id])
+    assert picks[hard.id] == [("1.41", True, 1), ("1.5", False, 2), ("2", False, 0)]
+    report = format_question_stats(rows, picks)
+    assert "Верно: 1 из 3 (33%), ср. время: 5.0 с" in report
+
+    out = io.StringIO()
+    assert export_question_stats(db_ops, out) == 2
+    assert out.getvalue().splitlines()[1] == "Алгебра,Корень из 2?,3,1,0.333,5.00,1.41,1,1.5,2,2,0"
+
+def test_first_answer_adds_to_stats_written_concurrently(sqlite_session, concurrent_insert):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    question = db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    right = question.answers_options[0]
+
+    # Ответ другого студента создал строки статистики после нашей проверки
+    concurrent_insert('question_stats', f"INSERT INTO question_stats (question_id, attempts, correct, timed_attempts, "
+                                        f"response_ms_total) VALUES ({question.id}, 1, 0, 1, 3000)")
+    concurrent_insert('option_stats', f"INSERT INTO option_stats (answer_option_id, question_id, picks) "
+                                      f"VALUES ({right.id}, {question.id}, 1)")
+    sent = datetime(2026, 1, 1, 10)
+    db_ops.record_answer(1001, question.id, right.id, True, sent, sent + timedelta(seconds=1))
+
+    stats = db_ops.get_question_stats()[0][1]
+    assert (stats.attempts, stats.correct, stats.timed_attempts, stats.response_ms_total) == (2, 1, 2, 4000)
+    assert db_ops.get_option_picks([question.id])[question.id][0] == ("4", True, 2)
+    assert len(db_ops.get_user_scores(1001)) == 1
@@ -0,0 +1,25 @@
+import io
+import openpyxl
+from src.database.operations import DatabaseOperations
+from src.utils.reports import export_ratings
+
+def test_export_ratings_streams_filtered_rows(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    db_ops.create_user(1002, "Петр", "Петров", "+7")
+    algebra = db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    geometry = db_ops.create_question("Угол?", "Геометрия", ["90", "45"])
+    for telegram_id in (1001, 1002):
+        db_ops.record_answer(telegram_id, algebra.id, algebra.answers_options[0].id, True)
+        db_ops.record_answer(telegram_id, geometry.id, geometry.answers_options[0].id, True)
+
+    out = io.BytesIO()
+    assert export_ratings(db_ops, out, 'csv', name="Петр", section="Алгебра") == 1
+    assert out.getvalue().decode('utf-8-sig').splitlines() == ["Фамилия,Имя,Раздел,Баллы", "Петров,Петр,Алгебра,1.0"]
+
+    out = io.BytesIO()
+    assert export_ratings(db_ops, out, 'xlsx') == 4
+    out.seek(0)
+    rows = list(openpyxl.load_workbook(out).active.values)
+    assert rows[0] == ("Фамилия", "Имя", "Раздел", "Баллы")
+    assert rows[1] == ("Иванов", "Иван", "Алгебра", 1)
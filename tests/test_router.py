@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import Mock
+from src.bot.callback_codec import ENCODED_LENGTH, OP_ANSWER, OP_SECTION, SectionIds, decode, encode
+from src.bot.router import ANY, Router
+from src.bot.states import TeacherStates
+
+def make_router(role="teacher", state=None):
+    router = Router(lambda user_id: role)
+    router.bot = Mock()
+    router.bot.get_state.return_value = state
+    return router
+
+def make_message(text, content_type="text"):
+    message = Mock(text=text, content_type=content_type)
+    message.from_user.id = 1
+    message.chat.id = 1
+    return message
+
+def make_call(data):
+    call = Mock(data=data)
+    call.from_user.id = 1
+    call.message.chat.id = 1
+    return call
+
+def test_message_lookup_order():
+    router = make_router(state=str(TeacherStates.waiting_for_question))
+    calls = []
+    router.command('teacher')(lambda m, ctx: calls.append('command'))
+    router.text("📝 Создать вопрос", role="teacher")(lambda m, ctx: calls.append('menu'))
+    router.state(TeacherStates.waiting_for_question, role="teacher")(lambda m, ctx: calls.append(ctx.state))
+
+    router.dispatch_message(make_message("/teacher"))
+    router.dispatch_message(make_message("📝 Создать вопрос"))
+    router.dispatch_message(make_message("Текст вопроса"))
+    assert calls == ['command', 'menu', str(TeacherStates.waiting_for_question)]
+    # Роль и состояние определяются один раз на обновление
+    assert router.bot.get_state.call_count == 3
+
+def test_callback_routed_by_prefix_role_and_state():
+    router = make_router(state=str(TeacherStates.waiting_for_test_sections))
+    calls = []
+    router.callback(OP_SECTION, role="teacher", state=TeacherStates.waiting_for_section)(lambda c, ctx: calls.append('create'))
+    router.callback(OP_SECTION, role="teacher", state=TeacherStates.waiting_for_test_sections)(lambda c, ctx: calls.append(ctx.payload.a))
+    router.callback(OP_ANSWER, role="student")(lambda c, ctx: calls.append('answer'))
+
+    router.dispatch_callback(make_call(encode(OP_SECTION, a=7)))
+    router.dispatch_callback(make_call(encode(OP_ANSWER, a=1)))
+    # Старый строковый формат кнопок отклоняется
+    router.dispatch_callback(make_call("section_Алгебра"))
+    assert calls == [7]
+    assert router.bot.answer_callback_query.call_count == 2
+
+def test_codec_is_fixed_size_and_round_trips():
+    data = encode(OP_ANSWER, a=2**32 - 1, b=3, epoch=70000)
+    assert len(data) == ENCODED_LENGTH
+    assert decode(data) == (OP_ANSWER, 70000 & 0xFFFF, 2**32 - 1, 3)
+    assert decode("answer_1") is None
+    assert decode("!" * ENCODED_LENGTH) is None
+
+def test_section_ids_reject_stale_buttons():
+    ids = SectionIds()
+    long_name = "Очень длинное название раздела про дифференциальные уравнения"
+    payload = decode(ids.encode(long_name))
+    assert len(ids.encode(long_name).encode()) <= 64
+    assert ids.name_for(payload) == long_name
+
+    restarted = SectionIds()
+    restarted.generation = ids.generation + 1
+    assert restarted.name_for(payload) is None
+
+def test_duplicate_registration_rejected():
+    router = make_router()
+    router.text("❓ Помощь", role=ANY)(lambda m, ctx: None)
+    with pytest.raises(ValueError):
+        router.text("❓ Помощь", role=ANY)(lambda m, ctx: None)
+
+def test_database_session_is_released_after_each_update(monkeypatch):
+    session = Mock()
+    monkeypatch.setattr('src.bot.router.db_session', session)
+    router = make_router()
+
+    def failing(message, ctx):
+        raise RuntimeError("ошибка обработчика")
+
+    router.command('fail')(failing)
+    router.callback(OP_ANSWER)(lambda c, ctx: None)
+    router.dispatch_message(make_message("/fail"))
+    router.dispatch_message(make_message("без обработчика"))
+    router.dispatch_callback(make_call(encode(OP_ANSWER, a=1)))
+    router.dispatch_callback(make_call("устаревшая кнопка"))
+    assert session.remove.call_count == 4
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from src.database.migrations import ensure_unique_scores
+from src.database.models import Answer, Score, ScoreEvent
+from src.database.operations import DatabaseOperations
+
+@pytest.fixture
+def ledger_ops(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    return db_ops
+
+def scores(session):
+    return {(s.user_id, s.section): s.points for s in session.query(Score)}
+
+def test_correct_answer_scores_once_in_question_section(ledger_ops, sqlite_session):
+    algebra = ledger_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    geometry = ledger_ops.create_question("Угол?", "Геометрия", ["90", "45"])
+
+    ledger_ops.record_answer(1001, algebra.id, 0, True)
+    ledger_ops.record_answer(1001, algebra.id, 1, False)
+    ledger_ops.record_answer(1001, geometry.id, 0, True)
+    ledger_ops.record_answer(1001, algebra.id, 0, True)
+
+    user_id = ledger_ops.get_user_by_id(1001).id
+    assert scores(sqlite_session) == {(user_id, "Алгебра"): 2, (user_id, "Геометрия"): 1}
+    assert sqlite_session.query(ScoreEvent).count() == 3
+
+def test_rebuild_scores_restores_drifted_aggregates(ledger_ops, sqlite_session):
+    question = ledger_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    ledger_ops.record_answer(1001, question.id, 0, True)
+    user_id = ledger_ops.get_user_by_id(1001).id
+
+    # Ответ, записанный до появления журнала, и испорченный агрегат
+    sqlite_session.add(Answer(user_id=user_id, question_id=question.id, answer_option_id=0, is_correct=True))
+    sqlite_session.query(Score).update({Score.points: 42})
+    sqlite_session.commit()
+
+    assert ledger_ops.rebuild_scores() == (1, 1)
+    assert scores(sqlite_session) == {(user_id, "Алгебра"): 2}
+    # Повторный пересчет ничего не добавляет в журнал
+    assert ledger_ops.rebuild_scores() == (0, 1)
+    assert scores(sqlite_session) == {(user_id, "Алгебра"): 2}
+
+def test_first_score_adds_to_row_written_concurrently(ledger_ops, sqlite_session, concurrent_insert):
+    question = ledger_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    user_id = ledger_ops.get_user_by_id(1001).id
+
+    # Параллельный ответ того же студента создал строку рейтинга после нашей проверки
+    concurrent_insert('scores', f"INSERT INTO scores (user_id, section, points) VALUES ({user_id}, 'Алгебра', 1)")
+    ledger_ops.record_answer(1001, question.id, 0, True)
+
+    assert scores(sqlite_session) == {(user_id, "Алгебра"): 2}
+    assert sqlite_session.query(Answer).count() == 1
+
+def test_unique_scores_migration_merges_duplicates():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        # Таблица из базы, созданной до ограничения уникальности
+        connection.execute(text("CREATE TABLE scores (id INTEGER PRIMARY KEY, user_id INTEGER, section VARCHAR, points FLOAT)"))
+        connection.execute(text(
+            "INSERT INTO scores (user_id, section, points) VALUES (1, 'A', 2), (1, 'A', 3), (1, 'B', 1), (2, 'A', 4)"
+        ))
+        ensure_unique_scores(connection)
+        ensure_unique_scores(connection)
+        rows = connection.execute(text("SELECT user_id, section, points FROM scores ORDER BY user_id, section")).all()
+        assert [tuple(row) for row in rows] == [(1, 'A', 5), (1, 'B', 1), (2, 'A', 4)]
+        assert any(index['unique'] for index in inspect(connection).get_indexes('scores'))
@@ -0,0 +1,28 @@
+from src.database.models import Answer, LatencyBucket, OptionStats, QuestionStats, Score, User
+from src.database.operations import DatabaseOperations
+from src.database.seed import seed_database
+
+def test_seed_database_is_consistent(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    counts = seed_database(db_ops, sections=2, questions_per_section=10, students=8, answers_per_student=5)
+
+    assert counts['questions'] == 20
+    assert sqlite_session.query(User).count() == 8
+    assert sqlite_session.query(Answer).count() == counts['answers'] == 40
+    stats = sqlite_session.query(QuestionStats).all()
+    assert sum(s.attempts for s in stats) == 40
+    assert sum(s.picks for s in sqlite_session.query(OptionStats)) == 40
+    for scope in ('question', 'student'):
+        assert sum(b.count for b in sqlite_session.query(LatencyBucket).filter_by(scope=scope)) == 40
+
+    correct = sqlite_session.query(Answer).filter(Answer.is_correct == True).count()
+    assert sum(s.correct for s in stats) == correct
+    assert sum(s.points for s in sqlite_session.query(Score)) == correct
+    assert all(a.question_sent_at < a.answered_at for a in sqlite_session.query(Answer))
+
+def test_seed_database_appends_new_students(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    seed_database(db_ops, sections=1, questions_per_section=5, students=3, answers_per_student=2)
+    seed_database(db_ops, sections=1, questions_per_section=5, students=3, answers_per_student=2, seed=2)
+
+    assert sqlite_session.query(User).count() == 6
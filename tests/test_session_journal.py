@@ -0,0 +1,80 @@
+from src.database.operations import DatabaseOperations
+from src.utils import state_storage, test_utils
+from src.utils.question_pool import question_pool
+from src.utils.session_journal import SessionJournal
+from src.utils.session_store import SessionStore
+from src.utils.state_storage import data_storage, drop_evicted_session
+from src.utils.timer_wheel import TimerWheel
+from src.utils.test_utils import restore_test_sessions
+
+def test_session_journal_restores_unfinished_sessions(tmp_path):
+    journal = SessionJournal(str(tmp_path))
+    assert journal.open() == {}
+    journal.record('start', 1, sections=['math'], epoch=7)
+    journal.record('question', 1, section='math', q=10, options=[[100, False], [101, True]])
+    journal.record('answer', 1, correct=True)
+    journal.record('question', 1, section='math', q=11, options=[[110, True]])
+    journal.record('start', 2, sections=['math'], epoch=7)
+    journal.record('finish', 2)
+    journal.record('start', 3, sections=['art'], epoch=8)
+    journal.record('drop', epoch=8)
+    journal.flush()
+
+    # Недописанная строка после аварийного завершения пропускается
+    with open(tmp_path / 'sessions.journal', 'a', encoding='utf-8') as f:
+        f.write('{"t":"answer","u":1')
+
+    state = SessionJournal(str(tmp_path)).load()
+    assert list(state) == [1]
+    assert state[1]['index'] == 1
+    assert state[1]['score'] == 1
+    assert state[1]['question'] == 11
+    assert state[1]['options'] == [[110, True]]
+    assert state[1]['asked'] == {'math': [10, 11]}
+
+def test_restore_rebuilds_scheduler_marks_and_timers(tmp_path, monkeypatch, sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    ids = [db_ops.create_question(f"Q{i}", "Восстановление", ["a", "b"]).id for i in range(3)]
+    question_pool.invalidate("Восстановление")
+
+    journal = SessionJournal(str(tmp_path))
+    journal.open()
+    journal.record('start', 1, sections=['Восстановление'], epoch=7, time_limit=30)
+    journal.record('question', 1, section='Восстановление', q=ids[0], options=[[100, True]])
+    journal.record('answer', 1, correct=True)
+    journal.record('question', 1, section='Восстановление', q=ids[1], options=[[110, False], [111, True]])
+    journal.flush()
+
+    timers = TimerWheel()
+    monkeypatch.setattr(test_utils, 'session_journal', SessionJournal(str(tmp_path)))
+    monkeypatch.setattr(test_utils, 'question_timers', timers)
+    try:
+        assert restore_test_sessions(sqlite_session, bot=object()) == 1
+
+        test_data = data_storage.data[1]['data']
+        assert data_storage.data.run_id(1) == 7
+        assert (test_data['current_question_index'], test_data['score']) == (1, 1)
+        assert test_data['current_question_id'] == ids[1]
+        assert test_data['current_answer_mapping'] == {0: (110, False), 1: (111, True)}
+        # Срок ответа на ожидающий вопрос поставлен заново
+        assert len(timers) == 1
+        # Планировщик продолжает с незаданного вопроса и на нем заканчивает тест
+        scheduler = test_data['scheduler']
+        assert scheduler.next() == ('Восстановление', ids[2])
+        assert scheduler.next() is None
+    finally:
+        data_storage.data.pop(1, None)
+        question_pool.invalidate("Восстановление")
+
+def test_evicted_sessions_are_not_restored(tmp_path, monkeypatch):
+    journal = SessionJournal(str(tmp_path))
+    journal.open()
+    monkeypatch.setattr(state_storage, 'session_journal', journal)
+
+    store = SessionStore(max_size=1, on_evict=drop_evicted_session)
+    for user_id in (1, 2):
+        journal.record('start', user_id, sections=['math'], epoch=7)
+        store[user_id] = {'data': {}}
+    journal.flush()
+
+    assert list(SessionJournal(str(tmp_path)).load()) == [2]
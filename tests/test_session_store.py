@@ -0,0 +1,65 @@
+import pytest
+from src.utils.session_store import SessionStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_idle_and_absolute_ttl():
+    clock = FakeClock()
+    store = SessionStore(ttl=100, idle_ttl=10, clock=clock)
+    store["active"] = {"score": 1}
+    store["idle"] = {"score": 2}
+
+    clock.now = 8
+    assert store["active"]["score"] == 1
+    clock.now = 15
+    assert "idle" not in store
+    assert store.get("active") == {"score": 1}
+
+    clock.now = 101
+    assert store.sweep() == 1
+    assert len(store) == 0
+    assert store.stats()["evicted"] == {"ttl": 1, "idle": 1, "size": 0, "run": 0}
+
+def test_max_size_evicts_least_recently_used():
+    store = SessionStore(max_size=2)
+    store[1] = "a"
+    store[2] = "b"
+    store[1]
+    store[3] = "c"
+    assert set(store) == {1, 3}
+
+def test_evict_run_keeps_other_sessions():
+    store = SessionStore()
+    store.set(1, {"data": {}}, run_id=7)
+    store.set(2, {"data": {}}, run_id=8)
+    # Обновление записи сохраняет метку запуска
+    store[1] = {"data": {"score": 1}}
+    assert store.run_id(1) == 7
+
+    assert store.evict_run(7) == 1
+    assert list(store) == [2]
+    assert store.stats()["approx_bytes"] > 0
+
+def test_evicted_keys_are_reported():
+    clock = FakeClock()
+    evicted = []
+    store = SessionStore(idle_ttl=10, max_size=2, clock=clock,
+                         on_evict=lambda key, reason: evicted.append((key, reason)))
+    store.set(1, "a", run_id=7)
+    store[2] = "b"
+    store[3] = "c"
+    assert evicted == [(1, 'size')]
+
+    clock.now = 11
+    assert 2 not in store
+    assert store.sweep() == 1
+    assert evicted == [(1, 'size'), (2, 'idle'), (3, 'idle')]
+
+    store.set(4, "d", run_id=7)
+    store.evict_run(7)
+    assert len(evicted) == 3
@@ -0,0 +1,50 @@
+from src.utils.startup import StartupTimer
+import os
+import pytest
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_importing_bot_modules_has_no_side_effects(tmp_path):
+    # База недоступна: импорт не должен к ней подключаться, а каталог логов - появляться
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL=f"sqlite:///{tmp_path}/missing/bot.db", LOG_DIR='logs')
+    result = subprocess.run(
+        [sys.executable, '-c', 'import src.main, src.cli, src.supervisor'],
+        cwd=tmp_path, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert os.listdir(tmp_path) == []
+
+def test_db_session_initializes_schema_once(tmp_path, monkeypatch):
+    from src.database import models
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path}/bot.db")
+    monkeypatch.setattr(models, '_engine', None)
+    monkeypatch.setattr(models, '_schema_ready', False)
+    calls = []
+    monkeypatch.setattr(models, 'upgrade_schema', calls.append)
+
+    first, second = models.init_db(), models.init_db()
+    assert first.get_bind() is second.get_bind()
+    assert calls == [first.get_bind()]
+    first.close(), second.close()
+    first.get_bind().dispose()
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_startup_timer_reports_budget():
+    clock = FakeClock()
+    startup = StartupTimer(budget=1.0, clock=clock)
+    with startup.phase('database'):
+        clock.now += 0.4
+    assert startup.report()
+    with startup.phase('caches'):
+        clock.now += 0.8
+    assert startup.total == pytest.approx(1.2)
+    assert startup.snapshot() == pytest.approx({(('phase', 'database'),): 0.4, (('phase', 'caches'),): 0.8})
+    assert not startup.report()
@@ -0,0 +1,20 @@
+import pytest
+from src.database.operations import DatabaseOperations
+
+@pytest.fixture
+def db_ops(sqlite_session):
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_user(1001, "Иван", "Иванов", "+7")
+    return db_ops
+
+def test_score_lookups_by_telegram_id(db_ops):
+    algebra = db_ops.create_question("2+2?", "Алгебра", ["4", "5"])
+    db_ops.record_answer(1001, algebra.id, 0, True)
+    user_id = db_ops.get_user_by_id(1001).id
+
+    assert [(s.section, s.points) for s in db_ops.get_user_scores(1001)] == [("Алгебра", 1)]
+    assert db_ops.get_user_scores(9999) == []
+    assert db_ops.get_user_score(user_id, "Алгебра").points == 1
+    assert db_ops.get_user_score(user_id, "Геометрия") is None
+    assert [o.text for o in db_ops.get_answer_options(algebra.id)] == ["4", "5"]
+    assert db_ops.get_questions_by_section("Алгебра") == [algebra]
@@ -0,0 +1,50 @@
+from src.database.models import User
+from src.database.operations import DatabaseOperations
+from src.utils.role_cache import ROLE_TEACHER, role_cache
+from src.utils.teacher_roster import RosterEntry, merge_entries, read_roster
+import io
+import pytest
+
+@pytest.fixture
+def teacher_ops(sqlite_session, monkeypatch):
+    monkeypatch.delenv('TEACHERS_FILE', raising=False)
+    db_ops = DatabaseOperations(sqlite_session)
+    db_ops.create_user(2002, "Петр", "Петров", "+7")
+    return db_ops
+
+def teachers(session):
+    return {u.telegram_id: (u.last_name, u.first_name) for u in session.query(User).filter_by(is_teacher=True)}
+
+def test_init_teachers_upserts_in_one_statement(teacher_ops, sqlite_session, monkeypatch):
+    monkeypatch.setenv('ADMIN_USER_IDS', "1001, 2002,bad,1001")
+    statements = []
+    execute = sqlite_session.execute
+    monkeypatch.setattr(sqlite_session, 'execute', lambda *a, **kw: statements.append(a[0]) or execute(*a, **kw))
+
+    assert teacher_ops.init_teachers() == 2
+    assert len(statements) == 1
+    # Имя существующего пользователя не меняется
+    assert teachers(sqlite_session) == {1001: ("Admin", "Teacher"), 2002: ("Петров", "Петр")}
+    assert role_cache.get(1001, lambda _: None) == ROLE_TEACHER
+
+    assert teacher_ops.init_teachers() == 0
+    assert sqlite_session.query(User).count() == 2
+
+def test_init_teachers_reads_roster(teacher_ops, sqlite_session, monkeypatch, tmp_path):
+    monkeypatch.setenv('ADMIN_USER_IDS', "1001")
+    roster = tmp_path / 'teachers.csv'
+    roster.write_text("telegram_id,last_name,first_name\n# кафедра\n3003,Сидорова,Анна Петровна\n1001,Иванов,Иван\n\n",
+                      encoding='utf-8')
+
+    assert teacher_ops.init_teachers(str(roster)) == 2
+    assert teachers(sqlite_session) == {1001: ("Иванов", "Иван"), 3003: ("Сидорова", "Анна Петровна")}
+
+def test_init_teachers_without_ids_does_nothing(teacher_ops, sqlite_session, monkeypatch, tmp_path):
+    monkeypatch.setenv('ADMIN_USER_IDS', "")
+    assert teacher_ops.init_teachers(str(tmp_path / 'missing.csv')) == 0
+    assert teachers(sqlite_session) == {}
+
+def test_roster_merge_keeps_names():
+    entries = read_roster(io.StringIO("5,Орлов\nx,y\n"))
+    assert entries == [RosterEntry(5, "Орлов", None)]
+    assert merge_entries([RosterEntry(5)], entries, [RosterEntry(5, None, "Олег")]) == [RosterEntry(5, "Орлов", "Олег")]
@@ -0,0 +1,67 @@
+from src.utils.timer_wheel import TimerWheel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_wheel():
+    clock = FakeClock()
+    return clock, TimerWheel(tick=1.0, slot_bits=2, levels=3, clock=clock)
+
+
+def test_timers_fire_in_order_across_levels():
+    clock, wheel = make_wheel()
+    fired = []
+    # Колесо из 4 ячеек на уровень: сроки 3, 9 и 40 тиков лежат на разных уровнях
+    for delay in (40, 3, 9):
+        wheel.schedule(delay, delay, lambda delay=delay: fired.append((delay, clock.now)))
+
+    for _ in range(45):
+        clock.now += 1
+        wheel.advance()
+
+    assert fired == [(3, 3), (9, 9), (40, 40)]
+    assert len(wheel) == 0
+
+
+def test_deadline_beyond_last_level_is_not_lost():
+    clock, wheel = make_wheel()
+    fired = []
+    wheel.schedule('far', 100, lambda: fired.append(clock.now))
+
+    clock.now = 99
+    wheel.advance()
+    assert fired == []
+    clock.now = 100
+    wheel.advance()
+    assert fired == [100]
+
+
+def test_cancel_and_reschedule_replace_timer():
+    clock, wheel = make_wheel()
+    fired = []
+    wheel.schedule('student', 5, lambda: fired.append('first'))
+    wheel.schedule('student', 7, lambda: fired.append('second'))
+    wheel.schedule('other', 2, lambda: fired.append('other'))
+    assert wheel.cancel('other')
+    assert not wheel.cancel('other')
+
+    clock.now = 10
+    assert wheel.advance() == 1
+    assert fired == ['second']
+
+
+def test_callback_error_does_not_stop_other_timers():
+    clock, wheel = make_wheel()
+    fired = []
+    wheel.schedule('broken', 1, lambda: 1 / 0)
+    wheel.schedule('ok', 1, lambda: fired.append('ok'))
+
+    clock.now = 1
+    assert wheel.advance() == 2
+    assert fired == ['ok']
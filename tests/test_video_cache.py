@@ -0,0 +1,39 @@
+import pytest
+from src.database.models import Video
+from src.database.operations import DatabaseOperations
+from src.utils.video_cache import VideoCache, video_cache
+
+def test_choice_loads_pool_once(sqlite_session):
+    sqlite_session.add_all([
+        Video(file_id="ok_1", criteria="success"),
+        Video(file_id="ok_2", criteria="success"),
+        Video(file_id="bad", criteria="failure"),
+    ])
+    sqlite_session.commit()
+
+    cache = VideoCache()
+    assert cache.choice(sqlite_session, "success") in {"ok_1", "ok_2"}
+
+    # Повторный выбор обслуживается из памяти
+    sqlite_session.query(Video).delete()
+    sqlite_session.commit()
+    assert cache.choice(sqlite_session, "success") in {"ok_1", "ok_2"}
+    assert cache.choice(sqlite_session, "partial") is None
+
+def test_prefetch_and_add(sqlite_session):
+    sqlite_session.add(Video(file_id="part", criteria="partial"))
+    sqlite_session.commit()
+
+    cache = VideoCache()
+    assert cache.prefetch(sqlite_session) == 1
+    cache.add("failure", "new_failure")
+    assert cache.choice(sqlite_session, "failure") == "new_failure"
+    assert cache.choice(sqlite_session, "partial") == "part"
+
+def test_save_video_refreshes_cache(sqlite_session):
+    video_cache.invalidate()
+    video_cache.prefetch(sqlite_session)
+
+    DatabaseOperations(sqlite_session).save_video("fresh", "success")
+    assert video_cache.choice(sqlite_session, "success") == "fresh"
+    video_cache.invalidate()